@@ -37,6 +37,8 @@ def confidentiality_steps() -> None:
 
     2. Data masking/anonymization:
        - Functions `mask_name` and `mask_contact` generate ANON_* and XXX-XXX-#### values.
+       - ANON_* tokens are keyed HMAC digests registered in the `pseudonyms` table, so the
+         same patient keeps the same token on every worker and tokens can be looked up.
        - Admin sees both raw + masked data. Doctor sees anonymized-only views.
        - Receptionist only interacts with anonymized identifiers and never sees decrypted
          values in the UI.
@@ -56,6 +58,9 @@ def integrity_steps() -> None:
     1. Audit logging (`log_action`):
        - Every login, add, edit, delete, and receptionist view is logged with
          user_id, role, timestamp, and action details.
+       - Each entry is hash-chained to the previous one (`prev_hash`,
+         `entry_hash`); `verify_logs` detects edited or removed entries and
+         records HMAC-signed checkpoints.
 
     2. Database schema:
        - Patients/logs tables enforce primary keys and prevent orphaned references.
@@ -74,8 +79,9 @@ def availability_steps() -> None:
     """List availability features."""
     body = """
     1. System uptime widget:
-       - `main.py` tracks `st.session_state["app_start_time"]` and displays
-         the uptime/current time banner on every page.
+       - `views/common.py` (`render_chrome`, called from `main.py`) tracks
+         `st.session_state["app_start_time"]` and displays the uptime/current
+         time banner on every page.
 
     2. CSV Export:
        - Admin can download full patient data via `st.download_button`, providing
@@ -86,7 +92,8 @@ def availability_steps() -> None:
 
     4. Simple exception boundaries:
        - While Streamlit handles UI failures gracefully, the database helper functions
-         close connections reliably on each call to avoid locking.
+         borrow long-lived WAL connections from a bounded pool and always hand them
+         back (rolling back any unfinished transaction) to avoid locking.
     """
     print_section("AVAILABILITY CONTROLS", body)
 
@@ -0,0 +1,579 @@
+"""
+api.py
+------
+Headless HTTP API over ``database.py`` for integrations (lab systems, bed
+management) that need patients and audit entries without the Streamlit UI.
+
+It is a plain ASGI application, so any ASGI server can host it; ``main()``
+uses uvicorn when it is installed. Every request authenticates with HTTP Basic
+credentials checked by ``authenticate_user`` and gets the same role rules as
+the dashboards. Admins see raw identifiers; doctors and receptionists only see
+anonymized fields. SQLite work runs on a bounded thread pool. When too many
+requests are already waiting, new ones get ``503`` instead of queueing without
+limit. Large result sets stream as JSON lines, one keyset page at a time.
+
+Endpoints:
+    GET    /health                  liveness + pool/audit stats (no auth)
+    GET    /metrics                 Prometheus text (no auth, no patient data)
+    GET    /patients                one keyset page (?after_id, limit, diagnosis, search)
+    GET    /patients/stream         every matching patient as JSON lines (same filters)
+    GET    /patients/suggest        typeahead: top ?limit matches for an ID or token ?prefix
+    GET    /patients/{id}           one patient
+    POST   /patients                one patient object, or a list for a bulk insert
+    PUT    /patients/{id}           replace name/contact/diagnosis
+    DELETE /patients/{id}           admin only
+    GET    /logs                    filtered audit page (?role, action, user_id, since, until, limit, offset)
+    GET    /logs/stream             audit entries after ?after_id as JSON lines
+    POST   /logs                    one audit event object, or a list of them (ROLE_LOG_ACTIONS)
+
+Usage:
+    pip install uvicorn
+    python api.py --port 8000
+    curl -u admin:admin123 http://127.0.0.1:8000/patients?limit=5
+"""
+
+import argparse
+import asyncio
+import base64
+import binascii
+import functools
+import json
+import os
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+import database
+import instrumentation
+from database import (
+    PAGE_SIZE,
+    SUGGEST_LIMIT,
+    add_patient,
+    add_patients_bulk,
+    audit_stats,
+    authenticate_user,
+    create_tables,
+    delete_patient,
+    flush_audit_log,
+    get_logs,
+    get_logs_since,
+    get_patient,
+    get_patients_page,
+    log_action,
+    pool_stats,
+    pseudonymize,
+    read_source,
+    suggest_patients,
+    transaction,
+    update_patient,
+)
+from masking import mask_contact
+from roster import FIELDS
+
+API_WORKERS = int(os.environ.get("HMS_API_WORKERS", str(database.POOL_SIZE)))
+API_MAX_PENDING = int(os.environ.get("HMS_API_MAX_PENDING", "64"))  # running + queued jobs
+API_QUEUE_TIMEOUT = 2.0  # seconds a request may wait for a worker slot before 503
+MAX_BODY_BYTES = 8 * 1024 * 1024
+MAX_BATCH = 10_000
+MAX_PAGE = 1000
+STREAM_CHUNK = 1000
+
+ALL_ROLES = ("admin", "doctor", "receptionist")
+# Fields each role may see, mirroring the dashboard roster columns.
+ROLE_PATIENT_FIELDS = {
+    "admin": FIELDS,
+    "doctor": ("patient_id", "anonymized_name", "anonymized_contact", "diagnosis", "date_added"),
+    "receptionist": ("patient_id", "anonymized_name", "anonymized_contact", "date_added"),
+}
+# Filtering by diagnosis (or full-text search, which indexes it) would reveal
+# the column to roles whose view hides it.
+DIAGNOSIS_FILTER_ROLES = tuple(role for role, fields in ROLE_PATIENT_FIELDS.items()
+                               if "diagnosis" in fields)
+# Read-mostly roles read the snapshot / mode=ro path like their dashboards.
+ROLE_READ_SOURCE = {"admin": "primary", "doctor": "snapshot", "receptionist": "readonly"}
+# Audit actions each role's integrations may record through POST /logs. The
+# actions the application writes itself (logins, patient changes, archive and
+# chain runs) are never accepted, so an API caller cannot forge them.
+ROLE_LOG_ACTIONS = {
+    "admin": ("bed_assigned", "bed_released", "lab_result_received", "record_exported"),
+    "doctor": ("lab_order_placed", "lab_result_received", "record_viewed"),
+    "receptionist": ("appointment_booked", "appointment_cancelled", "bed_assigned",
+                     "bed_released"),
+}
+MAX_LOG_DETAILS = 1000
+MAX_SQL_INT = 2 ** 63 - 1  # larger ids and offsets overflow SQLite's INTEGER
+LOG_FIELDS = ("log_id", "user_id", "role", "action", "timestamp", "details")
+
+
+class ApiError(Exception):
+    """An error that maps directly onto an HTTP status and JSON message."""
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or []
+
+
+class Request:
+    """The parts of an ASGI request the handlers need."""
+
+    def __init__(self, scope, match):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.query = {k: v[-1] for k, v in parse_qs(scope.get("query_string", b"").decode()).items()}
+        self.headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        self.body = b""  # read only once the caller is authorized
+        self.match = match
+        self.user_id = None
+        self.role = None
+
+    def json(self):
+        try:
+            return json.loads(self.body or b"null")
+        except ValueError as exc:
+            raise ApiError(400, f"Invalid JSON body: {exc}")
+
+    def patient_id(self):
+        patient_id = int(self.match.group("id"))
+        if patient_id > MAX_SQL_INT:
+            raise ApiError(404, "Patient not found")  # no row can have this id
+        return patient_id
+
+    def int_param(self, name, default=None, maximum=None):
+        raw = self.query.get(name)
+        if raw in (None, ""):
+            return default
+        try:
+            value = int(raw)
+        except ValueError:
+            raise ApiError(400, f"{name} must be an integer")
+        if abs(value) > MAX_SQL_INT:
+            raise ApiError(400, f"{name} is out of range")
+        return min(value, maximum) if maximum is not None else value
+
+
+class JsonLines:
+    """A streamed ``application/x-ndjson`` response body."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+
+# ---------------------------
+# Bounded database executor
+# ---------------------------
+_executor = ThreadPoolExecutor(max_workers=API_WORKERS, thread_name_prefix="hms-api")
+_slots = None
+
+
+def _call(source, span_name, func, args, kwargs):
+    with instrumentation.span(span_name), read_source(source):
+        return func(*args, **kwargs)
+
+
+async def run_db(request, func, *args, **kwargs):
+    """Run a blocking database call on the pool thread, bounded by API_MAX_PENDING."""
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(API_MAX_PENDING)
+    try:
+        await asyncio.wait_for(_slots.acquire(), API_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise ApiError(503, "Server busy, retry shortly", [(b"retry-after", b"1")])
+    try:
+        span_name = f"api.{request.method} {request.match.re.pattern}"
+        # Writes must go to the primary; a mode=ro connection would refuse them.
+        source = ROLE_READ_SOURCE.get(request.role, "primary") if request.method == "GET" else "primary"
+        return await asyncio.get_running_loop().run_in_executor(
+            _executor,
+            functools.partial(_call, source, span_name, func, args, kwargs),
+        )
+    finally:
+        _slots.release()
+
+
+# ---------------------------
+# Serialization helpers
+# ---------------------------
+def _patient(role, row):
+    fields = ROLE_PATIENT_FIELDS[role]
+    return {field: value for field, value in zip(FIELDS, row) if field in fields}
+
+
+def _log(row):
+    return dict(zip(LOG_FIELDS, row))
+
+
+def _patient_record(item):
+    if not isinstance(item, dict):
+        raise ApiError(400, "Each patient must be a JSON object")
+    record = tuple(item.get(key) for key in ("name", "contact", "diagnosis"))
+    if not all(isinstance(value, str) and value.strip() for value in record):
+        raise ApiError(400, "name, contact and diagnosis are required strings")
+    return record
+
+
+def _as_batch(payload):
+    """``(items, is_batch)`` for a body that is an object or a list of objects."""
+    if isinstance(payload, list):
+        if not payload:
+            raise ApiError(400, "Batch is empty")
+        if len(payload) > MAX_BATCH:
+            raise ApiError(413, f"Batches are limited to {MAX_BATCH} items")
+        return payload, True
+    return [payload], False
+
+
+# ---------------------------
+# Handlers
+# ---------------------------
+async def health(request):
+    # Unauthenticated, so counters only: the database path stays private.
+    stats = await run_db(request, lambda: {
+        "schema_version": database.get_schema_version(),
+        "pool": {k: v for k, v in pool_stats().items() if k != "db_name"},
+        "audit": audit_stats(),
+    })
+    return 200, {"status": "ok", **stats}
+
+
+async def metrics(request):
+    return 200, instrumentation.render_prometheus()
+
+
+def _patient_filters(request):
+    filters = {"diagnosis": request.query.get("diagnosis") or None,
+               "search": request.query.get("search") or None}
+    if any(filters.values()) and request.role not in DIAGNOSIS_FILTER_ROLES:
+        raise ApiError(403, f"Role {request.role!r} may not filter patients by diagnosis or search")
+    return filters
+
+
+async def list_patients(request):
+    limit = max(1, request.int_param("limit", PAGE_SIZE, MAX_PAGE))
+    rows, total = await run_db(
+        request, get_patients_page,
+        after_id=request.int_param("after_id"), limit=limit, **_patient_filters(request),
+    )
+    return 200, {
+        "total": total,
+        "patients": [_patient(request.role, row) for row in rows],
+        "next_after_id": rows[-1][0] if len(rows) == limit else None,
+    }
+
+
+async def stream_patients(request):
+    filters = _patient_filters(request)
+    start_after = request.int_param("after_id")
+
+    async def chunks():
+        cursor = start_after
+        while True:
+            # uncached: an export must not flood the shared read cache.
+            rows, _ = await run_db(request, get_patients_page.uncached,
+                                   after_id=cursor, limit=STREAM_CHUNK, **filters)
+            if len(rows):
+                yield "".join(
+                    json.dumps(_patient(request.role, row)) + "\n" for row in rows
+                ).encode()
+            if len(rows) < STREAM_CHUNK:
+                return
+            cursor = rows[-1][0]
+
+    return JsonLines(chunks())
+
+
+async def lookup_patients(request):
+    matches = await run_db(
+        request, suggest_patients, request.query.get("prefix", ""),
+        limit=max(1, request.int_param("limit", SUGGEST_LIMIT, MAX_PAGE)),
+    )
+    return 200, {"matches": [{"patient_id": patient_id, "anonymized_name": token}
+                             for patient_id, token in matches]}
+
+
+async def read_patient(request):
+    row = await run_db(request, get_patient, request.patient_id())
+    if row is None:
+        raise ApiError(404, "Patient not found")
+    return 200, _patient(request.role, row)
+
+
+def _add_one(user_id, role, record):
+    name, contact, diagnosis = record
+    token = pseudonymize(name)
+    with transaction():
+        add_patient(name, contact, diagnosis, token, mask_contact(contact))
+        # The pseudonym, as the receptionist dashboard logs: no raw names in the audit trail.
+        log_action(user_id, role, "add_patient", f"Added patient {token} via API")
+
+
+async def create_patients(request):
+    items, is_batch = _as_batch(request.json())
+    records = [_patient_record(item) for item in items]
+    if is_batch:
+        created = await run_db(request, add_patients_bulk, records,
+                               user_id=request.user_id, role=request.role, source="API batch")
+    else:
+        await run_db(request, _add_one, request.user_id, request.role, records[0])
+        created = 1
+    return 201, {"created": created}
+
+
+def _update_one(user_id, role, patient_id, record):
+    with transaction():
+        if not update_patient(patient_id, *record):
+            raise ApiError(404, "Patient not found")  # rolls back; nothing is logged
+        log_action(user_id, role, "edit_patient", f"API edited ID {patient_id}")
+
+
+async def replace_patient(request):
+    patient_id = request.patient_id()
+    record = _patient_record(request.json())
+    await run_db(request, _update_one, request.user_id, request.role, patient_id, record)
+    return 200, {"updated": patient_id}
+
+
+def _delete_one(user_id, role, patient_id):
+    with transaction():
+        if not delete_patient(patient_id):
+            raise ApiError(404, "Patient not found")
+        log_action(user_id, role, "delete_patient", f"API deleted ID {patient_id}")
+
+
+async def remove_patient(request):
+    patient_id = request.patient_id()
+    await run_db(request, _delete_one, request.user_id, request.role, patient_id)
+    return 200, {"deleted": patient_id}
+
+
+async def list_logs(request):
+    rows = await run_db(
+        request, get_logs,
+        role=request.query.get("role") or None,
+        action=request.query.get("action") or None,
+        user_id=request.int_param("user_id"),
+        since=request.query.get("since") or None,
+        until=request.query.get("until") or None,
+        limit=max(1, request.int_param("limit", 200, MAX_PAGE)),
+        offset=max(0, request.int_param("offset", 0)),
+    )
+    return 200, {"logs": [_log(row) for row in rows]}
+
+
+async def stream_logs(request):
+    role = request.query.get("role") or None
+    start_after = request.int_param("after_id", 0)
+
+    async def chunks():
+        cursor = start_after
+        while True:
+            rows = await run_db(request, get_logs_since.uncached, cursor,
+                                limit=STREAM_CHUNK, role=role)
+            if rows:
+                yield "".join(json.dumps(_log(row)) + "\n" for row in rows).encode()
+            if len(rows) < STREAM_CHUNK:
+                return
+            cursor = rows[-1][0]
+
+    return JsonLines(chunks())
+
+
+def _record_events(user_id, role, events):
+    for action, details in events:
+        log_action(user_id, role, action, details)
+
+
+async def create_logs(request):
+    items, _ = _as_batch(request.json())
+    allowed = ROLE_LOG_ACTIONS[request.role]
+    events = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise ApiError(400, "Each audit event must be a JSON object")
+        if "user_id" in item or "role" in item:
+            raise ApiError(400, "Audit events are recorded as the authenticated user; "
+                                "omit user_id and role")
+        action = item.get("action")
+        if not isinstance(action, str) or action.strip() not in allowed:
+            raise ApiError(403, f"Role {request.role!r} may record only: {', '.join(allowed)}")
+        details = str(item.get("details", ""))
+        if len(details) > MAX_LOG_DETAILS:
+            raise ApiError(413, f"Audit details are limited to {MAX_LOG_DETAILS} characters")
+        events.append((action.strip(), details))
+    await run_db(request, _record_events, request.user_id, request.role, events)
+    return 202, {"accepted": len(events)}
+
+
+# (method, path pattern, handler, roles allowed; None = no authentication)
+ROUTES = [
+    ("GET", r"/health", health, None),
+    ("GET", r"/metrics", metrics, None),
+    ("GET", r"/patients", list_patients, ALL_ROLES),
+    ("GET", r"/patients/stream", stream_patients, ALL_ROLES),
+    ("GET", r"/patients/suggest", lookup_patients, ALL_ROLES),
+    ("GET", r"/patients/(?P<id>\d+)", read_patient, ALL_ROLES),
+    ("POST", r"/patients", create_patients, ("admin", "receptionist")),
+    ("PUT", r"/patients/(?P<id>\d+)", replace_patient, ("admin", "receptionist")),
+    ("DELETE", r"/patients/(?P<id>\d+)", remove_patient, ("admin",)),
+    ("GET", r"/logs", list_logs, ("admin",)),
+    ("GET", r"/logs/stream", stream_logs, ("admin",)),
+    ("POST", r"/logs", create_logs, ALL_ROLES),
+]
+_COMPILED = [(method, re.compile(pattern + r"/?"), handler, roles)
+             for method, pattern, handler, roles in ROUTES]
+
+
+def _route(method, path):
+    allowed = []
+    for route_method, pattern, handler, roles in _COMPILED:
+        match = pattern.fullmatch(path)
+        if match:
+            if route_method == method:
+                return handler, roles, match
+            allowed.append(route_method)
+    if allowed:
+        raise ApiError(405, "Method not allowed", [(b"allow", ", ".join(allowed).encode())])
+    raise ApiError(404, "Not found")
+
+
+def _credentials(request):
+    header = request.headers.get("authorization", "")
+    scheme, _, encoded = header.partition(" ")
+    if scheme.lower() == "basic":
+        try:
+            username, sep, password = base64.b64decode(encoded).decode().partition(":")
+        except (binascii.Error, UnicodeDecodeError):
+            sep = ""
+        if sep:
+            return username, password
+    raise ApiError(401, "Authentication required",
+                   [(b"www-authenticate", b'Basic realm="hms"')])
+
+
+async def _authorize(request, roles):
+    user = await run_db(request, authenticate_user, *_credentials(request))
+    if not user:
+        raise ApiError(401, "Invalid username or password",
+                       [(b"www-authenticate", b'Basic realm="hms"')])
+    request.user_id, request.role = user
+    if request.role not in roles:
+        raise ApiError(403, f"Role {request.role!r} may not {request.method} {request.path}")
+
+
+# ---------------------------
+# ASGI plumbing
+# ---------------------------
+async def _read_body(request, receive):
+    try:
+        declared = int(request.headers.get("content-length", 0))
+    except ValueError:
+        raise ApiError(400, "Invalid Content-Length header")
+    if declared > MAX_BODY_BYTES:
+        raise ApiError(413, f"Request body exceeds {MAX_BODY_BYTES} bytes")
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if len(body) > MAX_BODY_BYTES:
+            raise ApiError(413, f"Request body exceeds {MAX_BODY_BYTES} bytes")
+        if not message.get("more_body"):
+            return body
+
+
+async def _send_json(send, status, payload, headers=None):
+    if isinstance(payload, str):
+        body, content_type = payload.encode(), b"text/plain; version=0.0.4"
+    else:
+        body, content_type = json.dumps(payload).encode(), b"application/json"
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type),
+                    (b"content-length", str(len(body)).encode())] + (headers or []),
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_stream(send, response):
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"application/x-ndjson")],
+    })
+    try:
+        async for chunk in response.chunks:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    finally:
+        # Always terminate the body, even if a later page failed mid-stream.
+        await send({"type": "http.response.body", "body": b""})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            create_tables()
+            instrumentation.start_exporters_from_env()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await asyncio.get_running_loop().run_in_executor(_executor, flush_audit_log)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    """The ASGI entry point."""
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    try:
+        # Route and authorize before buffering any body from the client.
+        handler, roles, match = _route(scope["method"], scope["path"])
+        request = Request(scope, match)
+        if roles is not None:
+            await _authorize(request, roles)
+        request.body = await _read_body(request, receive)
+        response = await handler(request)
+    except ApiError as exc:
+        await _send_json(send, exc.status, {"error": exc.message}, exc.headers)
+        return
+    except ValueError as exc:
+        # Validation errors raised by database helpers (e.g. add_patients_bulk).
+        await _send_json(send, 400, {"error": str(exc)})
+        return
+    except sqlite3.OperationalError as exc:
+        # Pool checkout timeouts and lock contention are transient.
+        await _send_json(send, 503, {"error": str(exc)}, [(b"retry-after", b"1")])
+        return
+
+    if isinstance(response, JsonLines):
+        await _send_stream(send, response)
+    else:
+        await _send_json(send, *response)
+
+
+def main():
+    """Serve the API with uvicorn."""
+    parser = argparse.ArgumentParser(description="Serve the hospital database as an HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--db", default=database.DB_NAME, help="SQLite database file")
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("The API server needs uvicorn: pip install uvicorn")
+
+    database.DB_NAME = args.db
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+"""
+benchmarks
+----------
+Reproducible performance measurements for the database layer.
+
+``datagen`` builds deterministic synthetic hospital datasets, ``scenarios``
+times the public ``database.py`` functions against them, and ``python -m
+benchmarks`` runs everything and writes a JSON report that can be compared
+with a previous run to spot regressions between commits. ``api_load``,
+``dashboard_load`` and ``app_profile`` measure the HTTP API and the Streamlit
+app on top of it.
+"""
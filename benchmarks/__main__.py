@@ -0,0 +1,107 @@
+"""
+Run the benchmark suite.
+
+Usage:
+    python -m benchmarks --patients 100000 --logs 1000000 --out bench.json
+    python -m benchmarks --patients 1000000 --logs 10000000 --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import database
+from benchmarks.datagen import build_dataset, working_copy
+from benchmarks.scenarios import run_scenarios
+
+REGRESSION_THRESHOLD = 1.20  # flag scenarios whose p95 grew by more than 20%
+
+
+def git_commit():
+    """Current commit hash, or ``unknown`` outside a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(database.__file__)), check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current, baseline_path):
+    """Print p95 deltas against a previous report; returns the regression count."""
+    with open(baseline_path, encoding="utf-8") as handle:
+        baseline = json.load(handle)
+    print(f"\nComparison with {baseline_path} ({baseline['meta'].get('commit')}):")
+    regressions = 0
+    for name, result in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if not before or not before["p95_ms"]:
+            continue
+        ratio = result["p95_ms"] / before["p95_ms"]
+        flag = "REGRESSION" if ratio > REGRESSION_THRESHOLD else ""
+        regressions += bool(flag)
+        print(f"  {name:<42} p95 {before['p95_ms']:>9.3f} -> {result['p95_ms']:>9.3f} ms "
+              f"({ratio:>5.2f}x) {flag}")
+    return regressions
+
+
+def main():
+    """Entry point for ``python -m benchmarks``."""
+    parser = argparse.ArgumentParser(description="Benchmark the database layer.")
+    parser.add_argument("--patients", type=int, default=100_000)
+    parser.add_argument("--logs", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--distribution", choices=["zipf", "uniform", "custom"], default="zipf")
+    parser.add_argument("--skew", type=float, default=1.1, help="zipf exponent")
+    parser.add_argument("--weights", help="JSON {diagnosis: weight} for --distribution custom")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--only", nargs="*", help="run scenarios whose name contains these")
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "hms_bench.db"))
+    parser.add_argument("--rebuild", action="store_true", help="regenerate the dataset")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", help="previous JSON report to compare against")
+    args = parser.parse_args()
+
+    print(f"Preparing dataset in {args.db} ...")
+    started = time.perf_counter()
+    spec = build_dataset(
+        args.db, args.patients, args.logs, seed=args.seed,
+        distribution=args.distribution, skew=args.skew,
+        custom=json.loads(args.weights) if args.weights else None,
+        reuse=not args.rebuild,
+    )
+    print(f"Dataset ready in {time.perf_counter() - started:.1f}s: {spec}")
+
+    with working_copy(args.db):
+        report = {
+            "meta": {
+                "commit": git_commit(),
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "platform": platform.platform(),
+                "dataset": spec,
+                "iterations": args.iterations,
+            },
+            "scenarios": run_scenarios(spec, args.iterations, args.only),
+        }
+        report["meta"]["pool"] = database.pool_stats()
+        report["meta"]["audit"] = database.audit_stats()
+
+    with open(args.out, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"\nWrote {args.out}")
+
+    if args.compare and compare(report, args.compare):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Load test for the HTTP API (``api.py``).
+
+By default the ASGI app is driven in-process, with no server or network, on a
+generated benchmark database. That measures what the API layer and SQLite can
+sustain on this machine. With ``--url`` the same request mix is sent over
+keep-alive HTTP/1.1 connections to a running server instead
+(``python api.py``), which also counts the server's own overhead.
+
+Usage:
+    python -m benchmarks.api_load --patients 100000 --logs 500000 --concurrency 32
+    python -m benchmarks.api_load --url http://127.0.0.1:8000 --duration 30
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+from benchmarks.datagen import build_dataset, working_copy
+from instrumentation import percentile
+
+CREDENTIALS = {
+    "admin": ("admin", "admin123"),
+    "doctor": ("DrBob", "doc123"),
+    "receptionist": ("AliceRecep", "rec123"),
+}
+# (name, weight, role, method, path builder, body builder)
+MIXES = {
+    "read": [
+        ("doctor page", 45, "doctor", "GET", lambda r, n: f"/patients?after_id={r.randrange(n)}", None),
+        ("receptionist page", 25, "receptionist", "GET", lambda r, n: f"/patients?after_id={r.randrange(n)}", None),
+        ("admin logs", 20, "admin", "GET", lambda r, n: "/logs?limit=50", None),
+        ("doctor diagnosis", 10, "doctor", "GET", lambda r, n: "/patients?diagnosis=Asthma", None),
+    ],
+    "mixed": [
+        ("doctor page", 40, "doctor", "GET", lambda r, n: f"/patients?after_id={r.randrange(n)}", None),
+        ("admin logs", 15, "admin", "GET", lambda r, n: "/logs?limit=50", None),
+        ("audit events", 25, "receptionist", "POST", lambda r, n: "/logs",
+         lambda r: [{"action": "bed_assigned", "details": f"bed {r.randrange(500)}"}
+                    for _ in range(10)]),
+        ("add patient", 15, "receptionist", "POST", lambda r, n: "/patients",
+         lambda r: {"name": f"Load Test {r.randrange(10**9)}", "contact": "555-0100",
+                    "diagnosis": "Influenza"}),
+        ("bulk add", 5, "admin", "POST", lambda r, n: "/patients",
+         lambda r: [{"name": f"Bulk {r.randrange(10**9)}", "contact": "555-0101",
+                     "diagnosis": "Asthma"} for _ in range(100)]),
+    ],
+}
+
+
+def _auth_header(role):
+    username, password = CREDENTIALS[role]
+    return b"Basic " + base64.b64encode(f"{username}:{password}".encode())
+
+
+class InProcessClient:
+    """Calls the ASGI app directly; one instance per worker."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method, path, role, body):
+        path, _, query = path.partition("?")
+        scope = {
+            "type": "http", "method": method, "path": path, "query_string": query.encode(),
+            "headers": [(b"authorization", _auth_header(role)),
+                        (b"content-type", b"application/json")],
+        }
+        sent = False
+        status = []
+
+        async def receive():
+            nonlocal sent
+            if sent:
+                await asyncio.sleep(3600)
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+
+        await self.app(scope, receive, send)
+        return status[0]
+
+    async def close(self):
+        pass
+
+
+class HttpClient:
+    """Minimal keep-alive HTTP/1.1 client over asyncio streams."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.reader = self.writer = None
+
+    async def request(self, method, path, role, body):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n".encode()
+            + b"Authorization: " + _auth_header(role) + b"\r\n"
+            + f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+            + body
+        )
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding") == "chunked":
+            while True:
+                size = int((await self.reader.readline()).strip(), 16)
+                await self.reader.readexactly(size + 2)
+                if not size:
+                    break
+        else:
+            await self.reader.readexactly(int(headers.get("content-length", 0)))
+        return status
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def run_load(make_client, mix, patients, concurrency, duration, seed):
+    """Run ``concurrency`` closed-loop workers for ``duration`` seconds."""
+    names = [entry[0] for entry in mix]
+    weights = [entry[1] for entry in mix]
+    by_name = {entry[0]: entry for entry in mix}
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    deadline = time.perf_counter() + duration
+
+    async def worker(index):
+        rng = random.Random(seed + index)
+        client = make_client()
+        try:
+            while time.perf_counter() < deadline:
+                name = rng.choices(names, weights)[0]
+                _, _, role, method, path, body = by_name[name]
+                payload = json.dumps(body(rng)).encode() if body else b""
+                started = time.perf_counter()
+                status = await client.request(method, path(rng, max(patients, 1)), role, payload)
+                latencies[name].append(time.perf_counter() - started)
+                if status >= 400:
+                    errors[name] += 1
+        finally:
+            await client.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    endpoints = {}
+    for name in names:
+        samples = sorted(latencies[name])
+        endpoints[name] = {
+            "requests": len(samples),
+            "errors": errors[name],
+            "p50_ms": round(percentile(samples, 50) * 1000, 3),
+            "p95_ms": round(percentile(samples, 95) * 1000, 3),
+            "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        }
+    total = sum(result["requests"] for result in endpoints.values())
+    return {
+        "requests": total,
+        "errors": sum(errors.values()),
+        "seconds": round(wall, 3),
+        "requests_per_sec": round(total / wall, 1) if wall else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+def main():
+    """Entry point for ``python -m benchmarks.api_load``."""
+    parser = argparse.ArgumentParser(description="Load-test the HTTP API.")
+    parser.add_argument("--url", help="target a running server instead of the in-process app")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="read")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--patients", type=int, default=100_000)
+    parser.add_argument("--logs", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "hms_api_bench.db"))
+    parser.add_argument("--out", help="write the JSON report here")
+    args = parser.parse_args()
+
+    if args.url:
+        report = asyncio.run(run_load(lambda: HttpClient(args.url), MIXES[args.mix],
+                                      args.patients, args.concurrency, args.duration, args.seed))
+    else:
+        build_dataset(args.db, args.patients, args.logs, seed=args.seed)
+        import api
+        # The mixed mix writes; each run starts from the same untouched dataset.
+        with working_copy(args.db):
+            report = asyncio.run(run_load(lambda: InProcessClient(api.app), MIXES[args.mix],
+                                          args.patients, args.concurrency, args.duration,
+                                          args.seed))
+            # Same as the lifespan shutdown: drain queued audit events, then the workers.
+            api.flush_audit_log()
+            api._executor.shutdown(wait=True)
+    report["meta"] = {
+        "target": args.url or "in-process", "mix": args.mix,
+        "concurrency": args.concurrency, "patients": args.patients, "logs": args.logs,
+    }
+
+    print(f"{report['requests']} requests in {report['seconds']}s "
+          f"-> {report['requests_per_sec']:,.1f} req/s ({report['errors']} errors)")
+    for name, result in report["endpoints"].items():
+        print(f"  {name:<20} {result['requests']:>7} req  p50 {result['p50_ms']:>8.3f} ms  "
+              f"p95 {result['p95_ms']:>8.3f} ms  p99 {result['p99_ms']:>8.3f} ms  "
+              f"errors {result['errors']}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
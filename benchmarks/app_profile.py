@@ -0,0 +1,163 @@
+"""
+Cold-start and per-rerun cost of the Streamlit app, per role.
+
+Each role is profiled in a fresh interpreter, so nothing is warm from an
+earlier role. The child process:
+
+1. imports Streamlit's test harness (timed separately as the framework floor);
+2. renders the login page (cold start: app imports plus the first run);
+3. logs in and renders the role's landing page (first dashboard run);
+4. reruns every page of the role ``--reruns`` times and records wall and CPU
+   time per rerun.
+
+Scripts are compiled once and cached, as in the server, so compile cost is
+part of the cold start and first dashboard, not of every rerun. The list of
+compiled scripts shows which page code each role loaded. Pass ``--app`` to
+profile another entry script, such as an older ``main.py`` copied next to the
+current one.
+
+Usage:
+    python -m benchmarks.app_profile --patients 20000 --logs 100000
+    python -m benchmarks.app_profile --app main_before.py --out before.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.api_load import CREDENTIALS
+from benchmarks.dashboard_load import share_script_cache
+from benchmarks.datagen import build_dataset, working_copy
+from instrumentation import percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _page_scripts(at):
+    """Page scripts registered by ``st.navigation`` on the last run (empty for one-file apps)."""
+    pages = getattr(at, "_registered_pages", None) or {}
+    return sorted(
+        os.path.relpath(info["script_path"], ROOT)
+        for info in pages.values() if info.get("script_path")
+    )
+
+
+def profile_role(app, role, reruns, timeout):
+    """Runs in the child process; returns the measurements for one role."""
+    started = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    framework_ms = (time.perf_counter() - started) * 1000
+    script_cache = share_script_cache()
+
+    at = AppTest.from_file(os.path.join(ROOT, app), default_timeout=timeout)
+    started = time.perf_counter()
+    at.run()
+    cold_start_ms = (time.perf_counter() - started) * 1000
+
+    username, password = CREDENTIALS[role]
+    at.text_input(key="login_username").input(username)
+    at.text_input(key="login_password").input(password)
+    at.button(key="login_btn").click()
+    started = time.perf_counter()
+    at.run()
+    first_dashboard_ms = (time.perf_counter() - started) * 1000
+
+    pages = _page_scripts(at) or [None]
+    wall = []
+    cpu = []
+    per_page = {}
+    for page in pages:
+        if page:
+            at.switch_page(page)
+        at.run()  # land on the page; steady-state reruns follow
+        page_wall = []
+        for _ in range(reruns):
+            wall_started, cpu_started = time.perf_counter(), time.process_time()
+            at.run()
+            page_wall.append(time.perf_counter() - wall_started)
+            cpu.append(time.process_time() - cpu_started)
+        wall.extend(page_wall)
+        per_page[page or app] = round(percentile(sorted(page_wall), 50) * 1000, 3)
+
+    wall.sort()
+    cpu.sort()
+    return {
+        "role": role,
+        "framework_import_ms": round(framework_ms, 3),
+        "cold_start_ms": round(cold_start_ms, 3),
+        "first_dashboard_ms": round(first_dashboard_ms, 3),
+        "rerun_p50_ms": round(percentile(wall, 50) * 1000, 3),
+        "rerun_p95_ms": round(percentile(wall, 95) * 1000, 3),
+        "rerun_cpu_p50_ms": round(percentile(cpu, 50) * 1000, 3),
+        "page_rerun_p50_ms": per_page,
+        "exceptions": [e.message for e in at.exception],
+        "scripts_compiled": sorted(os.path.relpath(path, ROOT) for path in script_cache._cache),
+        "pages": pages if pages != [None] else [],
+    }
+
+
+def run_child(app, role, reruns, db, timeout):
+    env = dict(os.environ, HMS_DB=db, PYTHONPATH=os.pathsep.join(
+        filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.app_profile", "--child", role, "--app", app,
+         "--reruns", str(reruns), "--timeout", str(timeout)],
+        capture_output=True, text=True, env=env, cwd=ROOT, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    """Entry point for ``python -m benchmarks.app_profile``."""
+    parser = argparse.ArgumentParser(description="Profile app cold start and rerun cost.")
+    parser.add_argument("--app", default="main.py", help="entry script, relative to the repo")
+    parser.add_argument("--roles", default="admin,doctor,receptionist")
+    parser.add_argument("--reruns", type=int, default=20, help="steady-state reruns per page")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--patients", type=int, default=20_000)
+    parser.add_argument("--logs", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "hms_profile_bench.db"))
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(profile_role(args.app, args.child, args.reruns, args.timeout)))
+        return
+
+    build_dataset(args.db, args.patients, args.logs, seed=args.seed)
+    results = []
+    for role in args.roles.split(","):
+        # Logins and page views are audited; each role starts from the same data.
+        with working_copy(args.db) as db:
+            results.append(run_child(args.app, role, args.reruns, db, args.timeout))
+
+    print(f"{args.app}: cold start and rerun cost per role "
+          f"({args.patients} patients, {args.logs} log rows)")
+    for result in results:
+        print(f"  {result['role']:<13} cold start {result['cold_start_ms']:>8.1f} ms  "
+              f"first dashboard {result['first_dashboard_ms']:>8.1f} ms  "
+              f"rerun p50 {result['rerun_p50_ms']:>7.1f} ms (cpu {result['rerun_cpu_p50_ms']:>6.1f})  "
+              f"p95 {result['rerun_p95_ms']:>7.1f} ms")
+        for page, p50 in result["page_rerun_p50_ms"].items():
+            print(f"      {page:<32} rerun p50 {p50:>7.1f} ms")
+        print(f"      scripts compiled: {', '.join(result['scripts_compiled'])}")
+        if result["exceptions"]:
+            print(f"      exception: {result['exceptions'][0]}")
+    if results:
+        print(f"  (Streamlit test harness import: {results[0]['framework_import_ms']:.0f} ms, "
+              "not included above)")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as handle:
+            json.dump({"meta": {"app": args.app, "patients": args.patients, "logs": args.logs,
+                                "reruns": args.reruns}, "roles": results}, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,418 @@
+"""
+Multi-session load test for the Streamlit dashboards (``main.py``).
+
+Every simulated user is a headless ``streamlit.testing.v1.AppTest`` session
+on its own thread, all against one seeded database in one process. A session
+logs in, then repeats its role's flow (browse, filter, add, edit, audit
+review, switching pages as needed) with optional think time until the time is
+up.
+
+AppTest installs a process-global Runtime for every run, so two runs cannot
+overlap. Reruns therefore go through one runner at a time, and a rerun's
+latency includes its wait for that runner. This models a GIL-bound
+``streamlit run`` process, where Python work from all sessions is serialized
+too. It is an upper bound: real sessions overlap while SQLite releases the GIL.
+AppTest also builds a fresh script cache per run, which would recompile the
+scripts on every rerun. The harness shares one cache across runs instead,
+as the server does (see ``share_script_cache``).
+
+For each session count it reports:
+
+* rerun latency per role and per step (p50/p95/p99), split into service time
+  and queue wait;
+* DB time share: the SQL time of the ``dashboard.<role>`` spans divided by
+  that role's rerun service time;
+* peak RSS of the process, so memory per session can be read off.
+
+Pass several session counts (``--sessions 1,4,16``) to see where latency
+starts to degrade.
+
+Usage:
+    python -m benchmarks.dashboard_load --sessions 1,4,8,16 --duration 30
+    python -m benchmarks.dashboard_load --mix admin=1,doctor=6,receptionist=3 --think 1.0
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import instrumentation
+from benchmarks.api_load import CREDENTIALS
+from benchmarks.datagen import DIAGNOSES, build_dataset, working_copy
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+SEARCH_TERMS = ("anon_", "555", "smith", "1", "asthma")
+AUDIT_SEARCH_TERMS = ("login", "patient", "edited", "bed")
+# AppTest swaps a process-global Runtime per run; see the module docstring.
+_runner_lock = threading.Lock()
+
+
+def _rss_bytes():
+    """Current resident set size, where ``/proc`` is available."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _peak_rss_bytes():
+    """High-water RSS of the process (``ru_maxrss``), where supported."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RssSampler:
+    """Polls RSS in the background and keeps the maximum seen."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = _rss_bytes() or 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="hms-rss", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, _rss_bytes() or 0)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+# ---------------------------
+# Flows
+# ---------------------------
+# Each step sets widgets on the session; the harness then times ``at.run()``.
+def _fill(at, values):
+    for key, value in values.items():
+        at.text_input(key=key).input(value)
+
+
+def _new_patient(rng):
+    return (f"Load Session {rng.randrange(10**9)}", f"555-{rng.randrange(10**4):04d}",
+            rng.choice(DIAGNOSES))
+
+
+def _pick(at, key, rng):
+    """Select a random option of a selectbox; False if it is not on the page."""
+    try:
+        box = at.selectbox(key=key)
+    except KeyError:
+        return False
+    if not box.options:
+        return False
+    box.set_value(box.options[rng.randrange(len(box.options))])
+    return True
+
+
+def admin_audit_review(at, rng):
+    _pick(at, "audit_role_filter", rng)
+    at.text_input(key="audit_action_filter").input("")
+
+
+def admin_audit_search(at, rng):
+    at.text_input(key="audit_action_filter").input(rng.choice(AUDIT_SEARCH_TERMS))
+
+
+def admin_add(at, rng):
+    name, contact, diagnosis = _new_patient(rng)
+    _fill(at, {"admin_add_name": name, "admin_add_contact": contact,
+               "admin_add_diagnosis": diagnosis})
+    at.button(key="admin_add_btn").click()
+
+
+def admin_edit(at, rng):
+    # Half of the edits find the patient by id prefix instead of on the roster page.
+    lookup = str(rng.randrange(1, 100)) if rng.random() < 0.5 else ""
+    at.text_input(key="admin_edit_lookup").input(lookup)
+    rerun(at)
+    if _pick(at, "admin_edit_select", rng):
+        rerun(at)  # the edit fields follow the selected patient
+        at.text_input(key="admin_edit_contact").input(f"555-{rng.randrange(10**4):04d}")
+        at.button(key="admin_update_btn").click()
+
+
+def doctor_filter(at, rng):
+    _pick(at, "doctor_diagnosis_filter", rng)
+    at.text_input(key="doctor_search").input("")
+
+
+def doctor_search(at, rng):
+    at.text_input(key="doctor_search").input(rng.choice(SEARCH_TERMS))
+
+
+def receptionist_add(at, rng):
+    name, contact, diagnosis = _new_patient(rng)
+    _fill(at, {"rec_add_name": name, "rec_add_contact": contact,
+               "rec_add_diagnosis": diagnosis})
+    at.button(key="rec_add_btn").click()
+
+
+def receptionist_edit(at, rng):
+    if _pick(at, "rec_edit_select", rng):
+        name, contact, diagnosis = _new_patient(rng)
+        _fill(at, {"rec_edit_name": name, "rec_edit_contact": contact,
+                   "rec_edit_diagnosis": diagnosis})
+        at.button(key="rec_update_btn").click()
+
+
+def browse(at, rng):
+    pass
+
+
+# role -> [(step name, weight, action, page script or None for the landing page)]
+FLOWS = {
+    "admin": [
+        ("browse", 30, browse, "views/admin_overview.py"),
+        ("audit review", 30, admin_audit_review, "views/admin_audit.py"),
+        ("audit search", 15, admin_audit_search, "views/admin_audit.py"),
+        ("add patient", 10, admin_add, "views/admin_manage.py"),
+        ("edit patient", 15, admin_edit, "views/admin_manage.py"),
+    ],
+    "doctor": [
+        ("browse", 30, browse, None),
+        ("diagnosis filter", 40, doctor_filter, None),
+        ("search", 30, doctor_search, None),
+    ],
+    "receptionist": [
+        ("browse", 45, browse, None),
+        ("add patient", 30, receptionist_add, None),
+        ("edit patient", 25, receptionist_edit, None),
+    ],
+}
+
+
+def rerun(at):
+    """Rerun a session; returns (seconds queued for the runner, seconds running)."""
+    queued = time.perf_counter()
+    with _runner_lock:
+        started = time.perf_counter()
+        at.run()
+        return started - queued, time.perf_counter() - started
+
+
+def open_session(timeout):
+    """A fresh AppTest session on the login page."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    rerun(at)
+    return at
+
+
+def share_script_cache():
+    """Give all AppTest runs one compiled-script cache, like a server process.
+
+    AppTest otherwise recompiles the entry script and page, and re-applies
+    Streamlit's magic pass, on every run. The server pays that once per
+    process, so leaving it in would inflate rerun times by the script's
+    compile cost. Returns the shared cache.
+    """
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    cache = ScriptCache()
+    # The runner compiles the entry script, the pages manager compiles pages.
+    local_script_runner.ScriptCache = app_test.ScriptCache = lambda: cache
+    return cache
+
+
+def login(at, role):
+    username, password = CREDENTIALS[role]
+    at.text_input(key="login_username").input(username)
+    at.text_input(key="login_password").input(password)
+    at.button(key="login_btn").click()
+
+
+# ---------------------------
+# Runner
+# ---------------------------
+def assign_roles(mix, sessions):
+    """Spread ``sessions`` over roles in proportion to the ``mix`` weights."""
+    total = sum(mix.values())
+    quotas = {role: sessions * weight / total for role, weight in mix.items()}
+    counts = {role: int(quota) for role, quota in quotas.items()}
+    leftovers = sorted(quotas, key=lambda role: quotas[role] - counts[role], reverse=True)
+    for role in leftovers[: sessions - sum(counts.values())]:
+        counts[role] += 1
+    return [role for role, count in counts.items() for _ in range(count)]
+
+
+def run_sessions(roles, duration, think, seed, timeout):
+    """Run one AppTest session per entry of ``roles`` until ``duration`` elapses."""
+    samples = {}
+    errors = {}
+    lock = threading.Lock()
+    start = threading.Barrier(len(roles) + 1)
+    deadline = [0.0]
+
+    def timed_run(at, role, step):
+        waited, ran = rerun(at)
+        failures = [e.message for e in at.exception]
+        with lock:
+            samples.setdefault((role, step), []).append((waited + ran, ran))
+            if failures:
+                errors.setdefault(role, []).append(f"{step}: {failures[0]}")
+
+    def session(index, role):
+        rng = random.Random(seed + index)
+        steps = FLOWS[role]
+        names = [step[0] for step in steps]
+        weights = [step[1] for step in steps]
+        actions = {step[0]: step[2] for step in steps}
+        pages = {step[0]: step[3] for step in steps}
+        current_page = None
+        at = open_session(timeout)
+        start.wait()
+        login(at, role)
+        timed_run(at, role, "login")
+        while time.perf_counter() < deadline[0]:
+            if think:
+                time.sleep(rng.uniform(0, 2 * think))
+            name = rng.choices(names, weights)[0]
+            try:
+                if pages[name] and pages[name] != current_page:
+                    at.switch_page(pages[name])
+                    timed_run(at, role, "navigate")
+                    current_page = pages[name]
+                actions[name](at, rng)
+            except (KeyError, ValueError, IndexError) as exc:
+                # A widget the flow expected is missing: count it, start over.
+                with lock:
+                    errors.setdefault(role, []).append(f"{name}: {exc!r}")
+                at = open_session(timeout)
+                login(at, role)
+                name, current_page = "login", None
+            timed_run(at, role, name)
+
+    threads = [threading.Thread(target=session, args=(index, role), daemon=True)
+               for index, role in enumerate(roles)]
+    for thread in threads:
+        thread.start()
+    baseline_rss = _rss_bytes()
+    instrumentation.reset()
+    with RssSampler() as sampler:
+        deadline[0] = time.perf_counter() + duration
+        started = time.perf_counter()
+        start.wait()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+
+    spans = {row["span"]: row for row in instrumentation.span_report()}
+    report = {"sessions": len(roles), "seconds": round(wall, 3), "roles": {}}
+    for role in sorted(set(roles)):
+        steps = {step: runs for (owner, step), runs in samples.items() if owner == role}
+        latencies = sorted(total for runs in steps.values() for total, _ in runs)
+        service_ms = sum(ran for runs in steps.values() for _, ran in runs) * 1000
+        dashboard = spans.get(f"dashboard.{role}", {})
+        report["roles"][role] = {
+            "sessions": roles.count(role),
+            "reruns": len(latencies),
+            "p50_ms": round(instrumentation.percentile(latencies, 50) * 1000, 3),
+            "p95_ms": round(instrumentation.percentile(latencies, 95) * 1000, 3),
+            "p99_ms": round(instrumentation.percentile(latencies, 99) * 1000, 3),
+            "service_ms_mean": round(service_ms / len(latencies), 3) if latencies else 0.0,
+            "db_share": round(dashboard.get("sql_ms", 0.0) / service_ms, 3) if service_ms else 0.0,
+            "errors": len(errors.get(role, [])),
+            "first_error": (errors.get(role) or [None])[0],
+            "steps": {
+                step: {
+                    "reruns": len(runs),
+                    "p50_ms": round(instrumentation.percentile(sorted(t for t, _ in runs), 50) * 1000, 3),
+                    "p95_ms": round(instrumentation.percentile(sorted(t for t, _ in runs), 95) * 1000, 3),
+                    "service_p50_ms": round(instrumentation.percentile(sorted(r for _, r in runs), 50) * 1000, 3),
+                }
+                for step, runs in sorted(steps.items())
+            },
+        }
+    report["reruns_per_sec"] = round(
+        sum(role["reruns"] for role in report["roles"].values()) / wall, 1) if wall else 0.0
+    report["rss_baseline_mb"] = round(baseline_rss / 2**20, 1) if baseline_rss else None
+    peak = sampler.peak or _peak_rss_bytes()
+    report["rss_peak_mb"] = round(peak / 2**20, 1) if peak else None
+    return report
+
+
+def parse_mix(text):
+    """``admin=1,doctor=6,receptionist=3`` -> ``{"admin": 1, ...}``."""
+    mix = {}
+    for part in text.split(","):
+        role, _, weight = part.partition("=")
+        if role.strip() not in FLOWS:
+            raise argparse.ArgumentTypeError(f"unknown role {role.strip()!r}")
+        mix[role.strip()] = int(weight or 1)
+    return mix
+
+
+def print_report(report):
+    rss = report["rss_peak_mb"]
+    print(f"\n{report['sessions']} sessions, {report['seconds']}s: "
+          f"{report['reruns_per_sec']:,.1f} reruns/s, peak RSS {rss} MB "
+          f"(baseline {report['rss_baseline_mb']} MB)")
+    for role, result in report["roles"].items():
+        print(f"  {role:<13} x{result['sessions']:<3} {result['reruns']:>6} reruns  "
+              f"p50 {result['p50_ms']:>8.1f} ms  p95 {result['p95_ms']:>8.1f} ms  "
+              f"p99 {result['p99_ms']:>8.1f} ms  service {result['service_ms_mean']:>7.1f} ms  "
+              f"db {result['db_share']:>6.1%}  errors {result['errors']}")
+        for step, step_result in result["steps"].items():
+            print(f"      {step:<18} {step_result['reruns']:>6}  "
+                  f"p50 {step_result['p50_ms']:>8.1f} ms  p95 {step_result['p95_ms']:>8.1f} ms  "
+                  f"service p50 {step_result['service_p50_ms']:>7.1f} ms")
+        if result["first_error"]:
+            print(f"      first error: {result['first_error']}")
+
+
+def main():
+    """Entry point for ``python -m benchmarks.dashboard_load``."""
+    parser = argparse.ArgumentParser(description="Load-test the Streamlit dashboards.")
+    parser.add_argument("--sessions", default="1,4,8",
+                        help="comma-separated session counts, run one after another")
+    parser.add_argument("--mix", type=parse_mix, default="admin=1,doctor=2,receptionist=2",
+                        help="role weights, e.g. admin=1,doctor=6,receptionist=3")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per level")
+    parser.add_argument("--think", type=float, default=0.0,
+                        help="mean think time between steps in seconds (0 = closed loop)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-rerun timeout")
+    parser.add_argument("--patients", type=int, default=20_000)
+    parser.add_argument("--logs", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "hms_dashboard_bench.db"))
+    parser.add_argument("--out", help="write the JSON report here")
+    args = parser.parse_args()
+
+    build_dataset(args.db, args.patients, args.logs, seed=args.seed)
+    share_script_cache()
+    levels = [int(count) for count in args.sessions.split(",")]
+    reports = []
+    for sessions in levels:
+        # Sessions add and edit patients; every level starts from the same data.
+        with working_copy(args.db):
+            report = run_sessions(assign_roles(args.mix, sessions), args.duration,
+                                  args.think, args.seed, args.timeout)
+        print_report(report)
+        reports.append(report)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as handle:
+            json.dump({"meta": {"mix": args.mix, "think": args.think, "patients": args.patients,
+                                "logs": args.logs, "db": args.db},
+                       "levels": reports}, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
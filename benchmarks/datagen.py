@@ -0,0 +1,204 @@
+"""
+Deterministic synthetic data for benchmarks.
+
+The same ``seed`` and counts always produce byte-identical rows, so timings
+from different commits are measured against the same data. Anonymized names
+are derived from the seed rather than the installation's pseudonym key to keep
+datasets reproducible across machines. Benchmarks write to the database, so
+they run on a ``working_copy`` and the reusable dataset is never modified.
+"""
+
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import database
+from masking import token_for
+
+DIAGNOSES = [
+    "Hypertension", "Type 2 diabetes", "Asthma", "Migraine", "Influenza",
+    "Pneumonia", "Bronchitis", "Anemia", "Hypothyroidism", "Osteoarthritis",
+    "Rheumatoid arthritis", "Gastritis", "GERD", "Appendicitis", "Kidney stones",
+    "Urinary tract infection", "Dermatitis", "Psoriasis", "Depression", "Anxiety",
+    "Insomnia", "Coronary artery disease", "Heart failure", "Atrial fibrillation",
+    "Stroke", "Epilepsy", "COPD", "Sinusitis", "Tonsillitis", "Otitis media",
+    "Conjunctivitis", "Glaucoma", "Cataract", "Hepatitis B", "Cirrhosis",
+    "Pancreatitis", "Celiac disease", "Lupus", "Gout", "Osteoporosis",
+]
+FIRST_NAMES = [
+    "Amir", "Bilal", "Chen", "Dana", "Elena", "Farah", "Gita", "Hassan", "Ines",
+    "Jonas", "Kira", "Liam", "Maya", "Nadia", "Omar", "Priya", "Quinn", "Rosa",
+    "Sami", "Tara", "Umar", "Vera", "Wen", "Yusuf", "Zara",
+]
+LAST_NAMES = [
+    "Ahmed", "Baker", "Costa", "Diaz", "Evans", "Fischer", "Garcia", "Hussain",
+    "Ito", "Jensen", "Khan", "Lopez", "Mir", "Nakamura", "Okafor", "Patel",
+    "Qureshi", "Rossi", "Silva", "Tanaka", "Usman", "Varga", "Wong", "Young",
+]
+ACTION_WEIGHTS = {
+    "login": 40, "add_patient": 25, "edit_patient": 20, "delete_patient": 5,
+    "bulk_add_patients": 1, "view_roster": 9,
+}
+ROLE_WEIGHTS = {"admin": 2, "doctor": 5, "receptionist": 3}
+ROLE_USER_IDS = {"admin": 1, "doctor": 2, "receptionist": 3}
+EPOCH = datetime(2024, 1, 1)
+
+
+def diagnosis_weights(distribution="zipf", skew=1.1, custom=None):
+    """Return ``(labels, weights)`` for the requested diagnosis distribution.
+
+    ``uniform`` spreads patients evenly, ``zipf`` gives rank ``k`` a weight of
+    ``1 / k**skew`` (a few very common diagnoses and a long tail), and
+    ``custom`` uses an explicit ``{diagnosis: weight}`` mapping.
+    """
+    if distribution == "custom":
+        if not custom:
+            raise ValueError("custom distribution needs a {diagnosis: weight} mapping")
+        return list(custom), [float(w) for w in custom.values()]
+    if distribution == "uniform":
+        return list(DIAGNOSES), [1.0] * len(DIAGNOSES)
+    if distribution == "zipf":
+        return list(DIAGNOSES), [1.0 / (rank ** skew) for rank in range(1, len(DIAGNOSES) + 1)]
+    raise ValueError(f"Unknown diagnosis distribution: {distribution}")
+
+
+def iter_patients(count, seed, labels, weights, days=730):
+    """Yield ``patients`` rows (without ``patient_id``) deterministically."""
+    rng = random.Random(seed)
+    for index in range(count):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {index}"
+        contact = f"555-{rng.randrange(10_000_000):07d}"
+        digest = hashlib.sha256(f"{seed}:{index}".encode()).hexdigest()
+        date_added = (EPOCH + timedelta(days=index * days // max(count, 1))).strftime("%Y-%m-%d")
+        yield (
+            name,
+            contact,
+            rng.choices(labels, weights)[0],
+            token_for(digest),
+            "XXX-XXX-" + contact[-4:],
+            date_added,
+        )
+
+
+def iter_logs(count, seed, days=730):
+    """Yield ``logs`` rows (without ``log_id``) in timestamp order."""
+    rng = random.Random(seed + 1)
+    actions, action_weights = list(ACTION_WEIGHTS), list(ACTION_WEIGHTS.values())
+    roles, role_weights = list(ROLE_WEIGHTS), list(ROLE_WEIGHTS.values())
+    span = days * 86400
+    for index in range(count):
+        role = rng.choices(roles, role_weights)[0]
+        action = rng.choices(actions, action_weights)[0]
+        timestamp = EPOCH + timedelta(seconds=index * span // max(count, 1))
+        yield (
+            ROLE_USER_IDS[role],
+            role,
+            action,
+            timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+            f"{action} by {role} #{rng.randrange(1_000_000)}",
+        )
+
+
+def _insert(conn, sql, rows, chunk):
+    total = 0
+    while True:
+        batch = [row for _, row in zip(range(chunk), rows)]
+        if not batch:
+            return total
+        conn.executemany(sql, batch)
+        conn.commit()
+        total += len(batch)
+
+
+def _insert_logs(conn, rows, chunk):
+    """Like ``_insert``, but through ``append_logs`` so the rows are hash-chained."""
+    total = 0
+    while True:
+        batch = [row for _, row in zip(range(chunk), rows)]
+        if not batch:
+            return total
+        conn.execute("BEGIN IMMEDIATE")
+        database.append_logs(conn, batch)
+        conn.commit()
+        total += len(batch)
+
+
+def build_dataset(db_path, patients, logs, seed=42, distribution="zipf", skew=1.1,
+                  custom=None, chunk=50_000, reuse=True):
+    """Create (or reuse) a benchmark database and return its dataset spec.
+
+    The spec is stored next to the database as ``<db>.spec.json``; with
+    ``reuse`` an existing database built from the same spec is kept, which
+    saves minutes when benchmarking against tens of millions of rows. Time
+    anything that writes on a ``working_copy`` so the kept file stays as built.
+    """
+    spec = {
+        "patients": patients, "logs": logs, "seed": seed,
+        "distribution": distribution, "skew": skew, "custom": custom,
+        "schema_version": database.SCHEMA_VERSION,
+    }
+    spec_path = db_path + ".spec.json"
+    if reuse and os.path.exists(db_path) and os.path.exists(spec_path):
+        with open(spec_path, encoding="utf-8") as handle:
+            if json.load(handle) == spec:
+                database.DB_NAME = db_path
+                return spec
+
+    for suffix in ("", "-wal", "-shm", ".spec.json"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    database.DB_NAME = db_path
+    database.migrate()
+    labels, weights = diagnosis_weights(distribution, skew, custom)
+    with database.pooled_connection() as conn:
+        database.ensure_diagnoses(conn, labels)
+        _insert(conn, """
+            INSERT INTO patients (name, contact, diagnosis, anonymized_name, anonymized_contact,
+                                  date_added, diagnosis_id)
+            VALUES (?1, ?2, ?3, ?4, ?5, ?6, (SELECT diagnosis_id FROM diagnoses WHERE name = ?3))
+        """, iter_patients(patients, seed, labels, weights), chunk)
+        _insert_logs(conn, iter_logs(logs, seed), chunk)
+        conn.execute("PRAGMA optimize")
+
+    with open(spec_path, "w", encoding="utf-8") as handle:
+        json.dump(spec, handle)
+    return spec
+
+
+@contextmanager
+def working_copy(db_path):
+    """Copy the dataset at ``db_path`` to a scratch file and point ``database`` at it.
+
+    Write scenarios add patients and audit rows; running them on a throwaway
+    copy keeps every run, and every commit compared, on the dataset exactly as
+    ``build_dataset`` made it. The copy is deleted on exit.
+    """
+    handle, work_path = tempfile.mkstemp(
+        suffix=".db", prefix=os.path.basename(db_path) + ".",
+        dir=os.path.dirname(os.path.abspath(db_path)),
+    )
+    os.close(handle)
+    source = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+    target = sqlite3.connect(work_path)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+
+    previous = database.DB_NAME
+    database.DB_NAME = work_path
+    try:
+        yield work_path
+    finally:
+        database.flush_audit_log()
+        database.DB_NAME = previous
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(work_path + suffix):
+                os.remove(work_path + suffix)
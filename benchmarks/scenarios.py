@@ -0,0 +1,109 @@
+"""
+Timed scenarios for the public database functions.
+
+Each scenario is a zero-argument callable run ``iterations`` times after a
+short warm-up; per-call latencies are collected with ``perf_counter`` and
+summarized as p50/p95/p99 plus throughput. Read scenarios come in ``cached``
+and ``uncached`` flavours because the read cache would otherwise turn every
+repeat into a dictionary lookup.
+"""
+
+import random
+import statistics
+import time
+
+import database
+from instrumentation import percentile
+
+MAX_FULL_SCAN_ROWS = 200_000  # full-table scenarios are skipped above this size
+
+
+def time_scenario(func, iterations, warmup=3):
+    """Run ``func`` repeatedly and summarize its latency distribution."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - call_started)
+    wall = time.perf_counter() - started
+    samples.sort()
+    return {
+        "iterations": iterations,
+        "p50_ms": round(percentile(samples, 50) * 1000, 4),
+        "p95_ms": round(percentile(samples, 95) * 1000, 4),
+        "p99_ms": round(percentile(samples, 99) * 1000, 4),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 4),
+        "max_ms": round(samples[-1] * 1000, 4),
+        "throughput_ops": round(iterations / wall, 2) if wall else 0.0,
+    }
+
+
+def build_scenarios(spec, seed=7):
+    """Scenario name -> callable for the dataset described by ``spec``."""
+    rng = random.Random(seed)
+    max_id = max(spec["patients"], 1)
+    scenarios = {}
+
+    def add_patient():
+        index = rng.randrange(1_000_000)
+        database.add_patient(f"Bench Patient {index}", f"555-{index:07d}", "Influenza",
+                             f"ANON_bench{index}", f"XXX-XXX-{index % 10000:04d}")
+
+    def add_patient_audited():
+        index = rng.randrange(1_000_000)
+        with database.transaction():
+            database.add_patient(f"Bench Patient {index}", f"555-{index:07d}", "Influenza",
+                                 f"ANON_bench{index}", f"XXX-XXX-{index % 10000:04d}")
+            database.log_action(1, "admin", "add_patient", f"bench {index}")
+
+    scenarios["add_patient"] = add_patient
+    scenarios["add_patient+log_action (transaction)"] = add_patient_audited
+    scenarios["log_action (enqueue)"] = lambda: database.log_action(
+        2, "doctor", "view_roster", "bench"
+    )
+
+    def log_action_durable():
+        database.log_action(2, "doctor", "view_roster", "bench")
+        database.flush_audit_log()
+
+    scenarios["log_action+flush"] = log_action_durable
+    scenarios["authenticate_user"] = lambda: database.authenticate_user("DrBob", "doc123")
+    scenarios["authenticate_user (bad password)"] = lambda: database.authenticate_user(
+        "DrBob", "wrong"
+    )
+
+    def random_page():
+        return database.get_patients_page.uncached(after_id=rng.randrange(max_id))
+
+    scenarios["get_patients_page (uncached)"] = random_page
+    scenarios["get_patients_page (cached)"] = lambda: database.get_patients_page()
+    scenarios["get_dashboard_stats"] = database.get_dashboard_stats.uncached
+    scenarios["get_logs role+limit (uncached)"] = lambda: database.get_logs.uncached(
+        role=rng.choice(["admin", "doctor", "receptionist"]), limit=200
+    )
+    scenarios["get_logs role+limit (cached)"] = lambda: database.get_logs(role="doctor", limit=200)
+    scenarios["count_logs action"] = lambda: database.count_logs.uncached(action="login")
+
+    if spec["patients"] <= MAX_FULL_SCAN_ROWS:
+        scenarios["get_all_patients (uncached)"] = database.get_all_patients.uncached
+    if spec["logs"] <= MAX_FULL_SCAN_ROWS:
+        scenarios["get_logs all (uncached)"] = database.get_logs.uncached
+    return scenarios
+
+
+def run_scenarios(spec, iterations, only=None):
+    """Time every scenario (or those whose name contains one of ``only``)."""
+    results = {}
+    for name, func in build_scenarios(spec).items():
+        if only and not any(term in name for term in only):
+            continue
+        heavy = "all (" in name
+        results[name] = time_scenario(func, max(3, iterations // 20) if heavy else iterations)
+        print(f"  {name:<42} p50 {results[name]['p50_ms']:>9.3f} ms   "
+              f"p99 {results[name]['p99_ms']:>9.3f} ms   "
+              f"{results[name]['throughput_ops']:>10.1f} ops/s")
+    database.flush_audit_log()
+    return results
@@ -1,142 +1,2744 @@
+import atexit
+import csv
+import functools
+from collections import OrderedDict
+import gzip
+import hashlib
+import heapq
+import hmac
+import io
+import json
+import logging
+import multiprocessing
+import os
+import re
 import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager, suppress
 from datetime import datetime
-DB_NAME = "hospital.db"
+from operator import itemgetter
+from queue import Empty, Full, LifoQueue, Queue
+
+try:
+    import fcntl
+except ImportError:  # Windows: the audit spill file is only guarded within one process
+    fcntl = None
+
+import instrumentation
+from roster import Roster
+from masking import (
+    TOKEN_LENGTH,
+    TOKEN_PREFIX,
+    load_pseudonym_key,
+    mask_patients,
+    normalize_token,
+    pseudonym_digest,
+    token_for,
+)
+
+DB_NAME = os.environ.get("HMS_DB", "hospital.db")
+
+# ---------------------------
+# CONNECTION POOL
+# ---------------------------
+POOL_SIZE = 8
+POOL_TIMEOUT = 10.0          # seconds a checkout may wait for a free connection
+BUSY_TIMEOUT_MS = 5000
+CACHE_SIZE_KB = 64 * 1024    # negative PRAGMA cache_size is expressed in KiB
+MMAP_SIZE = 256 * 1024 * 1024
+
+
+def _configure(conn, read_only=False):
+    """Apply the per-connection PRAGMAs once, when the connection is created."""
+    if read_only:
+        conn.execute("PRAGMA query_only=1")
+    else:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+
+
+class ConnectionPool:
+    """Bounded pool of long-lived SQLite connections.
+
+    A thread that already holds a connection gets the same one back on nested
+    checkouts, so helpers calling helpers share one connection (and one
+    transaction) instead of competing for the pool.
+    """
+
+    def __init__(self, db_name, size=POOL_SIZE, timeout=POOL_TIMEOUT, read_only=False):
+        self.db_name = db_name
+        self.read_only = read_only
+        self.size = size
+        self.timeout = timeout
+        self._idle = LifoQueue(maxsize=size)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = []
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._closed = False
+
+    def _create(self):
+        if self.read_only:
+            # mode=ro: SQLite itself refuses writes, and WAL readers never take
+            # the write lock, so a writer burst cannot make these reads fail.
+            conn = sqlite3.connect(
+                f"file:{os.path.abspath(self.db_name)}?mode=ro", uri=True,
+                check_same_thread=False, factory=instrumentation.TracedConnection,
+            )
+        else:
+            conn = sqlite3.connect(
+                self.db_name, check_same_thread=False, factory=instrumentation.TracedConnection
+            )
+        _configure(conn, self.read_only)
+        return conn
+
+    def acquire(self):
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            self._local.depth += 1
+            return held
+
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection pool is closed")
+
+        waited = 0.0
+        conn = None
+        try:
+            conn = self._idle.get_nowait()
+        except Empty:
+            with self._lock:
+                if len(self._all) < self.size:
+                    conn = self._create()
+                    self._all.append(conn)
+            if conn is None:
+                started = time.perf_counter()
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except Empty:
+                    raise sqlite3.OperationalError(
+                        f"Timed out after {self.timeout}s waiting for a database connection"
+                    ) from None
+                waited = time.perf_counter() - started
+
+        with self._lock:
+            self._checkouts += 1
+            if waited:
+                self._waits += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+
+    def release(self, conn):
+        if getattr(self._local, "conn", None) is not conn:
+            raise sqlite3.ProgrammingError("Connection was not checked out by this thread")
+        self._local.depth -= 1
+        if self._local.depth:
+            return
+        self._local.conn = None
+
+        # Never hand the next borrower somebody else's half-finished transaction.
+        if conn.in_transaction:
+            conn.rollback()
+        if self._closed:
+            conn.close()
+        else:
+            self._idle.put(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "db_name": self.db_name,
+                "size": self.size,
+                "open": len(self._all),
+                "idle": self._idle.qsize(),
+                "in_use": len(self._all) - self._idle.qsize(),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_total_ms": round(self._wait_total * 1000, 3),
+                "wait_max_ms": round(self._wait_max * 1000, 3),
+            }
+
+    def close(self):
+        """Close every idle connection; busy ones are closed when returned."""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                break
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide pool, rebuilding it if DB_NAME was repointed."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.db_name != DB_NAME:
+            if _pool is not None:
+                _pool.close()
+            _pool = ConnectionPool(DB_NAME)
+        return _pool
+
+
+def pool_stats():
+    """Pool size and checkout wait metrics for dashboards and diagnostics."""
+    return get_pool().stats()
+
+
+@contextmanager
+def pooled_connection():
+    """Borrow a pooled connection for the duration of a ``with`` block.
+
+    Inside ``read_source("readonly")`` or ``read_source("snapshot")`` reads go
+    to a ``mode=ro`` connection or the in-memory snapshot instead; a
+    ``transaction()`` always uses the read-write pool.
+    """
+    source = getattr(_read_source, "name", "primary")
+    if source == "snapshot" and not in_unit_of_work():
+        yield get_snapshot().connection()
+        return
+    pool = get_read_pool() if source == "readonly" and not in_unit_of_work() else get_pool()
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+
+class PooledConnection:
+    """Thin proxy whose ``close()`` hands the connection back to the pool."""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def close(self):
+        if self._conn is not None:
+            self._pool.release(self._conn)
+            self._conn = None
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
 
 def get_connection():
-    """Create a connection to the SQLite database."""
-    return sqlite3.connect(DB_NAME, check_same_thread=False)
+    """Check out a pooled connection; call ``close()`` to return it."""
+    pool = get_pool()
+    return PooledConnection(pool, pool.acquire())
+
+
+# ---------------------------
+# READ-ONLY CONNECTIONS
+# ---------------------------
+# Read-mostly dashboards can opt out of the read-write pool: "readonly" reads
+# the live file through mode=ro connections, "snapshot" reads an in-memory
+# copy of the roster tables, checked against the file at least every
+# SNAPSHOT_MAX_AGE seconds and rebuilt only when the patients changed.
+READ_POOL_SIZE = 8
+SNAPSHOT_MAX_AGE = float(os.environ.get("HMS_SNAPSHOT_MAX_AGE", "5"))
+READ_SOURCES = ("primary", "readonly", "snapshot")
+
+_read_source = threading.local()
+_read_pool = None
+_snapshot = None
+
+
+def get_read_pool():
+    """Return the process-wide ``mode=ro`` pool for the current DB_NAME."""
+    global _read_pool
+    with _pool_lock:
+        if _read_pool is None or _read_pool.db_name != DB_NAME:
+            if _read_pool is not None:
+                _read_pool.close()
+            _read_pool = ConnectionPool(DB_NAME, size=READ_POOL_SIZE, read_only=True)
+        return _read_pool
+
+
+@contextmanager
+def read_source(source):
+    """Serve this thread's reads from ``source`` for the duration of the block.
+
+        with read_source("snapshot"):
+            rows, total = get_patients_page()
+    """
+    if source not in READ_SOURCES:
+        raise ValueError(f"Unknown read source {source!r}; expected one of {READ_SOURCES}")
+    previous = getattr(_read_source, "name", "primary")
+    _read_source.name = source
+    try:
+        yield
+    finally:
+        _read_source.name = previous
+
+
+# Tables the snapshot readers touch: the patient roster, its FTS index and the
+# trigger-maintained counters. Credentials, pseudonyms and the audit log are
+# never copied into the long-lived in-memory database.
+SNAPSHOT_TABLES = (
+    "patients", "diagnoses", "patient_stats", "diagnosis_counts", "data_versions",
+    "patients_fts",
+)
+
+
+class Snapshot:
+    """In-memory copy of the roster tables, rebuilt when the patients change.
+
+    A rebuild attaches the file read-only and copies ``SNAPSHOT_TABLES`` (and
+    their indexes) into a brand-new in-memory connection inside one read
+    transaction, then swaps it in, so readers never wait on the copy. Readers
+    still holding the previous copy finish on it, and it is freed once they
+    drop it. Past half of ``max_age`` a background check compares the file's
+    ``patients`` version with the copy's and only rebuilds when they differ.
+    Only a copy that has gone unchecked for ``max_age`` makes a reader wait.
+    """
+
+    def __init__(self, db_name, max_age=SNAPSHOT_MAX_AGE):
+        self.db_name = db_name
+        self.max_age = max_age
+        self._conn = None
+        self._version = None
+        self._checked = 0.0
+        self._refresh_lock = threading.Lock()
+        self._refreshes = 0
+        self._unchanged = 0
+        self._last_refresh_ms = 0.0
+
+    def _source_version(self):
+        pool = get_read_pool()
+        conn = pool.acquire()
+        try:
+            return _data_versions(conn, ("patients",))
+        finally:
+            pool.release(conn)
+
+    def _copy_tables(self, copy):
+        copy.execute(
+            "ATTACH DATABASE ? AS src", (f"file:{os.path.abspath(self.db_name)}?mode=ro",)
+        )
+        try:
+            copy.execute("BEGIN")
+            marks = ", ".join("?" * len(SNAPSHOT_TABLES))
+            schema = copy.execute(
+                f"SELECT type, name, sql FROM src.sqlite_master WHERE tbl_name IN ({marks}) "
+                "AND type IN ('table', 'index') AND sql IS NOT NULL",
+                SNAPSHOT_TABLES,
+            ).fetchall()
+            # Tables first, an FTS5 table also creating its shadow tables, then
+            # indexes. With matching indexes on both sides and an empty target,
+            # INSERT ... SELECT copies b-tree records as they are instead of
+            # rebuilding each index.
+            for _, _, sql in sorted(schema, key=lambda entry: entry[0] != "table"):
+                copy.execute(sql)
+            tables = [name for (name,) in copy.execute(
+                "SELECT name FROM main.sqlite_master WHERE type = 'table' "
+                "AND sql NOT LIKE 'CREATE VIRTUAL%' AND name NOT LIKE 'sqlite_%'"
+            )]
+            for name in tables:
+                copy.execute(f'DELETE FROM main."{name}"')
+                copy.execute(f'INSERT INTO main."{name}" SELECT * FROM src."{name}"')
+            version = _data_versions(copy, ("patients",))
+            copy.commit()
+        finally:
+            if copy.in_transaction:
+                copy.rollback()
+            copy.execute("DETACH DATABASE src")
+        return version
+
+    def _refresh(self):
+        started = time.perf_counter()
+        checked = time.monotonic()
+        if self._conn is not None and self._source_version() == self._version:
+            self._checked = checked
+            self._unchanged += 1
+            return
+        copy = sqlite3.connect(
+            ":memory:", uri=True, check_same_thread=False,
+            factory=instrumentation.TracedConnection,
+        )
+        version = self._copy_tables(copy)
+        # The copy is shared by every reading thread. A trace callback needs
+        # the GIL while SQLite holds the connection mutex, and another thread
+        # can hold the GIL while waiting for that mutex: a deadlock.
+        copy.set_trace_callback(None)
+        copy.execute("PRAGMA query_only=1")
+        self._conn, self._version, self._checked = copy, version, checked
+        self._refreshes += 1
+        self._last_refresh_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    def _refresh_in_background(self):
+        try:
+            self._refresh()
+        finally:
+            self._refresh_lock.release()
+
+    def connection(self):
+        """Current in-memory copy, rebuilding it first if it went unchecked past ``max_age``."""
+        age = time.monotonic() - self._checked
+        if self._conn is None or age > self.max_age:
+            with self._refresh_lock:
+                if self._conn is None or time.monotonic() - self._checked > self.max_age:
+                    self._refresh()
+        elif age > self.max_age / 2 and self._refresh_lock.acquire(blocking=False):
+            threading.Thread(
+                target=self._refresh_in_background, name="snapshot-refresh", daemon=True
+            ).start()
+        return self._conn
+
+    def stats(self):
+        return {
+            "age_s": round(time.monotonic() - self._checked, 3) if self._conn else None,
+            "max_age_s": self.max_age,
+            "refreshes": self._refreshes,
+            "unchanged_checks": self._unchanged,
+            "last_refresh_ms": self._last_refresh_ms,
+        }
+
+
+def get_snapshot():
+    """Return the process-wide snapshot for the current DB_NAME."""
+    global _snapshot
+    with _pool_lock:
+        if _snapshot is None or _snapshot.db_name != DB_NAME:
+            _snapshot = Snapshot(DB_NAME)
+        return _snapshot
+
+
+def snapshot_stats():
+    return get_snapshot().stats()
+
+
+# ---------------------------
+# UNIT OF WORK
+# ---------------------------
+_unit_of_work = threading.local()
+
+
+def in_unit_of_work():
+    return getattr(_unit_of_work, "depth", 0) > 0
+
+
+def _commit(conn):
+    """Commit a helper's write unless it belongs to an enclosing ``transaction()``."""
+    if not in_unit_of_work():
+        conn.commit()
+
+
+@contextmanager
+def transaction():
+    """Group patient changes and their audit entries into one atomic write.
+
+        with transaction():
+            add_patient(...)
+            log_action(...)
+
+    Helpers called inside the block share this thread's pooled connection and
+    skip their own commits, and ``log_action`` writes inline instead of going
+    through the background writer. Everything commits once at the end (one
+    fsync) or rolls back together, so a change never lands without its audit
+    row. Nested blocks join the outermost one.
+    """
+    pool = get_pool()
+    conn = pool.acquire()
+    outermost = not in_unit_of_work()
+    try:
+        if outermost:
+            conn.execute("BEGIN IMMEDIATE")
+        _unit_of_work.depth = getattr(_unit_of_work, "depth", 0) + 1
+        try:
+            yield conn
+        finally:
+            _unit_of_work.depth -= 1
+        if outermost:
+            conn.commit()
+    except BaseException:
+        if outermost and conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        pool.release(conn)
+
+
+# ---------------------------
+# READ CACHE
+# ---------------------------
+READ_CACHE_SIZE = int(os.environ.get("HMS_READ_CACHE_SIZE", "512"))  # 0 disables
+READ_CACHE_MAX_ROWS = 5000  # larger results are served but never cached
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Small thread-safe LRU map with hit/miss counters."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize,
+                    "hits": self.hits, "misses": self.misses}
+
+
+_read_cache = LRUCache(READ_CACHE_SIZE)
+
+
+def _data_versions(conn, tables):
+    rows = dict(conn.execute("SELECT name, version FROM data_versions").fetchall())
+    return tuple(rows.get(table, 0) for table in tables)
+
+
+def cached_read(*tables):
+    """Cache a read helper's result, keyed on its arguments and table versions.
+
+    Triggers bump ``data_versions`` on every change to the listed tables, from
+    any process, so a changed version simply makes old entries unreachable
+    until the LRU evicts them. The cache is process-wide and therefore shared
+    by every Streamlit session. Cached results must be treated as read-only.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if READ_CACHE_SIZE <= 0 or in_unit_of_work():
+                # Uncommitted versions could be rolled back and reused.
+                return func(*args, **kwargs)
+            if "logs" in tables:
+                flush_audit_log()
+            try:
+                with pooled_connection() as conn:
+                    versions = _data_versions(conn, tables)
+            except sqlite3.OperationalError:
+                return func(*args, **kwargs)  # schema not created yet
+
+            key = (DB_NAME, func.__name__, args, tuple(sorted(kwargs.items())), versions)
+            result = _read_cache.get(key, _MISSING)
+            if result is _MISSING:
+                result = func(*args, **kwargs)
+                rows = result[0] if isinstance(result, tuple) else result
+                if not isinstance(rows, (list, Roster)) or len(rows) <= READ_CACHE_MAX_ROWS:
+                    _read_cache.put(key, result)
+            return result
+
+        wrapper.uncached = func
+        return wrapper
+    return decorator
+
+
+def read_cache_stats():
+    stats = _read_cache.stats()
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+    return stats
+
+
+def clear_read_cache():
+    _read_cache.clear()
+
+
+@instrumentation.register_collector
+def _export_gauges():
+    gauges = {}
+    for prefix, stats in (("pool", pool_stats()), ("read_pool", get_read_pool().stats()),
+                          ("snapshot", snapshot_stats()), ("read_cache", read_cache_stats()),
+                          ("audit", audit_stats())):
+        for name, value in stats.items():
+            gauges[f"{prefix}_{name}"] = value
+    return gauges
+
+
+# External-content FTS5 indexes kept in sync by triggers. Only anonymized
+# patient fields are indexed so search never exposes raw identifiers.
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS patients_fts USING fts5(
+    diagnosis, anonymized_name, anonymized_contact,
+    content='patients', content_rowid='patient_id'
+);
+CREATE TRIGGER IF NOT EXISTS patients_fts_ai AFTER INSERT ON patients BEGIN
+    INSERT INTO patients_fts(rowid, diagnosis, anonymized_name, anonymized_contact)
+    VALUES (new.patient_id, new.diagnosis, new.anonymized_name, new.anonymized_contact);
+END;
+CREATE TRIGGER IF NOT EXISTS patients_fts_ad AFTER DELETE ON patients BEGIN
+    INSERT INTO patients_fts(patients_fts, rowid, diagnosis, anonymized_name, anonymized_contact)
+    VALUES ('delete', old.patient_id, old.diagnosis, old.anonymized_name, old.anonymized_contact);
+END;
+CREATE TRIGGER IF NOT EXISTS patients_fts_au
+AFTER UPDATE OF diagnosis, anonymized_name, anonymized_contact ON patients BEGIN
+    INSERT INTO patients_fts(patients_fts, rowid, diagnosis, anonymized_name, anonymized_contact)
+    VALUES ('delete', old.patient_id, old.diagnosis, old.anonymized_name, old.anonymized_contact);
+    INSERT INTO patients_fts(rowid, diagnosis, anonymized_name, anonymized_contact)
+    VALUES (new.patient_id, new.diagnosis, new.anonymized_name, new.anonymized_contact);
+END;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS logs_fts USING fts5(
+    action, details,
+    content='logs', content_rowid='log_id'
+);
+CREATE TRIGGER IF NOT EXISTS logs_fts_ai AFTER INSERT ON logs BEGIN
+    INSERT INTO logs_fts(rowid, action, details) VALUES (new.log_id, new.action, new.details);
+END;
+CREATE TRIGGER IF NOT EXISTS logs_fts_ad AFTER DELETE ON logs BEGIN
+    INSERT INTO logs_fts(logs_fts, rowid, action, details)
+    VALUES ('delete', old.log_id, old.action, old.details);
+END;
+"""
+
+
+# Per-table change counters that key the read cache; bumped by triggers so
+# writes from any process invalidate cached reads everywhere.
+VERSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS data_versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+INSERT OR IGNORE INTO data_versions (name, version) VALUES ('patients', 0), ('logs', 0);
+
+CREATE TRIGGER IF NOT EXISTS patients_version_ai AFTER INSERT ON patients BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE name = 'patients';
+END;
+CREATE TRIGGER IF NOT EXISTS patients_version_au AFTER UPDATE ON patients BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE name = 'patients';
+END;
+CREATE TRIGGER IF NOT EXISTS patients_version_ad AFTER DELETE ON patients BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE name = 'patients';
+END;
+CREATE TRIGGER IF NOT EXISTS logs_version_ai AFTER INSERT ON logs BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE name = 'logs';
+END;
+CREATE TRIGGER IF NOT EXISTS logs_version_ad AFTER DELETE ON logs BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE name = 'logs';
+END;
+"""
+
+# Running totals behind the dashboard KPI cards, maintained by triggers so the
+# cards never scan patients. patient_stats holds exactly one row (id = 1).
+STATS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS patient_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    row_count INTEGER NOT NULL DEFAULT 0,
+    unique_diagnoses INTEGER NOT NULL DEFAULT 0,
+    latest_date_added TEXT
+);
+CREATE TABLE IF NOT EXISTS diagnosis_counts (
+    diagnosis TEXT PRIMARY KEY,
+    patient_count INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_patients_date_added ON patients(date_added);
+
+CREATE TRIGGER IF NOT EXISTS patients_stats_ai AFTER INSERT ON patients BEGIN
+    UPDATE patient_stats
+    SET row_count = row_count + 1,
+        latest_date_added = CASE
+            WHEN latest_date_added IS NULL OR new.date_added > latest_date_added
+            THEN new.date_added ELSE latest_date_added END
+    WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS patients_stats_ad AFTER DELETE ON patients BEGIN
+    UPDATE patient_stats
+    SET row_count = row_count - 1,
+        latest_date_added = (SELECT MAX(date_added) FROM patients)
+    WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS patients_stats_au_date AFTER UPDATE OF date_added ON patients BEGIN
+    UPDATE patient_stats SET latest_date_added = (SELECT MAX(date_added) FROM patients)
+    WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS diagnosis_counts_ai AFTER INSERT ON patients
+WHEN new.diagnosis IS NOT NULL AND new.diagnosis != '' BEGIN
+    UPDATE patient_stats SET unique_diagnoses = unique_diagnoses + 1
+    WHERE id = 1 AND NOT EXISTS (SELECT 1 FROM diagnosis_counts WHERE diagnosis = new.diagnosis);
+    INSERT INTO diagnosis_counts (diagnosis, patient_count) VALUES (new.diagnosis, 1)
+    ON CONFLICT(diagnosis) DO UPDATE SET patient_count = patient_count + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS diagnosis_counts_ad AFTER DELETE ON patients
+WHEN old.diagnosis IS NOT NULL AND old.diagnosis != '' BEGIN
+    UPDATE diagnosis_counts SET patient_count = patient_count - 1 WHERE diagnosis = old.diagnosis;
+    UPDATE patient_stats SET unique_diagnoses = unique_diagnoses - 1
+    WHERE id = 1 AND EXISTS (
+        SELECT 1 FROM diagnosis_counts WHERE diagnosis = old.diagnosis AND patient_count <= 0
+    );
+    DELETE FROM diagnosis_counts WHERE diagnosis = old.diagnosis AND patient_count <= 0;
+END;
+CREATE TRIGGER IF NOT EXISTS diagnosis_counts_au AFTER UPDATE OF diagnosis ON patients
+WHEN old.diagnosis IS NOT new.diagnosis BEGIN
+    UPDATE diagnosis_counts SET patient_count = patient_count - 1 WHERE diagnosis = old.diagnosis;
+    UPDATE patient_stats SET unique_diagnoses = unique_diagnoses - 1
+    WHERE id = 1 AND EXISTS (
+        SELECT 1 FROM diagnosis_counts WHERE diagnosis = old.diagnosis AND patient_count <= 0
+    );
+    DELETE FROM diagnosis_counts WHERE diagnosis = old.diagnosis AND patient_count <= 0;
+    UPDATE patient_stats SET unique_diagnoses = unique_diagnoses + 1
+    WHERE id = 1 AND new.diagnosis IS NOT NULL AND new.diagnosis != ''
+      AND NOT EXISTS (SELECT 1 FROM diagnosis_counts WHERE diagnosis = new.diagnosis);
+    INSERT INTO diagnosis_counts (diagnosis, patient_count)
+    SELECT new.diagnosis, 1 WHERE new.diagnosis IS NOT NULL AND new.diagnosis != ''
+    ON CONFLICT(diagnosis) DO UPDATE SET patient_count = patient_count + 1;
+END;
+"""
+
+# One-off backfill of the running totals from whatever patients already exist.
+STATS_BACKFILL = """
+DELETE FROM diagnosis_counts;
+INSERT INTO diagnosis_counts (diagnosis, patient_count)
+SELECT diagnosis, COUNT(*) FROM patients
+WHERE diagnosis IS NOT NULL AND diagnosis != '' GROUP BY diagnosis;
+INSERT OR REPLACE INTO patient_stats (id, row_count, unique_diagnoses, latest_date_added)
+SELECT 1, (SELECT COUNT(*) FROM patients), (SELECT COUNT(*) FROM diagnosis_counts),
+       (SELECT MAX(date_added) FROM patients);
+"""
+
+
+# ---------------------------
+# SCHEMA MIGRATIONS
+# ---------------------------
+DEFAULT_USERS = [
+    ("admin", "admin123", "admin"),
+    ("DrBob", "doc123", "doctor"),
+    ("AliceRecep", "rec123", "receptionist")
+]
+
+BASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE NOT NULL,
+    password TEXT NOT NULL,
+    role TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS patients (
+    patient_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    contact TEXT,
+    diagnosis TEXT,
+    anonymized_name TEXT,
+    anonymized_contact TEXT,
+    date_added TEXT
+);
+CREATE TABLE IF NOT EXISTS logs (
+    log_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER,
+    role TEXT,
+    action TEXT,
+    timestamp TEXT,
+    details TEXT,
+    FOREIGN KEY (user_id) REFERENCES users(user_id)
+);
+"""
+
+QUERY_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_patients_diagnosis ON patients(diagnosis, patient_id);
+CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON logs(timestamp);
+CREATE INDEX IF NOT EXISTS idx_logs_role_ts ON logs(role, timestamp);
+CREATE INDEX IF NOT EXISTS idx_logs_action_ts ON logs(action, timestamp);
+CREATE INDEX IF NOT EXISTS idx_logs_user_ts ON logs(user_id, timestamp);
+"""
+
+PSEUDONYM_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pseudonyms (
+    digest TEXT PRIMARY KEY,
+    token TEXT NOT NULL UNIQUE,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_patients_anon_name ON patients(anonymized_name);
+"""
+
+# Manifest of audit months moved out of ``logs`` into compressed archive files.
+LOG_PARTITION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS log_partitions (
+    month TEXT PRIMARY KEY,
+    file_name TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    min_log_id INTEGER NOT NULL,
+    max_log_id INTEGER NOT NULL,
+    min_timestamp TEXT NOT NULL,
+    max_timestamp TEXT NOT NULL,
+    archived_at TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Diagnosis dimension: patients.diagnosis keeps the text as entered, and
+# diagnosis_id points at its row in diagnoses. Filters and keyset pages seek
+# the (diagnosis_id, patient_id) index, which covers them.
+DIAGNOSIS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS diagnoses (
+    diagnosis_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+"""
+
+DIAGNOSIS_BACKFILL = """
+INSERT OR IGNORE INTO diagnoses (name)
+SELECT DISTINCT diagnosis FROM patients WHERE diagnosis IS NOT NULL AND diagnosis != '';
+UPDATE patients
+SET diagnosis_id = (SELECT diagnosis_id FROM diagnoses WHERE name = patients.diagnosis)
+WHERE diagnosis_id IS NULL;
+CREATE INDEX IF NOT EXISTS idx_patients_diagnosis_id ON patients(diagnosis_id, patient_id);
+DROP INDEX IF EXISTS idx_patients_diagnosis;
+"""
+
+
+# Hash chain over the audit log. log_chain holds the newest entry's id and
+# hash, so appends link to it even when every row has been archived;
+# log_checkpoints records signed verification results.
+LOG_CHAIN_SCHEMA = """
+CREATE TABLE IF NOT EXISTS log_chain (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    log_id INTEGER NOT NULL,
+    entry_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS log_checkpoints (
+    checkpoint_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    log_id INTEGER NOT NULL,
+    entry_hash TEXT NOT NULL,
+    rows_verified INTEGER NOT NULL,
+    mode TEXT NOT NULL,
+    verified_at TEXT NOT NULL,
+    signature TEXT NOT NULL
+);
+"""
+
+# Rows of each intake file already imported, keyed by the file's absolute path
+# and written in the same transaction as the batch they count.
+IMPORT_PROGRESS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS import_progress (
+    source TEXT PRIMARY KEY,
+    rows_committed INTEGER NOT NULL,
+    complete INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Per-month row counts of archived audit entries by role, action and user,
+# written when a month is archived. Filtered counts over archived months are
+# answered from here instead of decompressing every archive file.
+LOG_PARTITION_COUNTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS log_partition_counts (
+    month TEXT NOT NULL,
+    role TEXT,
+    action TEXT,
+    user_id INTEGER,
+    row_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_log_partition_counts_month
+ON log_partition_counts(month, role, action);
+"""
+
+
+def _run_script(conn, script):
+    """Execute a multi-statement script inside the caller's transaction.
+
+    ``executescript`` would COMMIT first, which breaks the one-transaction-
+    per-migration guarantee, so statements are split and run one by one.
+    """
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            conn.execute(statement)
+            statement = ""
+    if statement.strip():
+        raise sqlite3.ProgrammingError(f"Incomplete SQL statement: {statement!r}")
+
+
+def _migrate_base_schema(conn):
+    _run_script(conn, BASE_SCHEMA)
+    _insert_default_users(conn)
+
+
+def _migrate_query_indexes(conn):
+    _run_script(conn, QUERY_INDEXES)
+
+
+def _migrate_pseudonyms(conn):
+    _run_script(conn, PSEUDONYM_SCHEMA)
+    legacy_tokens = conn.execute(
+        "SELECT NOT EXISTS (SELECT 1 FROM pseudonyms) AND EXISTS (SELECT 1 FROM patients)"
+    ).fetchone()[0]
+    if legacy_tokens:
+        rebuild_pseudonyms()
+
+
+def _migrate_full_text_search(conn):
+    _run_script(conn, FTS_SCHEMA)
+    for table in ("patients_fts", "logs_fts"):
+        # Index rows that predate the virtual table.
+        conn.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+
+
+def _migrate_change_counters(conn):
+    _run_script(conn, VERSION_SCHEMA)
+
+
+def _migrate_dashboard_stats(conn):
+    _run_script(conn, STATS_SCHEMA)
+    _run_script(conn, STATS_BACKFILL)
+
+
+def _migrate_log_partitions(conn):
+    _run_script(conn, LOG_PARTITION_SCHEMA)
+
+
+def _migrate_diagnosis_dimension(conn):
+    _run_script(conn, DIAGNOSIS_SCHEMA)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(patients)")]
+    if "diagnosis_id" not in columns:
+        conn.execute(
+            "ALTER TABLE patients ADD COLUMN diagnosis_id INTEGER REFERENCES diagnoses(diagnosis_id)"
+        )
+    _run_script(conn, DIAGNOSIS_BACKFILL)
+
+
+def _migrate_log_chain(conn):
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(logs)")]
+    for column in ("prev_hash", "entry_hash"):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE logs ADD COLUMN {column} TEXT")
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(log_partitions)")]
+    if "chained" not in columns:
+        # Months archived before the chain existed keep chained = 0 and are
+        # outside verification; their files have no hash columns.
+        conn.execute("ALTER TABLE log_partitions ADD COLUMN chained INTEGER NOT NULL DEFAULT 0")
+    _run_script(conn, LOG_CHAIN_SCHEMA)
+    conn.execute("INSERT OR IGNORE INTO log_chain VALUES (1, 0, ?)", (GENESIS_HASH,))
+    _backfill_log_chain(conn)
+
+
+def _migrate_import_progress(conn):
+    _run_script(conn, IMPORT_PROGRESS_SCHEMA)
+
+
+def _migrate_log_partition_counts(conn):
+    _run_script(conn, LOG_PARTITION_COUNTS_SCHEMA)
+    for month, file_name in conn.execute(
+        "SELECT month, file_name FROM log_partitions WHERE month NOT IN "
+        "(SELECT month FROM log_partition_counts)"
+    ).fetchall():
+        if not os.path.exists(os.path.join(log_archive_dir(), file_name)):
+            continue  # counted from the file, if it ever comes back
+        with _archive_connection(file_name) as archive:
+            conn.executemany(
+                "INSERT INTO log_partition_counts VALUES (?, ?, ?, ?, ?)",
+                [(month, *group) for group in archive.execute(
+                    "SELECT role, action, user_id, COUNT(*) FROM logs "
+                    "GROUP BY role, action, user_id"
+                )],
+            )
+
+
+# Ordered, idempotent steps; the index of the last applied step is stored in
+# PRAGMA user_version. Append new steps, never edit or reorder applied ones.
+MIGRATIONS = [
+    (1, _migrate_base_schema),
+    (2, _migrate_query_indexes),
+    (3, _migrate_pseudonyms),
+    (4, _migrate_full_text_search),
+    (5, _migrate_change_counters),
+    (6, _migrate_dashboard_stats),
+    (7, _migrate_log_partitions),
+    (8, _migrate_diagnosis_dimension),
+    (9, _migrate_log_chain),
+    (10, _migrate_import_progress),
+    (11, _migrate_log_partition_counts),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+_migrated = set()
+_migrate_lock = threading.Lock()
+
+
+def migrate():
+    """Apply pending migrations; a no-op after the first call per DB file and process.
+
+    Each step runs in its own ``BEGIN IMMEDIATE`` transaction together with
+    the ``user_version`` bump, so concurrent processes cannot apply a step twice
+    and a crash never leaves a half-applied step recorded as done.
+    """
+    path = os.path.abspath(DB_NAME)
+    if path in _migrated:
+        return
+    with _migrate_lock:
+        if path in _migrated:
+            return
+        with pooled_connection() as conn:
+            for version, step in MIGRATIONS:
+                if conn.execute("PRAGMA user_version").fetchone()[0] >= version:
+                    continue
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    # Re-check under the write lock: another process may have won.
+                    if conn.execute("PRAGMA user_version").fetchone()[0] < version:
+                        step(conn)
+                        conn.execute(f"PRAGMA user_version = {version}")
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+        _migrated.add(path)
+
+
+def get_schema_version():
+    with pooled_connection() as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
 
 
 def create_tables():
-    conn = get_connection()
-    cur = conn.cursor()
-
-    # --- USERS TABLE ---
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            user_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            role TEXT NOT NULL
-        );
-    """)
-
-    # --- PATIENTS TABLE ---
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS patients (
-            patient_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            contact TEXT,
-            diagnosis TEXT,
-            anonymized_name TEXT,
-            anonymized_contact TEXT,
-            date_added TEXT
-        );
-    """)
-
-    # --- LOGS TABLE ---
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS logs (
-            log_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            role TEXT,
-            action TEXT,
-            timestamp TEXT,
-            details TEXT,
-            FOREIGN KEY (user_id) REFERENCES users(user_id)
-        );
-    """)
-
-    conn.commit()
-    conn.close()
-    insert_default_users()
+    """Kept for existing callers: brings the schema up to date via ``migrate()``."""
+    migrate()
+
+
+def _insert_default_users(conn):
+    conn.executemany(
+        "INSERT OR IGNORE INTO users (username, password, role) VALUES (?, ?, ?)",
+        DEFAULT_USERS,
+    )
 
 
 def insert_default_users():
     """Inserts Admin, Doctor, Receptionist if not already present."""
-    conn = get_connection()
-    cur = conn.cursor()
+    with pooled_connection() as conn:
+        _insert_default_users(conn)
+        conn.commit()
 
-    default_users = [
-        ("admin", "admin123", "admin"),
-        ("DrBob", "doc123", "doctor"),
-        ("AliceRecep", "rec123", "receptionist")
-    ]
 
-    for username, pwd, role in default_users:
-        cur.execute("SELECT * FROM users WHERE username=?", (username,))
-        if not cur.fetchone():
-            cur.execute(
-                "INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
-                (username, pwd, role)
-            )
+# ---------------------------
+# AUTHENTICATION
+# ---------------------------
+def authenticate_user(username, password):
+    with pooled_connection() as conn:
+        return conn.execute(
+            "SELECT user_id, role FROM users WHERE username=? AND password=?",
+            (username, password),
+        ).fetchone()
 
-    conn.commit()
-    conn.close()
 
+# ---------------------------
+# AUDIT HASH CHAIN
+# ---------------------------
+# Every log row stores the previous row's hash (prev_hash) and
+# entry_hash = SHA-256(prev_hash + the row's fields). Editing a row breaks its
+# own hash, and deleting or inserting one breaks the next row's link. Chain
+# order is log_id order.
+GENESIS_HASH = "0" * 64
+LOG_CHAIN_CHUNK = 5000
 
-def log_action(user_id, role, action, details=""):
-    """Insert an action log entry into logs table."""
-    conn = get_connection()
-    cur = conn.cursor()
+LOG_INSERT_SQL = """
+    INSERT INTO logs (user_id, role, action, timestamp, details, prev_hash, entry_hash)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
 
-    cur.execute("""
-        INSERT INTO logs (user_id, role, action, timestamp, details)
-        VALUES (?, ?, ?, ?, ?)
-    """, (user_id, role, action, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), details))
 
-    conn.commit()
-    conn.close()
+def _entry_hash(prev_hash, event):
+    """Hash of one ``(user_id, role, action, timestamp, details)`` event after ``prev_hash``.
+
+    Fields are hashed as the text SQLite hands back, so a value written as
+    ``1`` and read back as ``1`` or ``"1"`` hashes the same either way.
+    """
+    fields = [prev_hash] + [None if value is None else str(value) for value in event]
+    payload = json.dumps(fields, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def append_logs(conn, events):
+    """Insert audit events on ``conn``, extending the hash chain.
+
+    The caller must hold the write lock (``transaction()`` or ``BEGIN
+    IMMEDIATE``) so no other writer moves the chain head in between.
+    """
+    if not events:
+        return
+    prev = conn.execute("SELECT entry_hash FROM log_chain WHERE id = 1").fetchone()[0]
+    rows = []
+    for event in events:
+        entry = _entry_hash(prev, event)
+        rows.append((*event, prev, entry))
+        prev = entry
+    conn.executemany(LOG_INSERT_SQL, rows)
+    conn.execute(
+        "UPDATE log_chain SET log_id = last_insert_rowid(), entry_hash = ? WHERE id = 1",
+        (prev,),
+    )
+
+
+def _backfill_log_chain(conn):
+    """Chain the rows written before migration 9, oldest first."""
+    log_id, prev = conn.execute("SELECT log_id, entry_hash FROM log_chain WHERE id = 1").fetchone()
+    while True:
+        rows = conn.execute(
+            "SELECT log_id, user_id, role, action, timestamp, details FROM logs "
+            "WHERE log_id > ? ORDER BY log_id LIMIT ?",
+            (log_id, LOG_CHAIN_CHUNK),
+        ).fetchall()
+        if not rows:
+            break
+        updates = []
+        for row in rows:
+            entry = _entry_hash(prev, row[1:])
+            updates.append((prev, entry, row[0]))
+            prev = entry
+        conn.executemany("UPDATE logs SET prev_hash = ?, entry_hash = ? WHERE log_id = ?", updates)
+        log_id = rows[-1][0]
+    conn.execute("UPDATE log_chain SET log_id = ?, entry_hash = ? WHERE id = 1", (log_id, prev))
+
+
+# ---------------------------
+# AUDIT WRITER
+# ---------------------------
+AUDIT_QUEUE_SIZE = 10000
+AUDIT_BATCH_SIZE = 256
+AUDIT_FLUSH_INTERVAL = 0.25  # seconds a partial batch may wait before it is committed
+AUDIT_PUT_TIMEOUT = 2.0      # how long a caller blocks on a full queue before writing inline
+AUDIT_WRITE_RETRIES = 3
+AUDIT_SYNC = os.environ.get("HMS_AUDIT_SYNC") == "1"
+AUDIT_SPILL_SUFFIX = "-audit-spill"  # next to the database, like -wal
+AUDIT_REJECT_SUFFIX = "-audit-rejected"  # events SQLite refused outright, kept for review
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+@contextmanager
+def _spill_file_lock(path):
+    """Exclusive lock shared by every process (and thread) that appends to or replays ``path``."""
+    with open(path + ".lock", "a") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        yield  # closing the handle releases the lock
+
+
+class _FlushRequest:
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class AuditWriter:
+    """Group-commit writer for audit events.
+
+    Callers enqueue ``(user_id, role, action, timestamp, details)`` tuples on a
+    bounded queue; a single background thread commits them with one
+    ``executemany`` per batch, cutting a batch when it reaches ``batch_size``
+    events or when ``flush_interval`` has passed since its first event. In
+    ``sync`` mode every event is written inline, which keeps tests deterministic.
+
+    A batch that is still locked out after ``AUDIT_WRITE_RETRIES`` is appended
+    to ``<db>-audit-spill`` and replayed, in its own transaction, before the
+    next batch, so a busy database delays audit rows but never loses them.
+    Events SQLite rejects for any other reason are written one by one and the
+    offending ones set aside in ``<db>-audit-rejected``.
+    """
+
+    def __init__(self, queue_size=AUDIT_QUEUE_SIZE, batch_size=AUDIT_BATCH_SIZE,
+                 flush_interval=AUDIT_FLUSH_INTERVAL, sync=AUDIT_SYNC):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sync = sync
+        self._queue = Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._spill_lock = threading.Lock()  # serializes spill-file replay and appends
+        self._unspilled = []  # failed events the spill file could not take either
+        self._thread = None
+        self._closed = False
+        self._pending = 0  # events accepted onto the queue but not yet committed
+        self._counters = {
+            "enqueued": 0,
+            "written": 0,
+            "batches": 0,
+            "backpressure_waits": 0,
+            "inline_writes": 0,
+            "failed": 0,
+            "spilled": 0,
+            "replayed": 0,
+            "rejected": 0,
+            "max_queue_depth": 0,
+            "last_batch_size": 0,
+            "last_commit_ms": 0.0,
+        }
+
+    # --- producer side ---
+    def submit(self, event):
+        if self.sync or self._closed:
+            self._write([event])
+            return
+
+        self._ensure_thread()
+        self._bump_pending(1)
+        try:
+            self._queue.put_nowait(event)
+        except Full:
+            self._bump("backpressure_waits")
+            try:
+                self._queue.put(event, timeout=AUDIT_PUT_TIMEOUT)
+            except Full:
+                # The writer is hopelessly behind; never drop an audit row.
+                self._bump_pending(-1)
+                self._bump("inline_writes")
+                self._write([event])
+                return
+
+        with self._lock:
+            self._counters["enqueued"] += 1
+            depth = self._queue.qsize()
+            if depth > self._counters["max_queue_depth"]:
+                self._counters["max_queue_depth"] = depth
+
+    def flush(self, timeout=None):
+        """Block until everything enqueued so far is committed."""
+        if not self._pending:
+            return True
+        if self._thread is None or not self._thread.is_alive():
+            self._drain()
+            return True
+        request = _FlushRequest()
+        self._queue.put(request)
+        return request.done.wait(timeout)
+
+    def close(self, timeout=10.0):
+        """Stop the writer thread, committing whatever is still queued."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        self._drain()
+        self._commit_batch([])  # last chance for events spilled by earlier failures
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats["queue_depth"] = self._queue.qsize()
+        stats["pending"] = self._pending
+        stats["queue_capacity"] = self._queue.maxsize
+        stats["mode"] = "sync" if self.sync else "async"
+        return stats
+
+    # --- consumer side ---
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="audit-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch, waiters, stop = [], [], False
+            deadline = time.monotonic() + self.flush_interval
+
+            while True:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, _FlushRequest):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+
+                if stop or waiters or len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except Empty:
+                    break
+
+            if batch:
+                try:
+                    self._write(batch, queued=True)
+                except Exception:
+                    # Keep the thread alive; a dead writer would hang every flush().
+                    logger.exception("audit writer: unexpected error committing %d events",
+                                     len(batch))
+            for waiter in waiters:
+                waiter.done.set()
+            if stop:
+                return
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except Empty:
+                break
+            if isinstance(item, _FlushRequest):
+                item.done.set()
+            elif item is not _STOP:
+                batch.append(item)
+        for start in range(0, len(batch), self.batch_size):
+            self._write(batch[start:start + self.batch_size], queued=True)
+
+    def _write(self, batch, queued=False):
+        try:
+            self._commit_batch(batch)
+        finally:
+            if queued:
+                self._bump_pending(-len(batch))
+
+    def _commit_batch(self, batch):
+        with self._spill_lock:
+            self._replay_spill()
+            held, self._unspilled = self._unspilled, []
+            events = held + list(batch)
+            if not events:
+                return
+            try:
+                self._append(events)
+            except sqlite3.OperationalError as exc:
+                self._bump("failed", len(batch))
+                with _spill_file_lock(self._spill_path()):
+                    self._spill(events)
+                logger.error("audit writer: could not commit %d events, kept for retry: %s",
+                             len(batch), exc)
+                return
+            except sqlite3.Error as exc:
+                self._commit_each(events, exc)
+                if self._unspilled:
+                    with _spill_file_lock(self._spill_path()):
+                        self._spill(self._unspilled)
+                return
+            if held:
+                self._bump("replayed", len(held))
+
+    def _append(self, events):
+        """Commit ``events`` in one transaction, retrying while the database is busy."""
+        for attempt in range(1, AUDIT_WRITE_RETRIES + 1):
+            started = time.perf_counter()
+            try:
+                with transaction() as conn:
+                    append_logs(conn, events)
+            except sqlite3.OperationalError:
+                if attempt == AUDIT_WRITE_RETRIES:
+                    raise
+                time.sleep(0.05 * attempt)
+                continue
+
+            with self._lock:
+                self._counters["written"] += len(events)
+                self._counters["batches"] += 1
+                self._counters["last_batch_size"] = len(events)
+                self._counters["last_commit_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            return
+
+    def _commit_each(self, events, exc):
+        """Retry a batch SQLite refused event by event, setting aside the ones it still refuses.
+
+        Events that hit a busy database instead are left in ``_unspilled`` for
+        the caller to spill.
+        """
+        logger.error("audit writer: batch of %d events rejected (%s); retrying one by one",
+                     len(events), exc)
+        for event in events:
+            try:
+                self._append([event])
+            except sqlite3.OperationalError:
+                self._unspilled.append(event)
+            except sqlite3.Error as event_exc:
+                self._reject(event, event_exc)
+
+    def _spill_path(self):
+        return DB_NAME + AUDIT_SPILL_SUFFIX
+
+    def _replay_spill(self):
+        """Commit events spilled by any process, before (and apart from) the next batch."""
+        path = self._spill_path()
+        claimed = path + ".replaying"
+        if not (os.path.exists(path) or os.path.exists(claimed)):
+            return
+        with _spill_file_lock(path):
+            # Claim the file so appends made after this replay start a new one; a
+            # claimed file left by a process that died mid-replay is picked up too.
+            with suppress(FileNotFoundError):
+                if os.path.exists(claimed):
+                    with open(claimed, "a", encoding="utf-8") as target, \
+                            open(path, encoding="utf-8") as source:
+                        target.write(source.read())
+                    os.remove(path)
+                else:
+                    os.replace(path, claimed)
+            events = self._read_spill(claimed)
+            if events:
+                try:
+                    self._append(events)
+                except sqlite3.OperationalError as exc:
+                    logger.warning("audit writer: %d spilled events still waiting: %s",
+                                   len(events), exc)
+                    return
+                except sqlite3.Error as exc:
+                    self._commit_each(events, exc)
+                    with suppress(FileNotFoundError):
+                        os.remove(claimed)
+                    self._spill(self._unspilled)
+                    return
+                self._bump("replayed", len(events))
+                logger.warning("audit writer: committed %d previously spilled events", len(events))
+            with suppress(FileNotFoundError):
+                os.remove(claimed)
+
+    def _read_spill(self, path):
+        events = []
+        try:
+            with open(path, encoding="utf-8") as handle:
+                for line in handle:
+                    try:
+                        events.append(tuple(json.loads(line)))
+                    except ValueError:
+                        # A line cut short by a crash mid-append; the rest is intact.
+                        logger.error("audit writer: skipping unreadable line in %s", path)
+        except FileNotFoundError:
+            pass
+        return events
+
+    def _spill(self, events):
+        """Append ``events`` to the spill file, or hold them in memory if it can't be written.
+
+        The caller holds ``_spill_file_lock``.
+        """
+        if not events:
+            return
+        path = self._spill_path()
+        try:
+            with open(path, "a", encoding="utf-8") as handle:
+                handle.writelines(json.dumps(event, default=str) + "\n" for event in events)
+                handle.flush()
+                os.fsync(handle.fileno())
+            self._unspilled = []
+            self._bump("spilled", len(events))
+        except OSError:
+            logger.exception("audit writer: could not write %s, holding %d events in memory",
+                             path, len(events))
+            self._unspilled = list(events)
+
+    def _reject(self, event, exc):
+        path = DB_NAME + AUDIT_REJECT_SUFFIX
+        logger.error("audit writer: event rejected by SQLite, moved to %s: %s", path, exc)
+        self._bump("rejected")
+        with suppress(OSError), open(path, "a", encoding="utf-8") as handle:
+            handle.write(json.dumps({"event": event, "error": str(exc)}, default=repr) + "\n")
+
+    def _bump(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def _bump_pending(self, amount):
+        with self._lock:
+            self._pending += amount
+
+
+_audit_writer = None
+_audit_writer_lock = threading.Lock()
+
+
+def get_audit_writer():
+    global _audit_writer
+    with _audit_writer_lock:
+        if _audit_writer is None:
+            _audit_writer = AuditWriter()
+        return _audit_writer
+
+
+def set_audit_sync(enabled=True):
+    """Switch between inline (tests, scripts) and background audit writes."""
+    writer = get_audit_writer()
+    writer.flush()
+    writer.sync = enabled
+
+
+def flush_audit_log(timeout=None):
+    """Wait until every queued audit event has been committed."""
+    if _audit_writer is None or in_unit_of_work():
+        # The writer would block on our own write lock; don't wait for it.
+        return True
+    return _audit_writer.flush(timeout)
+
+
+def audit_stats():
+    """Queue depth, backpressure and throughput counters of the audit writer."""
+    return get_audit_writer().stats()
+
+
+@atexit.register
+def shutdown_audit_writer():
+    """Durably commit pending audit events before the interpreter exits."""
+    if _audit_writer is not None:
+        _audit_writer.close()
+
+
+def log_action(user_id, role, action, details=""):
+    """Record an action log entry in the logs table.
+
+    Inside ``transaction()`` the row is written on the transaction's connection
+    so it commits atomically with the change it describes; otherwise it is
+    queued for the group-commit writer.
+    """
+    if not (user_id is None or isinstance(user_id, int)) or not all(
+        isinstance(value, str) for value in (role, action, details)
+    ):
+        # Rejected here: a value SQLite can't bind would fail the whole audit batch.
+        raise TypeError("log_action takes an integer user_id and text role, action and details")
+    event = (user_id, role, action, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), details)
+    if in_unit_of_work():
+        with pooled_connection() as conn:
+            append_logs(conn, [event])
+        return
+    get_audit_writer().submit(event)
 
 
 # ---------------------------
 # PATIENT CRUD FUNCTIONS
 # ---------------------------
 
+# ?3 is the diagnosis text; its id is looked up once ensure_diagnoses added it.
+INSERT_PATIENT_SQL = """
+    INSERT INTO patients (name, contact, diagnosis, anonymized_name, anonymized_contact,
+                          date_added, diagnosis_id)
+    VALUES (?1, ?2, ?3, ?4, ?5, DATE('now'),
+            (SELECT diagnosis_id FROM diagnoses WHERE name = ?3))
+"""
+
+
+def ensure_diagnoses(conn, names):
+    """Add any diagnosis names not yet in ``diagnoses`` (on the caller's transaction)."""
+    conn.executemany(
+        "INSERT OR IGNORE INTO diagnoses (name) VALUES (?)",
+        [(name,) for name in sorted({name for name in names if name})],
+    )
+
+
 def add_patient(name, contact, diagnosis, anonymized_name, anonymized_contact):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO patients (name, contact, diagnosis, anonymized_name, anonymized_contact, date_added)
-        VALUES (?, ?, ?, ?, ?, DATE('now'))
-    """, (name, contact, diagnosis, anonymized_name, anonymized_contact))
-    conn.commit()
-    conn.close()
+    with pooled_connection() as conn:
+        ensure_diagnoses(conn, [diagnosis])
+        conn.execute(
+            INSERT_PATIENT_SQL, (name, contact, diagnosis, anonymized_name, anonymized_contact)
+        )
+        _commit(conn)
 
 
+@cached_read("patients")
 def get_all_patients():
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM patients")
-    data = cur.fetchall()
-    conn.close()
-    return data
+    with pooled_connection() as conn:
+        return Roster.from_cursor(
+            conn.execute(f"SELECT {PATIENT_COLUMNS} FROM patients ORDER BY patient_id")
+        )
 
 
 def delete_patient(patient_id):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM patients WHERE patient_id=?", (patient_id,))
-    conn.commit()
-    conn.close()
+    """Delete one patient; returns the number of rows removed (0 or 1)."""
+    with pooled_connection() as conn:
+        deleted = conn.execute("DELETE FROM patients WHERE patient_id=?", (patient_id,)).rowcount
+        _commit(conn)
+    return deleted
 
 
 def update_patient(patient_id, name, contact, diagnosis):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        UPDATE patients
-        SET name=?, contact=?, diagnosis=?
-        WHERE patient_id=?
-    """, (name, contact, diagnosis, patient_id))
-    conn.commit()
-    conn.close()
-
-
-def get_logs():
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM logs ORDER BY timestamp DESC")
-    logs = cur.fetchall()
-    conn.close()
-    return logs
+    """Replace one patient's fields; returns the number of rows changed (0 or 1).
+
+    The anonymized name and contact are re-derived from the new values, so
+    token lookups find the patient under their current name.
+    """
+    with pooled_connection() as conn:
+        ensure_diagnoses(conn, [diagnosis])
+        # Registers a new name's token on this connection, committing with the update.
+        masked = mask_patients([(name, contact, diagnosis)], pseudonymize_many)[0]
+        updated = conn.execute("""
+            UPDATE patients
+            SET name=?1, contact=?2, diagnosis=?3, anonymized_name=?4, anonymized_contact=?5,
+                diagnosis_id=(SELECT diagnosis_id FROM diagnoses WHERE name = ?3)
+            WHERE patient_id=?6
+        """, masked + (patient_id,)).rowcount
+        _commit(conn)
+    return updated
+
+
+# ---------------------------
+# PSEUDONYM INDEX
+# ---------------------------
+PSEUDONYM_CACHE_SIZE = 50000
+BULK_CHUNK_SIZE = 1000
+SQL_IN_CHUNK = 500  # stay well below SQLITE_MAX_VARIABLE_NUMBER
+
+
+_token_cache = LRUCache(PSEUDONYM_CACHE_SIZE)
+
+
+def _register_tokens(conn, digests):
+    """Return ``{digest: token}``, indexing any digest seen for the first time.
+
+    Tokens are the keyed digest's prefix; if that prefix is already taken by a
+    different digest (the UNIQUE index on ``token`` rejects it) the token is
+    lengthened until it is unique.
+    """
+    digests = list(dict.fromkeys(digests))
+    found = {}
+    for start in range(0, len(digests), SQL_IN_CHUNK):
+        chunk = digests[start:start + SQL_IN_CHUNK]
+        placeholders = ",".join("?" * len(chunk))
+        found.update(conn.execute(
+            f"SELECT digest, token FROM pseudonyms WHERE digest IN ({placeholders})", chunk
+        ).fetchall())
+
+    missing = [digest for digest in digests if digest not in found]
+    if missing:
+        conn.executemany(
+            "INSERT OR IGNORE INTO pseudonyms (digest, token) VALUES (?, ?)",
+            [(digest, token_for(digest)) for digest in missing],
+        )
+        for digest in missing:
+            row = conn.execute(
+                "SELECT token FROM pseudonyms WHERE digest=?", (digest,)
+            ).fetchone()
+            length = TOKEN_LENGTH
+            while row is None:
+                length += 4
+                conn.execute(
+                    "INSERT OR IGNORE INTO pseudonyms (digest, token) VALUES (?, ?)",
+                    (digest, token_for(digest, length)),
+                )
+                row = conn.execute(
+                    "SELECT token FROM pseudonyms WHERE digest=?", (digest,)
+                ).fetchone()
+            found[digest] = row[0]
+    return found
+
+
+def pseudonymize_many(names):
+    """Stable ``ANON_`` tokens for ``names``, in order.
+
+    Hot tokens come from an in-process LRU; misses are resolved against the
+    ``pseudonyms`` table in one round trip and registered if new. When called
+    inside a caller's transaction, new tokens commit (or roll back) with it.
+    """
+    digests = [pseudonym_digest(name) for name in names]
+    tokens = {}
+    misses = []
+    for digest in set(digests):
+        token = _token_cache.get((DB_NAME, digest))
+        if token is None:
+            misses.append(digest)
+        else:
+            tokens[digest] = token
+
+    if misses:
+        with pooled_connection() as conn:
+            owns_transaction = not conn.in_transaction
+            resolved = _register_tokens(conn, misses)
+            if owns_transaction:
+                conn.commit()
+                # Only cache tokens known to be durable.
+                for digest, token in resolved.items():
+                    _token_cache.put((DB_NAME, digest), token)
+        tokens.update(resolved)
+    return [tokens[digest] for digest in digests]
+
+
+def pseudonymize(name):
+    return pseudonymize_many([name])[0]
+
+
+def pseudonym_cache_stats():
+    return _token_cache.stats()
+
+
+@cached_read("patients")
+def find_patients_by_token(token, diagnosis=None):
+    """Indexed point lookup of the patients carrying an anonymized name."""
+    extra, params = "", [normalize_token(token)]
+    if diagnosis:
+        extra = " AND " + DIAGNOSIS_PREDICATE
+        params.append(diagnosis)
+    with pooled_connection() as conn:
+        return Roster.from_cursor(conn.execute(
+            f"SELECT {PATIENT_COLUMNS} FROM patients WHERE anonymized_name = ?{extra} "
+            "ORDER BY patient_id",
+            params,
+        ))
+
+
+def rebuild_pseudonyms(chunk_size=BULK_CHUNK_SIZE):
+    """Re-derive every patient's anonymized name from the keyed tokenizer.
+
+    Used once to replace the legacy per-process ``hash()`` tokens.
+    """
+    last_id = 0
+    updated = 0
+    with pooled_connection() as conn:
+        owns_transaction = not conn.in_transaction
+        while True:
+            rows = conn.execute(
+                "SELECT patient_id, name FROM patients WHERE patient_id > ? "
+                "ORDER BY patient_id LIMIT ?",
+                (last_id, chunk_size),
+            ).fetchall()
+            if not rows:
+                break
+            named = [(pid, name) for pid, name in rows if name]
+            tokens = _register_tokens(conn, [pseudonym_digest(name) for _, name in named])
+            conn.executemany(
+                "UPDATE patients SET anonymized_name=? WHERE patient_id=?",
+                [(tokens[pseudonym_digest(name)], pid) for pid, name in named],
+            )
+            if owns_transaction:
+                conn.commit()
+            updated += len(named)
+            last_id = rows[-1][0]
+    return updated
+
+
+# ---------------------------
+# BULK INGESTION
+# ---------------------------
+
+
+def add_patients_bulk(records, user_id=None, role=None, source="bulk import",
+                      chunk_size=BULK_CHUNK_SIZE):
+    """Insert many ``(name, contact, diagnosis)`` records in a single transaction.
+
+    Records are masked in batch and inserted with chunked ``executemany``; the
+    whole batch and its single summarized audit entry commit or roll back as
+    one. Returns the number inserted.
+    """
+    records = list(records)
+    for index, (name, contact, diagnosis) in enumerate(records):
+        if not (name and contact and diagnosis):
+            raise ValueError(f"Record {index} is missing a name, contact or diagnosis")
+
+    if not records:
+        return 0
+    with transaction() as conn:
+        ensure_diagnoses(conn, (record[2] for record in records))
+        for start in range(0, len(records), chunk_size):
+            conn.executemany(
+                INSERT_PATIENT_SQL,
+                mask_patients(records[start:start + chunk_size], pseudonymize_many),
+            )
+        log_action(user_id, role, "bulk_add_patients",
+                   f"Bulk imported {len(records)} patients from {source}")
+    return len(records)
+
+
+def get_import_progress(source):
+    """``(rows_committed, complete)`` recorded for the intake file ``source``, or ``None``."""
+    with pooled_connection() as conn:
+        row = conn.execute(
+            "SELECT rows_committed, complete FROM import_progress WHERE source=?",
+            (os.path.abspath(source),),
+        ).fetchone()
+    return (row[0], bool(row[1])) if row else None
+
+
+def record_import_progress(source, rows_committed, complete=False):
+    """Store how many rows of ``source`` are imported.
+
+    Call it inside the ``transaction()`` that inserts the batch, so the count
+    and the rows commit together and a resumed import never repeats a batch.
+    """
+    with pooled_connection() as conn:
+        conn.execute("""
+            INSERT INTO import_progress (source, rows_committed, complete, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(source) DO UPDATE SET rows_committed = excluded.rows_committed,
+                complete = excluded.complete, updated_at = excluded.updated_at
+        """, (os.path.abspath(source), rows_committed, int(complete),
+              datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        _commit(conn)
+
+
+def reset_import_progress(source):
+    with pooled_connection() as conn:
+        conn.execute("DELETE FROM import_progress WHERE source=?", (os.path.abspath(source),))
+        _commit(conn)
+
+
+# ---------------------------
+# PAGED PATIENT QUERIES
+# ---------------------------
+PAGE_SIZE = 50
+PATIENT_COLUMNS = (
+    "patient_id, name, contact, diagnosis, anonymized_name, anonymized_contact, date_added"
+)
+
+
+# Resolves the name once, then seeks idx_patients_diagnosis_id.
+DIAGNOSIS_PREDICATE = "diagnosis_id = (SELECT diagnosis_id FROM diagnoses WHERE name = ?)"
+
+
+def _patient_filters(diagnosis=None, search=None):
+    clauses, params = [], []
+    if diagnosis:
+        clauses.append(DIAGNOSIS_PREDICATE)
+        params.append(diagnosis)
+    if search:
+        # Both branches are rowid lookups: an exact id, and the full-text index
+        # over diagnosis and the anonymized name/contact (so "1234" also finds
+        # XXX-XXX-1234). No per-row LIKE, so pages and counts stay indexed.
+        matches = []
+        term = search.strip()
+        if term.isascii() and term.isdigit() and int(term) < 2 ** 63:
+            matches.append("patient_id = ?")
+            params.append(int(term))
+        query = _fts_query(search)
+        if query:
+            matches.append("patient_id IN (SELECT rowid FROM patients_fts WHERE patients_fts MATCH ?)")
+            params.append(query)
+        clauses.append(f"({' OR '.join(matches)})" if matches else "0")
+    return clauses, params
+
+
+@cached_read("patients")
+def count_patients(diagnosis=None, search=None):
+    if not (diagnosis or search):
+        return get_dashboard_stats()["total_patients"]
+    if diagnosis and not search:
+        with pooled_connection() as conn:
+            row = conn.execute(
+                "SELECT patient_count FROM diagnosis_counts WHERE diagnosis=?", (diagnosis,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    clauses, params = _patient_filters(diagnosis, search)
+    where = f" WHERE {' AND '.join(clauses)}"
+    with pooled_connection() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM patients{where}", params).fetchone()[0]
+
+
+@cached_read("patients")
+def get_patients_page(after_id=None, before_id=None, limit=PAGE_SIZE, diagnosis=None, search=None):
+    """Return ``(rows, total)`` for one keyset page of patients ordered by id.
+
+    Pass the last id of the current page as ``after_id`` for the next page, or
+    the first id as ``before_id`` for the previous one. Seeking on the primary
+    key keeps every page equally cheap, unlike ``OFFSET``.
+    """
+    clauses, params = _patient_filters(diagnosis, search)
+    order = "ASC"
+    if before_id is not None:
+        clauses.append("patient_id < ?")
+        params.append(before_id)
+        order = "DESC"
+    elif after_id is not None:
+        clauses.append("patient_id > ?")
+        params.append(after_id)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    with pooled_connection() as conn:
+        rows = conn.execute(
+            f"SELECT {PATIENT_COLUMNS} FROM patients{where} "
+            f"ORDER BY patient_id {order} LIMIT ?",
+            params + [limit],
+        ).fetchall()
+    if order == "DESC":
+        rows.reverse()
+    return Roster.from_rows(rows), count_patients(diagnosis, search)
+
+
+@cached_read("patients")
+def get_diagnosis_facets():
+    """``(diagnosis_id, name, patient_count)`` for every diagnosis in use, by name.
+
+    Counts come from the trigger-maintained ``diagnosis_counts`` rows, so this
+    reads one row per distinct diagnosis and never touches ``patients``.
+    """
+    with pooled_connection() as conn:
+        return conn.execute("""
+            SELECT d.diagnosis_id, d.name, c.patient_count
+            FROM diagnosis_counts c JOIN diagnoses d ON d.name = c.diagnosis
+            WHERE c.patient_count > 0 AND d.name != ''
+            ORDER BY d.name
+        """).fetchall()
+
+
+def get_diagnoses():
+    """Distinct diagnoses, sorted, for filter widgets."""
+    return [name for _, name, _ in get_diagnosis_facets()]
+
+
+@cached_read("patients")
+def get_dashboard_stats():
+    """Headline counts for the KPI cards, read from the trigger-maintained stats row."""
+    with pooled_connection() as conn:
+        row = conn.execute(
+            "SELECT row_count, unique_diagnoses, latest_date_added FROM patient_stats WHERE id = 1"
+        ).fetchone()
+    total, unique_diagnoses, last_entry = row or (0, 0, None)
+    return {
+        "total_patients": total,
+        "unique_diagnoses": unique_diagnoses,
+        "last_entry": last_entry,
+    }
+
+
+# ---------------------------
+# PATIENT LOOKUP
+# ---------------------------
+SUGGEST_LIMIT = 20
+
+
+@cached_read("patients")
+def get_patient(patient_id):
+    """One patient as a ``PATIENT_COLUMNS`` tuple, or ``None``; a primary-key seek."""
+    with pooled_connection() as conn:
+        return conn.execute(
+            f"SELECT {PATIENT_COLUMNS} FROM patients WHERE patient_id = ?", (patient_id,)
+        ).fetchone()
+
+
+def _id_prefix_ranges(prefix, max_id):
+    """Ascending id ranges whose decimal form starts with ``prefix``.
+
+    ``12`` covers 12, 120-129, 1200-1299, ... up to ``max_id``.
+    """
+    if prefix.startswith("0"):
+        return
+    low = high = int(prefix)
+    while low <= max_id:
+        yield low, min(high, max_id)
+        low, high = low * 10, high * 10 + 9
+
+
+def _token_prefix_bounds(prefix):
+    """``[low, high)`` bounds of the anonymized names starting with what the user typed."""
+    token = normalize_token(prefix)
+    if TOKEN_PREFIX.startswith(token.upper()):
+        token = TOKEN_PREFIX
+    elif not token.startswith(TOKEN_PREFIX):
+        token = TOKEN_PREFIX + token.lower()  # just the hex part
+    return token, token[:-1] + chr(ord(token[-1]) + 1)
+
+
+@cached_read("patients")
+def suggest_patients(prefix, limit=SUGGEST_LIMIT):
+    """Top ``limit`` ``(patient_id, anonymized_name)`` matches for a typeahead.
+
+    Digits match ids that start with them through a few primary-key range
+    scans; anything else matches anonymized tokens by prefix on
+    ``idx_patients_anon_name``. No scan reads more than ``limit`` rows.
+    """
+    prefix = prefix.strip()
+    if not prefix:
+        return []
+    with pooled_connection() as conn:
+        if prefix.isascii() and prefix.isdigit():
+            max_id = conn.execute("SELECT max(patient_id) FROM patients").fetchone()[0] or 0
+            matches = []
+            for low, high in _id_prefix_ranges(prefix, max_id):
+                matches += conn.execute(
+                    "SELECT patient_id, anonymized_name FROM patients "
+                    "WHERE patient_id BETWEEN ? AND ? ORDER BY patient_id LIMIT ?",
+                    (low, high, limit - len(matches)),
+                ).fetchall()
+                if len(matches) >= limit:
+                    break
+            return matches
+
+        low, high = _token_prefix_bounds(prefix)
+        return conn.execute(
+            "SELECT patient_id, anonymized_name FROM patients "
+            "WHERE anonymized_name >= ? AND anonymized_name < ? "
+            "ORDER BY anonymized_name, patient_id LIMIT ?",
+            (low, high, limit),
+        ).fetchall()
+
+
+# ---------------------------
+# STREAMING EXPORT
+# ---------------------------
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_SPOOL_BYTES = 8 * 1024 * 1024  # exports larger than this spill to disk
+EXPORT_HEADER = [
+    "patient_id", "name", "contact", "diagnosis",
+    "anonymized_name", "anonymized_contact", "date_added",
+]
+
+
+def iter_patient_chunks(chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield the patients table in id order, ``chunk_size`` rows at a time.
+
+    The cursor stays open between chunks, so only one chunk is ever resident.
+    """
+    with pooled_connection() as conn:
+        cur = conn.execute(f"SELECT {PATIENT_COLUMNS} FROM patients ORDER BY patient_id")
+        try:
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            cur.close()
+
+
+def write_patients_csv(stream, chunk_size=EXPORT_CHUNK_SIZE):
+    """Write the roster as properly quoted CSV to a text stream; returns the row count."""
+    writer = csv.writer(stream)
+    writer.writerow(EXPORT_HEADER)
+    count = 0
+    for rows in iter_patient_chunks(chunk_size):
+        writer.writerows(rows)
+        count += len(rows)
+    return count
+
+
+def export_patients_csv(compress=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """Return ``(file, row_count)`` with the roster CSV in a rewound spooled temp file.
+
+    Small exports stay in memory; large ones spill to disk, so peak memory is
+    bounded by the chunk size and the spool threshold rather than the table.
+    With ``compress=True`` the file holds gzip-compressed CSV.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES, mode="w+b")
+    raw = gzip.GzipFile(fileobj=spool, mode="wb", mtime=0) if compress else spool
+    text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+    try:
+        count = write_patients_csv(text, chunk_size)
+        text.flush()
+    finally:
+        text.detach()
+        if compress:
+            raw.close()
+    spool.seek(0)
+    return spool, count
+
+
+# ---------------------------
+# AUDIT LOG QUERIES
+# ---------------------------
+LOG_COLUMNS = "log_id, user_id, role, action, timestamp, details"
+CHAIN_COLUMNS = LOG_COLUMNS + ", prev_hash, entry_hash"
+
+
+def _log_filters(role=None, action=None, action_contains=None, user_id=None,
+                 since=None, until=None):
+    """Build the WHERE clause shared by get_logs and count_logs.
+
+    ``role``, ``action`` and ``user_id`` are equality predicates that lead the
+    composite ``(column, timestamp)`` indexes; ``since``/``until`` bound the
+    timestamp range (inclusive/exclusive, ``YYYY-MM-DD[ HH:MM:SS]`` strings).
+    ``action_contains`` is a case-insensitive substring match applied to the
+    rows the indexed predicates leave over.
+    """
+    clauses, params = [], []
+    if role:
+        clauses.append("role = ?")
+        params.append(role)
+    if action:
+        clauses.append("action = ?")
+        params.append(action)
+    if user_id is not None:
+        clauses.append("user_id = ?")
+        params.append(user_id)
+    if since:
+        clauses.append("timestamp >= ?")
+        params.append(since)
+    if until:
+        clauses.append("timestamp < ?")
+        params.append(until)
+    if action_contains:
+        clauses.append("action LIKE ? ESCAPE '\\'")
+        escaped = (
+            action_contains.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        )
+        params.append(f"%{escaped}%")
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+
+@cached_read("logs")
+def get_logs(role=None, action=None, action_contains=None, user_id=None,
+             since=None, until=None, limit=None, offset=0):
+    """Newest-first audit entries matching the filters; all of them by default.
+
+    The hot ``logs`` table is read first. Archived months overlapping
+    ``since``/``until`` are opened, newest first, only when the requested page
+    reaches past the hot rows.
+    """
+    flush_audit_log()
+    where, params = _log_filters(role, action, action_contains, user_id, since, until)
+    sql = f"SELECT {LOG_COLUMNS} FROM logs{where} ORDER BY timestamp DESC, log_id DESC"
+    with pooled_connection() as conn:
+        if limit is None:
+            rows = conn.execute(sql, params).fetchall()
+            for partition in _log_partitions(conn, since, until):
+                rows += _query_partition(partition, sql, params)
+            return rows
+
+        rows = conn.execute(sql + " LIMIT ? OFFSET ?", params + [limit, offset]).fetchall()
+        if len(rows) == limit:
+            return rows
+        partitions = _log_partitions(conn, since, until)
+        skip = 0
+        if partitions and not rows and offset:
+            hot = conn.execute(f"SELECT COUNT(*) FROM logs{where}", params).fetchone()[0]
+            skip = max(0, offset - hot)
+            counted = _partition_counts(
+                conn, role, action, action_contains, user_id, since, until
+            )
+
+    for partition in partitions:
+        wanted = limit - len(rows)
+        if not wanted:
+            break
+        if skip:
+            matching = counted.get(partition[0])
+            if matching is None:
+                matching = _count_partition(partition, where, params)
+            if skip >= matching:
+                skip -= matching
+                continue
+        rows += _query_partition(partition, sql + " LIMIT ? OFFSET ?", params + [wanted, skip])
+        skip = 0
+    return rows
+
+
+@cached_read("logs")
+def count_logs(role=None, action=None, action_contains=None, user_id=None,
+               since=None, until=None):
+    flush_audit_log()
+    where, params = _log_filters(role, action, action_contains, user_id, since, until)
+    with pooled_connection() as conn:
+        total = conn.execute(f"SELECT COUNT(*) FROM logs{where}", params).fetchone()[0]
+        partitions = _log_partitions(conn, since, until)
+        counted = _partition_counts(conn, role, action, action_contains, user_id, since, until)
+    return total + sum(
+        counted[p[0]] if p[0] in counted else _count_partition(p, where, params)
+        for p in partitions
+    )
+
+
+TAIL_LIMIT = 500
+
+
+@cached_read("logs")
+def get_logs_since(log_id=0, limit=TAIL_LIMIT, role=None):
+    """Up to ``limit`` entries with ``log_id`` above the cursor, oldest first.
+
+    ``log_id`` is an AUTOINCREMENT key assigned under SQLite's single writer
+    lock, so ids become visible in order and a tail never misses a row. The
+    query is a primary-key range scan: its cost depends on how many rows are
+    new, not on the size of the table. ``NOT INDEXED`` keeps the planner from
+    preferring the ``(role, timestamp)`` index, which would visit every entry
+    ever written by that role.
+    """
+    flush_audit_log()
+    where, params = _log_filters(role=role)
+    where = f"{where} AND log_id > ?" if where else " WHERE log_id > ?"
+    params += [log_id, limit]
+    with pooled_connection() as conn:
+        return conn.execute(
+            f"SELECT {LOG_COLUMNS} FROM logs NOT INDEXED{where} ORDER BY log_id LIMIT ?",
+            params,
+        ).fetchall()
+
+
+# ---------------------------
+# AUDIT LOG ARCHIVE
+# ---------------------------
+# ``logs`` is the hot partition every write goes to. Months older than
+# LOG_HOT_MONTHS are moved out by ``archive_logs`` into one SQLite file per
+# month, vacuumed, gzip-compressed and made read-only, and recorded in the
+# ``log_partitions`` manifest. Reads decompress an archive into a temp file
+# the first time they need it and open it read-only; the manifest's timestamp
+# bounds keep range queries away from months they cannot match, and
+# ``log_partition_counts`` answers filtered counts without opening the files.
+LOG_HOT_MONTHS = int(os.environ.get("HMS_LOG_HOT_MONTHS", "3"))
+LOG_ARCHIVE_DIR = os.environ.get("HMS_LOG_ARCHIVE_DIR")  # default: <db>_archive/
+ARCHIVE_CACHE_FILES = 4  # decompressed archives kept on disk at once
+
+ARCHIVE_SCHEMA = """
+CREATE TABLE logs (
+    log_id INTEGER PRIMARY KEY,
+    user_id INTEGER,
+    role TEXT,
+    action TEXT,
+    timestamp TEXT,
+    details TEXT,
+    prev_hash TEXT,
+    entry_hash TEXT
+);
+CREATE INDEX idx_logs_timestamp ON logs(timestamp);
+CREATE INDEX idx_logs_role_ts ON logs(role, timestamp);
+CREATE INDEX idx_logs_action_ts ON logs(action, timestamp);
+CREATE INDEX idx_logs_user_ts ON logs(user_id, timestamp);
+"""
+
+_extracted = OrderedDict()  # archive file name -> decompressed temp path
+_extracted_lock = threading.Lock()  # guards the two maps, never held while decompressing
+_extract_locks = {}  # archive file name -> lock held while that file is decompressed
+_extract_dir = None
+
+
+def log_archive_dir():
+    """Directory holding the compressed month archives for the current DB."""
+    if LOG_ARCHIVE_DIR:
+        return LOG_ARCHIVE_DIR
+    return os.path.splitext(os.path.abspath(DB_NAME))[0] + "_archive"
+
+
+def _log_partitions(conn, since=None, until=None):
+    """Manifest rows for archived months overlapping ``[since, until)``, newest first."""
+    return conn.execute("""
+        SELECT month, file_name, row_count FROM log_partitions
+        WHERE (? IS NULL OR max_timestamp >= ?) AND (? IS NULL OR min_timestamp < ?)
+        ORDER BY month DESC
+    """, (since, since, until, until)).fetchall()
+
+
+def _cleanup_extracted():
+    global _extract_dir
+    with _extracted_lock:
+        for path in _extracted.values():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        _extracted.clear()
+        if _extract_dir:
+            try:
+                os.rmdir(_extract_dir)
+            except OSError:
+                pass
+            _extract_dir = None
+
+
+atexit.register(_cleanup_extracted)
+
+
+def _cached_extract(file_name):
+    """Decompressed path of ``file_name`` if it is cached; call with ``_extracted_lock`` held."""
+    path = _extracted.get(file_name)
+    if path and os.path.exists(path):
+        _extracted.move_to_end(file_name)
+        return path
+    return None
+
+
+def _extracted_archive(file_name):
+    """Path of a decompressed copy of ``file_name``, extracting it if needed.
+
+    Each file has its own lock, so sessions reading different months
+    decompress in parallel and only readers of the same month wait.
+    """
+    global _extract_dir
+    with _extracted_lock:
+        path = _cached_extract(file_name)
+        if path:
+            return path
+        if _extract_dir is None:
+            _extract_dir = tempfile.mkdtemp(prefix="hms-log-archive-")
+        directory = _extract_dir
+        file_lock = _extract_locks.setdefault(file_name, threading.Lock())
+
+    with file_lock:
+        with _extracted_lock:
+            path = _cached_extract(file_name)  # another reader just extracted it
+        if path:
+            return path
+        path = os.path.join(directory, file_name[:-len(".gz")])
+        with gzip.open(os.path.join(log_archive_dir(), file_name), "rb") as src, \
+                open(path + ".part", "wb") as dst:
+            while True:
+                chunk = src.read(1 << 20)
+                if not chunk:
+                    break
+                dst.write(chunk)
+        os.replace(path + ".part", path)
+        with _extracted_lock:
+            _extracted[file_name] = path
+            while len(_extracted) > ARCHIVE_CACHE_FILES:
+                _, evicted = _extracted.popitem(last=False)
+                try:
+                    os.remove(evicted)
+                except OSError:
+                    pass
+        return path
+
+
+@contextmanager
+def _archive_connection(file_name):
+    path = _extracted_archive(file_name)
+    conn = sqlite3.connect(f"file:{path}?mode=ro&immutable=1", uri=True)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def _query_partition(partition, sql, params):
+    with _archive_connection(partition[1]) as conn:
+        return conn.execute(sql, params).fetchall()
+
+
+def _count_partition(partition, where, params):
+    if not where:
+        return partition[2]
+    with _archive_connection(partition[1]) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM logs{where}", params).fetchone()[0]
+
+
+def _partition_counts(conn, role=None, action=None, action_contains=None, user_id=None,
+                      since=None, until=None):
+    """``{month: matching rows}`` for archived months answerable from their counts.
+
+    That is every summarized month lying wholly inside ``[since, until)``; a
+    month cut by the time window is left out and counted from its file.
+    """
+    where, params = _log_filters(role, action, action_contains, user_id)
+    match = f" AND {where[len(' WHERE '):]}" if where else ""
+    return dict(conn.execute(f"""
+        SELECT p.month, (
+            SELECT COALESCE(SUM(c.row_count), 0) FROM log_partition_counts c
+            WHERE c.month = p.month{match}
+        )
+        FROM log_partitions p
+        WHERE EXISTS (SELECT 1 FROM log_partition_counts c WHERE c.month = p.month)
+          AND (? IS NULL OR p.min_timestamp >= ?) AND (? IS NULL OR p.max_timestamp < ?)
+    """, params + [since, since, until, until]).fetchall())
+
+
+def _hot_cutoff(hot_months):
+    """First timestamp that stays hot: the start of the oldest hot month."""
+    today = datetime.now()
+    months = today.year * 12 + today.month - 1 - (hot_months - 1)
+    return f"{months // 12:04d}-{months % 12 + 1:02d}-01 00:00:00"
+
+
+def _write_archive(conn, month, file_name):
+    """Copy one month of ``logs`` into a compressed, read-only archive file."""
+    directory = log_archive_dir()
+    os.makedirs(directory, exist_ok=True)
+    raw_path = os.path.join(directory, file_name[:-len(".gz")] + ".tmp")
+    if os.path.exists(raw_path):
+        os.remove(raw_path)
+
+    archive = sqlite3.connect(raw_path)
+    try:
+        _run_script(archive, ARCHIVE_SCHEMA)
+        cursor = conn.execute(
+            f"SELECT {CHAIN_COLUMNS} FROM logs WHERE timestamp >= ? AND timestamp < ? "
+            "ORDER BY log_id",
+            (f"{month}-01", f"{month}-32"),
+        )
+        while True:
+            rows = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+            if not rows:
+                break
+            archive.executemany(
+                f"INSERT INTO logs ({CHAIN_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+        archive.commit()
+        archive.execute("VACUUM")
+    finally:
+        archive.close()
+
+    final_path = os.path.join(directory, file_name)
+    with open(raw_path, "rb") as src, gzip.open(final_path + ".part", "wb") as dst:
+        while True:
+            chunk = src.read(1 << 20)
+            if not chunk:
+                break
+            dst.write(chunk)
+    os.remove(raw_path)
+    if os.path.exists(final_path):
+        os.chmod(final_path, 0o644)
+    os.replace(final_path + ".part", final_path)
+    os.chmod(final_path, 0o444)
+
+
+def archive_logs(hot_months=None):
+    """Move audit months older than the hot window into compressed archives.
+
+    Each month is written and compressed first; only then are its manifest
+    row and the deletion from ``logs`` committed together. A crash in between
+    leaves the rows in ``logs`` and the month is simply archived again next
+    time. Returns the archived months.
+    """
+    hot_months = LOG_HOT_MONTHS if hot_months is None else hot_months
+    flush_audit_log()
+    archived = []
+    with pooled_connection() as conn:
+        months = conn.execute("""
+            SELECT substr(timestamp, 1, 7) AS month, COUNT(*), MIN(log_id), MAX(log_id),
+                   MIN(timestamp), MAX(timestamp)
+            FROM logs
+            WHERE timestamp < ?
+              AND substr(timestamp, 1, 7) NOT IN (SELECT month FROM log_partitions)
+            GROUP BY month ORDER BY month
+        """, (_hot_cutoff(hot_months),)).fetchall()
+
+        for month, row_count, min_id, max_id, min_ts, max_ts in months:
+            file_name = f"logs_{month.replace('-', '_')}.db.gz"
+            _write_archive(conn, month, file_name)
+            month_range = (f"{month}-01", f"{month}-32")
+            with transaction():
+                current = conn.execute(
+                    "SELECT COUNT(*), MIN(log_id), MAX(log_id) FROM logs "
+                    "WHERE timestamp >= ? AND timestamp < ?",
+                    month_range,
+                ).fetchone()
+                if current != (row_count, min_id, max_id):
+                    # Rows for this month changed mid-archive; redo it next run.
+                    continue
+                conn.execute("""
+                    INSERT INTO log_partition_counts
+                    SELECT ?, role, action, user_id, COUNT(*) FROM logs
+                    WHERE timestamp >= ? AND timestamp < ? GROUP BY role, action, user_id
+                """, (month, *month_range))
+                conn.execute(
+                    "DELETE FROM logs WHERE timestamp >= ? AND timestamp < ?", month_range
+                )
+                conn.execute(
+                    "INSERT INTO log_partitions VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)",
+                    (month, file_name, row_count, min_id, max_id, min_ts, max_ts,
+                     datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+                )
+            archived.append(month)
+    return archived
+
+
+def get_log_partitions():
+    """Manifest of archived audit months, newest first."""
+    with pooled_connection() as conn:
+        return conn.execute("""
+            SELECT month, file_name, row_count, min_timestamp, max_timestamp, archived_at
+            FROM log_partitions ORDER BY month DESC
+        """).fetchall()
+
+
+# ---------------------------
+# AUDIT CHAIN VERIFICATION
+# ---------------------------
+# A verification run rehashes a log_id range and, when it passes, stores a
+# checkpoint signed with AUDIT_KEY_ENV (or a key derived from the pseudonym
+# key). The default run starts at the latest checkpoint, so its cost follows
+# the rows added since then. A full audit rehashes the whole chain, split
+# into id-range segments checked in parallel worker processes, and also
+# confirms every earlier checkpoint still matches. That is what catches a
+# history rewritten with recomputed hashes.
+AUDIT_KEY_ENV = "HMS_AUDIT_KEY"
+VERIFY_SEGMENT_ROWS = 100_000
+VERIFY_WORKERS = int(os.environ.get("HMS_VERIFY_WORKERS", "0")) or os.cpu_count() or 1
+
+CHECKPOINT_COLUMNS = "checkpoint_id, log_id, entry_hash, rows_verified, mode, verified_at, signature"
+
+
+def _checkpoint_key():
+    env_key = os.environ.get(AUDIT_KEY_ENV)
+    if env_key:
+        return env_key.encode("utf-8")
+    return hmac.new(load_pseudonym_key(), b"audit-checkpoint", hashlib.sha256).digest()
+
+
+def _checkpoint_signature(log_id, entry_hash, rows_verified, mode, verified_at):
+    message = f"{log_id}|{entry_hash}|{rows_verified}|{mode}|{verified_at}".encode("utf-8")
+    return hmac.new(_checkpoint_key(), message, hashlib.sha256).hexdigest()
+
+
+def _checkpoint_valid(checkpoint):
+    return hmac.compare_digest(checkpoint[6], _checkpoint_signature(*checkpoint[1:6]))
+
+
+def get_log_checkpoints(limit=20):
+    """Most recent verification checkpoints, newest first."""
+    with pooled_connection() as conn:
+        return conn.execute(
+            f"SELECT {CHECKPOINT_COLUMNS} FROM log_checkpoints ORDER BY checkpoint_id DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+
+
+def _plan_segments(conn, low, high, segment_rows):
+    """Split ``[low, high]`` into id ranges, each with the sources holding its rows.
+
+    Hot rows are cut every ``segment_rows`` ids and each chained archive is
+    one range. Ranges that overlap (a month archived with ids interleaved
+    with its neighbours) are merged so every range reads all of its sources.
+    """
+    intervals = []
+    hot_min, hot_max = conn.execute("SELECT MIN(log_id), MAX(log_id) FROM logs").fetchone()
+    if hot_min is not None:
+        start, end = max(low, hot_min), min(high, hot_max)
+        for segment_low in range(start, end + 1, segment_rows):
+            intervals.append(
+                (segment_low, min(segment_low + segment_rows - 1, end), {("hot", None)})
+            )
+    for file_name, min_id, max_id in conn.execute(
+        "SELECT file_name, min_log_id, max_log_id FROM log_partitions "
+        "WHERE chained = 1 AND max_log_id >= ? AND min_log_id <= ?",
+        (low, high),
+    ):
+        intervals.append((max(low, min_id), min(high, max_id), {("archive", file_name)}))
+
+    segments = []
+    for segment_low, segment_high, sources in sorted(intervals, key=itemgetter(0, 1)):
+        if segments and segment_low <= segments[-1][1]:
+            segments[-1][1] = max(segments[-1][1], segment_high)
+            segments[-1][2] |= sources
+        else:
+            segments.append([segment_low, segment_high, set(sources)])
+    return [(low, high, sorted(sources, key=str)) for low, high, sources in segments]
+
+
+def _verify_segment(low, high, sources, anchors):
+    """Rehash the rows with ids in ``[low, high]`` and check each links to the one before.
+
+    ``anchors`` maps checkpointed log ids in the range to their recorded
+    hashes. Returns ``(rows, first, last, anchors_seen, error)``; ``first``
+    and ``last`` are ``(log_id, prev_hash, entry_hash)`` of the edge rows,
+    which the caller uses to stitch segments together.
+    """
+    with ExitStack() as stack:
+        cursors = []
+        for kind, file_name in sources:
+            if kind == "hot":
+                stack.enter_context(read_source("readonly"))
+                conn = stack.enter_context(pooled_connection())
+            else:
+                conn = stack.enter_context(_archive_connection(file_name))
+            cursors.append(conn.execute(
+                f"SELECT {CHAIN_COLUMNS} FROM logs WHERE log_id BETWEEN ? AND ? ORDER BY log_id",
+                (low, high),
+            ))
+
+        rows, first, last, anchors_seen = 0, None, None, 0
+        for row in heapq.merge(*cursors, key=itemgetter(0)):
+            log_id, prev_hash, entry_hash = row[0], row[6], row[7]
+            if entry_hash != _entry_hash(prev_hash, row[1:6]):
+                return rows, first, last, anchors_seen, f"log_id {log_id}: entry was altered"
+            if last is not None and prev_hash != last[2]:
+                return rows, first, last, anchors_seen, (
+                    f"log_id {log_id}: chain broken, an entry before it was removed or altered"
+                )
+            if log_id in anchors:
+                if anchors[log_id] != entry_hash:
+                    return rows, first, last, anchors_seen, (
+                        f"log_id {log_id}: differs from a signed checkpoint"
+                    )
+                anchors_seen += 1
+            last = (log_id, prev_hash, entry_hash)
+            first = first or last
+            rows += 1
+        return rows, first, last, anchors_seen, None
+
+
+def _init_verify_worker(db_name, archive_dir):
+    global DB_NAME, LOG_ARCHIVE_DIR
+    DB_NAME, LOG_ARCHIVE_DIR = db_name, archive_dir
+
+
+def _verify_segment_task(low, high, sources, anchors):
+    try:
+        return _verify_segment(low, high, sources, anchors)
+    finally:
+        _cleanup_extracted()  # worker processes exit without running atexit hooks
+
+
+def verify_logs(full=False, workers=None, segment_rows=VERIFY_SEGMENT_ROWS):
+    """Verify the audit hash chain and record a signed checkpoint when it holds.
+
+    By default only entries after the latest checkpoint are rehashed (plus
+    the checkpointed entry, which must be unchanged); the first run, or
+    ``full=True``, covers the whole chain with up to ``workers`` processes.
+    Months archived before the chain existed are not covered. Workers are
+    spawned, so scripts running a full audit need an ``if __name__ ==
+    "__main__"`` guard. Returns a dict with ``ok`` and, on failure, an
+    ``error`` naming the first bad entry.
+    """
+    started = time.perf_counter()
+    flush_audit_log()
+    with pooled_connection() as conn:
+        head = conn.execute("SELECT log_id, entry_hash FROM log_chain WHERE id = 1").fetchone()
+        checkpoints = conn.execute(
+            f"SELECT {CHECKPOINT_COLUMNS} FROM log_checkpoints ORDER BY checkpoint_id DESC"
+            + ("" if full else " LIMIT 1")
+        ).fetchall()
+        full = full or not checkpoints
+        low = 1 if full else checkpoints[0][1]
+        segments = _plan_segments(conn, low, head[0], segment_rows)
+
+    result = {"ok": False, "mode": "full" if full else "incremental", "from_log_id": low,
+              "to_log_id": head[0], "rows": 0, "segments": len(segments), "error": None,
+              "checkpoint_id": None}
+    bad = next((c[0] for c in checkpoints if not _checkpoint_valid(c)), None)
+    if bad is not None:
+        result["error"] = f"checkpoint {bad} has an invalid signature"
+        return result
+    anchors = {c[1]: c[2] for c in checkpoints}
+
+    tasks = [
+        (seg_low, seg_high, sources,
+         {log_id: entry for log_id, entry in anchors.items() if seg_low <= log_id <= seg_high})
+        for seg_low, seg_high, sources in segments
+    ]
+    workers = min(workers or VERIFY_WORKERS, len(tasks))
+    if full and workers > 1:
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_verify_worker, initargs=(os.path.abspath(DB_NAME), log_archive_dir()),
+        ) as pool:
+            outcomes = list(pool.map(_verify_segment_task, *zip(*tasks)))
+    else:
+        outcomes = [_verify_segment(*task) for task in tasks]
+
+    previous, anchors_seen, error = None, 0, None
+    for rows, first, last, seen, error in outcomes:
+        result["rows"] += rows
+        anchors_seen += seen
+        if error:
+            break
+        if not rows:
+            continue
+        if previous is None:
+            if full and first[1] != GENESIS_HASH:
+                error = f"log_id {first[0]}: chain does not start at the genesis hash"
+            elif not full and first[0] != low:
+                error = f"log_id {low}: checkpointed entry is missing"
+        elif first[1] != previous[2]:
+            error = f"log_id {first[0]}: chain broken, an entry before it was removed or altered"
+        if error:
+            break
+        previous = last
+
+    if not error and anchors_seen != len(anchors):
+        error = "an entry recorded by a signed checkpoint is missing"
+    if not error and head[0] and (previous is None or previous[0] != head[0] or previous[2] != head[1]):
+        error = f"chain ends before log_id {head[0]}, the recorded head; entries were removed"
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    if error:
+        result["error"] = error
+        return result
+
+    result["ok"] = True
+    if head[0]:
+        verified_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        signature = _checkpoint_signature(head[0], head[1], result["rows"], result["mode"], verified_at)
+        with transaction() as conn:
+            result["checkpoint_id"] = conn.execute(
+                "INSERT INTO log_checkpoints (log_id, entry_hash, rows_verified, mode, verified_at, "
+                "signature) VALUES (?, ?, ?, ?, ?, ?)",
+                (head[0], head[1], result["rows"], result["mode"], verified_at, signature),
+            ).lastrowid
+    return result
+
+
+# ---------------------------
+# FULL-TEXT SEARCH
+# ---------------------------
+SEARCH_LIMIT = 50
+
+
+def _fts_query(text):
+    """Turn free text into a safe FTS5 query: every word as a quoted prefix term."""
+    terms = re.findall(r"\w+", text.lower())
+    return " ".join(f'"{term}"*' for term in terms) or None
+
+
+@cached_read("patients")
+def search_patients(text, limit=SEARCH_LIMIT, diagnosis=None):
+    """Best-ranked patients whose diagnosis or anonymized name/contact match ``text``.
+
+    A purely numeric ``text`` also matches that patient id exactly, listed first.
+    """
+    query = _fts_query(text)
+    if query is None:
+        return Roster()
+    extra, params = "", [query]
+    if diagnosis:
+        extra = " AND p." + DIAGNOSIS_PREDICATE
+        params.append(diagnosis)
+
+    with pooled_connection() as conn:
+        rows = conn.execute(
+            f"SELECT {', '.join('p.' + c for c in PATIENT_COLUMNS.split(', '))} "
+            "FROM patients_fts JOIN patients p ON p.patient_id = patients_fts.rowid "
+            f"WHERE patients_fts MATCH ?{extra} ORDER BY patients_fts.rank LIMIT ?",
+            params + [limit],
+        ).fetchall()
+        patient_id = text.strip()
+        if patient_id.isascii() and patient_id.isdigit():
+            exact = conn.execute(
+                f"SELECT {PATIENT_COLUMNS} FROM patients WHERE patient_id = ?"
+                + (" AND " + DIAGNOSIS_PREDICATE if diagnosis else ""),
+                [int(patient_id)] + ([diagnosis] if diagnosis else []),
+            ).fetchone()
+            if exact:
+                rows = [exact] + [row for row in rows if row[0] != exact[0]][:limit - 1]
+    return Roster.from_rows(rows)
+
+
+@cached_read("logs")
+def search_logs(text, limit=SEARCH_LIMIT, role=None, since=None):
+    """Best-ranked audit entries whose action or details match ``text``.
+
+    Only the hot ``logs`` table is indexed; archived months are reachable
+    through ``get_logs``.
+    """
+    query = _fts_query(text)
+    if query is None:
+        return []
+    flush_audit_log()
+    extra, params = "", [query]
+    if role:
+        extra += " AND l.role = ?"
+        params.append(role)
+    if since:
+        extra += " AND l.timestamp >= ?"
+        params.append(since)
+
+    with pooled_connection() as conn:
+        return conn.execute(
+            f"SELECT {', '.join('l.' + c for c in LOG_COLUMNS.split(', '))} "
+            "FROM logs_fts JOIN logs l ON l.log_id = logs_fts.rowid "
+            f"WHERE logs_fts MATCH ?{extra} ORDER BY logs_fts.rank LIMIT ?",
+            params + [limit],
+        ).fetchall()
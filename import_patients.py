@@ -0,0 +1,163 @@
+"""
+import_patients.py
+------------------
+Command-line importer for partner-clinic intake files.
+
+Streams a CSV (``name,contact,diagnosis`` header) or JSON-lines file (objects
+with the same keys) into the patients table through ``add_patients_bulk``, one
+transaction per batch. The number of rows consumed is stored in the
+``import_progress`` table inside that same transaction, so a failed run can be
+restarted and picks up where it stopped instead of duplicating patients. A
+checkpoint file mirrors the progress as a status report only.
+
+Usage:
+    python import_patients.py intake.csv
+    python import_patients.py intake.jsonl --batch-size 5000 --user-id 1
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from itertools import islice
+
+import database
+from database import (
+    add_patients_bulk,
+    create_tables,
+    get_import_progress,
+    record_import_progress,
+    reset_import_progress,
+    transaction,
+)
+
+
+def detect_format(path):
+    """Guess the input format from the file extension."""
+    return "jsonl" if path.lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def iter_records(path, fmt):
+    """Stream ``(name, contact, diagnosis)`` tuples without loading the file.
+
+    A line that can't be parsed raises ``ValueError`` naming its line number.
+    """
+    with open(path, newline="", encoding="utf-8") as handle:
+        if fmt == "csv":
+            reader = csv.DictReader(handle)
+            try:
+                for row in reader:
+                    yield row.get("name", ""), row.get("contact", ""), row.get("diagnosis", "")
+            except csv.Error as exc:
+                raise ValueError(f"line {reader.line_num}: {exc}")
+        else:
+            for line_number, line in enumerate(handle, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as exc:
+                    raise ValueError(f"line {line_number}: invalid JSON ({exc})")
+                if not isinstance(row, dict):
+                    raise ValueError(f"line {line_number}: expected a JSON object")
+                yield row.get("name", ""), row.get("contact", ""), row.get("diagnosis", "")
+
+
+def save_checkpoint(path, source, rows_committed, complete=False, error=None):
+    """Write a progress report for people watching the import.
+
+    Resuming reads ``import_progress`` instead; this file may lag a batch behind.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        json.dump(
+            {
+                "source": os.path.abspath(source),
+                "rows_committed": rows_committed,
+                "complete": complete,
+                "error": error,
+                "updated": time.strftime("%Y-%m-%d %H:%M:%S"),
+            },
+            handle,
+        )
+    os.replace(tmp_path, path)
+
+
+def run_import(path, fmt, batch_size, checkpoint, user_id, role):
+    """Import ``path`` batch by batch, resuming after the rows already recorded."""
+    done = (get_import_progress(path) or (0, False))[0]
+    if done:
+        print(f"Resuming after {done} rows already committed.")
+
+    records = islice(iter_records(path, fmt), done, None)
+    source = os.path.basename(path)
+    started = time.perf_counter()
+    imported = 0
+
+    while True:
+        batch_started = time.perf_counter()
+        try:
+            batch = list(islice(records, batch_size))
+        except ValueError as exc:
+            # Nothing of this batch is committed; fix the line and rerun to resume.
+            message = f"Unreadable record after row {done}: {exc}"
+            save_checkpoint(checkpoint, path, done, error=message)
+            raise SystemExit(message)
+        if not batch:
+            break
+        try:
+            with transaction():
+                add_patients_bulk(batch, user_id=user_id, role=role,
+                                  source=f"{source} rows {done + 1}-{done + len(batch)}")
+                record_import_progress(path, done + len(batch))
+        except ValueError as exc:
+            # Report the absolute row number so the clinic can fix the file.
+            message = f"Batch starting at row {done + 1} rejected: {exc}"
+            save_checkpoint(checkpoint, path, done, error=message)
+            raise SystemExit(message)
+        done += len(batch)
+        imported += len(batch)
+        save_checkpoint(checkpoint, path, done)
+
+        batch_elapsed = time.perf_counter() - batch_started
+        print(f"  committed {done} rows ({len(batch) / batch_elapsed:,.0f} rows/sec)")
+
+    record_import_progress(path, done, complete=True)
+    save_checkpoint(checkpoint, path, done, complete=True)
+    elapsed = time.perf_counter() - started
+    rate = imported / elapsed if elapsed else 0.0
+    print(f"Imported {imported} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec).")
+    return imported
+
+
+def main():
+    """Entry point for the bulk importer CLI."""
+    parser = argparse.ArgumentParser(description="Bulk-import patients from CSV/JSONL.")
+    parser.add_argument("path", help="CSV or JSON-lines intake file")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="override format detection")
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows per transaction")
+    parser.add_argument("--checkpoint", help="progress report file (default: <path>.checkpoint.json)")
+    parser.add_argument("--restart", action="store_true", help="forget recorded progress and start over")
+    parser.add_argument("--user-id", type=int, help="user id recorded in the audit log")
+    parser.add_argument("--role", default="admin", help="role recorded in the audit log")
+    parser.add_argument("--db", default=database.DB_NAME, help="SQLite database file")
+    args = parser.parse_args()
+
+    database.DB_NAME = args.db
+    create_tables()
+
+    checkpoint = args.checkpoint or args.path + ".checkpoint.json"
+    if args.restart:
+        reset_import_progress(args.path)
+    elif (get_import_progress(args.path) or (0, False))[1]:
+        print(f"{args.path} was already imported; use --restart.")
+        sys.exit(0)
+
+    run_import(args.path, args.format or detect_format(args.path), args.batch_size,
+               checkpoint, args.user_id, args.role)
+
+
+if __name__ == "__main__":
+    main()
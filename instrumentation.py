@@ -0,0 +1,415 @@
+"""
+Query tracing and latency instrumentation.
+
+Every pooled connection is a ``TracedConnection``: its cursors time each
+``execute``/``executemany`` and count the rows they return or change, keyed by
+the parameterized statement text (bound values never reach the metrics, so no
+patient data ends up in a scrape). The sqlite3 trace callback counts the
+statements SQLite actually runs, including trigger programs and implicit
+``BEGIN``s, which the cursor wrapper cannot see.
+
+``span(name)`` times a block of code and attributes the SQL time spent inside
+it, which is what the dashboards wrap around each role's view. Everything is
+kept in rolling histograms and can be rendered as Prometheus text with
+``render_prometheus()``, written to a file, or served on a local port.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ENABLED = os.environ.get("HMS_TRACE", "1") != "0"
+WINDOW = 2048  # samples kept per series for percentiles
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+MAX_STATEMENTS = 500  # distinct statement shapes tracked before folding into "other"
+
+_lock = threading.Lock()
+_local = threading.local()
+_queries = {}
+_queries_by_text = {}  # raw statement text -> series, skips re-normalizing hot SQL
+_spans = {}
+_collectors = []
+_counters = {"sqlite_statements_total": 0}
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted sequence (0.0 when empty)."""
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+class RollingHistogram:
+    """Cumulative Prometheus-style buckets plus a window of recent samples."""
+
+    def __init__(self, window=WINDOW):
+        self.samples = deque(maxlen=window)
+        self.buckets = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, ms):
+        self.samples.append(ms)
+        self.count += 1
+        self.total += ms
+        for index, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                self.buckets[index] += 1
+                break
+
+    def percentile(self, pct):
+        return percentile(sorted(self.samples), pct)
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "total_ms": round(self.total, 3),
+            "mean_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50), 3),
+            "p95_ms": round(self.percentile(95), 3),
+            "p99_ms": round(self.percentile(99), 3),
+        }
+
+
+class _QueryStats:
+    def __init__(self):
+        self.latency = RollingHistogram()
+        self.rows = 0
+        self.fetch_ms = 0.0
+
+
+def normalize_sql(sql):
+    """Collapse whitespace so one statement shape maps to one series."""
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+def _query_stats(sql):
+    stats = _queries_by_text.get(sql)
+    if stats is not None:
+        return stats
+    key = normalize_sql(sql)
+    with _lock:
+        stats = _queries.get(key)
+        if stats is None:
+            if len(_queries) >= MAX_STATEMENTS:
+                key = "other"
+                stats = _queries.setdefault(key, _QueryStats())
+            else:
+                stats = _queries[key] = _QueryStats()
+        if len(_queries_by_text) < MAX_STATEMENTS * 4:
+            _queries_by_text[sql] = stats
+    return stats
+
+
+def _thread_sql_ms():
+    return getattr(_local, "sql_ms", 0.0)
+
+
+def _add_thread_sql_ms(ms):
+    _local.sql_ms = _thread_sql_ms() + ms
+
+
+def record_query(sql, ms, rows=0):
+    """Record one statement execution; returns its stats series."""
+    stats = _query_stats(sql)
+    with _lock:
+        stats.latency.observe(ms)
+        stats.rows += max(rows, 0)
+    _add_thread_sql_ms(ms)
+    return stats
+
+
+def _record_fetch(stats, ms, rows):
+    with _lock:
+        stats.rows += rows
+        stats.fetch_ms += ms
+    _add_thread_sql_ms(ms)
+
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor that times statements and counts the rows they produce."""
+
+    _stats = None
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._finish(sql, started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._finish(sql, started)
+
+    def _finish(self, sql, started):
+        if not ENABLED:
+            return
+        ms = (time.perf_counter() - started) * 1000
+        self._stats = record_query(sql, ms, self.rowcount)
+
+    def _fetched(self, started, rows):
+        if ENABLED and self._stats is not None and rows:
+            _record_fetch(self._stats, (time.perf_counter() - started) * 1000, rows)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, 1 if row is not None else 0)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows))
+        return rows
+
+
+def _trace_statement(_statement):
+    # The text is the *expanded* SQL, bound values included, so it is counted
+    # but deliberately never stored.
+    # Unlocked on purpose: this runs for every statement, and a rare lost
+    # increment under contention is fine for a throughput counter.
+    _local.statements = getattr(_local, "statements", 0) + 1
+    _counters["sqlite_statements_total"] += 1
+
+
+class TracedConnection(sqlite3.Connection):
+    """Connection whose cursors (including ``conn.execute``) are traced."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if ENABLED:
+            self.set_trace_callback(_trace_statement)
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    # sqlite3.Connection.execute* bypass overridden cursor methods, so route
+    # them through a traced cursor explicitly.
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+# ---------------------------
+# Spans
+# ---------------------------
+@contextmanager
+def span(name):
+    """Time a block and the SQL executed on this thread while it ran."""
+    if not ENABLED:
+        yield
+        return
+    sql_before = _thread_sql_ms()
+    statements_before = getattr(_local, "statements", 0)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = (time.perf_counter() - started) * 1000
+        sql_ms = _thread_sql_ms() - sql_before
+        statements = getattr(_local, "statements", 0) - statements_before
+        with _lock:
+            entry = _spans.setdefault(
+                name, {"latency": RollingHistogram(), "sql_ms": 0.0, "statements": 0}
+            )
+            entry["latency"].observe(elapsed)
+            entry["sql_ms"] += sql_ms
+            entry["statements"] += statements
+
+
+def thread_sql_ms():
+    """Milliseconds of SQL executed by the current thread so far."""
+    return _thread_sql_ms()
+
+
+# ---------------------------
+# Reporting
+# ---------------------------
+def register_collector(func):
+    """Register a callable returning ``{metric_name: value}`` gauges for export."""
+    if func not in _collectors:
+        _collectors.append(func)
+    return func
+
+
+def query_report(limit=25, order_by="total_ms"):
+    """Per-statement summaries, heaviest first."""
+    with _lock:
+        rows = [
+            dict(stats.latency.summary(), sql=sql, rows=stats.rows,
+                 fetch_ms=round(stats.fetch_ms, 3))
+            for sql, stats in _queries.items()
+        ]
+    rows.sort(key=lambda row: row[order_by], reverse=True)
+    return rows[:limit]
+
+
+def span_report():
+    """Per-span latency with the share of it spent in SQL."""
+    with _lock:
+        report = []
+        for name, entry in _spans.items():
+            summary = entry["latency"].summary()
+            summary.update(
+                span=name,
+                sql_ms=round(entry["sql_ms"], 3),
+                sql_share=round(entry["sql_ms"] / summary["total_ms"], 3)
+                if summary["total_ms"] else 0.0,
+                statements=entry["statements"],
+            )
+            report.append(summary)
+    report.sort(key=lambda row: row["total_ms"], reverse=True)
+    return report
+
+
+def reset():
+    """Drop all recorded series (benchmarks call this between runs)."""
+    with _lock:
+        _queries.clear()
+        _queries_by_text.clear()
+        _spans.clear()
+        _counters["sqlite_statements_total"] = 0
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def _histogram_lines(metric, labels, histogram):
+    lines = []
+    cumulative = 0
+    for bound, count in zip(BUCKETS_MS, histogram.buckets):
+        cumulative += count
+        lines.append(f'{metric}_bucket{{{labels},le="{bound / 1000:g}"}} {cumulative}')
+    lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+    lines.append(f"{metric}_sum{{{labels}}} {histogram.total / 1000:.6f}")
+    lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+    return lines
+
+
+def render_prometheus():
+    """All metrics in the Prometheus text exposition format."""
+    lines = [
+        "# HELP hms_sql_query_duration_seconds Statement execute time by statement shape.",
+        "# TYPE hms_sql_query_duration_seconds histogram",
+    ]
+    with _lock:
+        queries = list(_queries.items())
+        spans = list(_spans.items())
+        for sql, stats in queries:
+            lines += _histogram_lines("hms_sql_query_duration_seconds",
+                                      f'sql="{_label(sql)}"', stats.latency)
+        lines += [
+            "# HELP hms_sql_rows_total Rows returned or changed by statement shape.",
+            "# TYPE hms_sql_rows_total counter",
+        ]
+        lines += [f'hms_sql_rows_total{{sql="{_label(sql)}"}} {stats.rows}'
+                  for sql, stats in queries]
+        lines += [
+            "# HELP hms_span_duration_seconds Wall time of instrumented UI blocks.",
+            "# TYPE hms_span_duration_seconds histogram",
+        ]
+        for name, entry in spans:
+            lines += _histogram_lines("hms_span_duration_seconds",
+                                      f'span="{_label(name)}"', entry["latency"])
+        lines += [
+            "# HELP hms_span_sql_seconds_total SQL time spent inside each span.",
+            "# TYPE hms_span_sql_seconds_total counter",
+        ]
+        lines += [f'hms_span_sql_seconds_total{{span="{_label(name)}"}} '
+                  f'{entry["sql_ms"] / 1000:.6f}' for name, entry in spans]
+        lines += [
+            "# HELP hms_sqlite_statements_total Statements run by SQLite, triggers included.",
+            "# TYPE hms_sqlite_statements_total counter",
+            f"hms_sqlite_statements_total {_counters['sqlite_statements_total']}",
+        ]
+
+    for collector in list(_collectors):
+        for name, value in collector().items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append(f"hms_{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    """Write the exposition atomically, e.g. for node_exporter's textfile collector."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        handle.write(render_prometheus())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_server = None
+_exporter = None
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """Serve ``/metrics`` on a local port from a daemon thread (once per process)."""
+    global _server
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="metrics-http",
+                             daemon=True).start()
+    return _server
+
+
+def start_file_exporter(path, interval=15.0):
+    """Rewrite the metrics file every ``interval`` seconds (once per process)."""
+    global _exporter
+
+    def loop():
+        while True:
+            write_prometheus(path)
+            time.sleep(interval)
+
+    with _lock:
+        if _exporter is None:
+            _exporter = threading.Thread(target=loop, name="metrics-file", daemon=True)
+            _exporter.start()
+    return _exporter
+
+
+def start_exporters_from_env():
+    """Honour ``HMS_METRICS_PORT`` and ``HMS_METRICS_FILE`` if they are set."""
+    port = os.environ.get("HMS_METRICS_PORT")
+    if port:
+        start_metrics_server(int(port))
+    path = os.environ.get("HMS_METRICS_FILE")
+    if path:
+        start_file_exporter(path)
@@ -0,0 +1,90 @@
+"""
+Masking helpers shared by the Streamlit UI, the bulk importer and the
+database layer. Kept free of Streamlit imports so scripts can use them.
+"""
+
+import hashlib
+import hmac
+import os
+import secrets
+from functools import lru_cache
+
+TOKEN_PREFIX = "ANON_"
+TOKEN_LENGTH = 12  # hex characters of the keyed digest (48 bits)
+PSEUDONYM_KEY_ENV = "HMS_PSEUDONYM_KEY"
+PSEUDONYM_KEY_FILE = os.environ.get("HMS_PSEUDONYM_KEY_FILE", "pseudonym.key")
+
+
+@lru_cache(maxsize=1)
+def load_pseudonym_key():
+    """Return the tokenization key from the environment or the local key file.
+
+    The key file is generated on first use. Whoever holds it can re-derive
+    tokens from names, so it must stay out of version control and backups of
+    the patient data.
+    """
+    env_key = os.environ.get(PSEUDONYM_KEY_ENV)
+    if env_key:
+        return env_key.encode("utf-8")
+
+    if not os.path.exists(PSEUDONYM_KEY_FILE):
+        fd = os.open(PSEUDONYM_KEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as handle:
+            handle.write(secrets.token_hex(32))
+    with open(PSEUDONYM_KEY_FILE, encoding="utf-8") as handle:
+        return handle.read().strip().encode("utf-8")
+
+
+def normalize_name(name):
+    return " ".join(name.split()).casefold()
+
+
+def pseudonym_digest(name):
+    """Keyed, process-independent digest of a patient name."""
+    return hmac.new(
+        load_pseudonym_key(), normalize_name(name).encode("utf-8"), hashlib.sha256
+    ).hexdigest()
+
+
+def token_for(digest, length=TOKEN_LENGTH):
+    return TOKEN_PREFIX + digest[:length]
+
+
+def normalize_token(token):
+    """Canonical form of a user-typed token (``anon_ab12`` -> ``ANON_ab12``)."""
+    token = token.strip()
+    if token[:len(TOKEN_PREFIX)].upper() == TOKEN_PREFIX:
+        return TOKEN_PREFIX + token[len(TOKEN_PREFIX):].lower()
+    return token
+
+
+def mask_name(name):
+    """Stable ``ANON_`` token for a name.
+
+    Unlike ``hash()``, the keyed digest is the same in every process. The
+    database's pseudonym index (``database.pseudonymize``) is the authority and
+    only departs from this value in the astronomically rare case of a prefix
+    collision.
+    """
+    return token_for(pseudonym_digest(name))
+
+
+def mask_contact(contact):
+    return "XXX-XXX-" + contact[-4:]
+
+
+def mask_patients(records, mask_names=None):
+    """Mask a batch of ``(name, contact, diagnosis)`` records.
+
+    ``mask_names`` maps a list of names to a list of tokens in one call (the
+    database passes its pseudonym index here); it defaults to ``mask_name``.
+    Returns ``(name, contact, diagnosis, anonymized_name, anonymized_contact)``
+    tuples ready for ``INSERT INTO patients``.
+    """
+    records = list(records)
+    names = [record[0] for record in records]
+    tokens = mask_names(names) if mask_names else [mask_name(name) for name in names]
+    return [
+        (name, contact, diagnosis, token, mask_contact(contact))
+        for (name, contact, diagnosis), token in zip(records, tokens)
+    ]
@@ -0,0 +1,181 @@
+"""
+roster.py
+---------
+Compact, column-oriented container for patient rows.
+
+A list of SQLite tuples costs a tuple, a boxed int and a fresh diagnosis
+string per patient, and the dashboards used to copy it again into one dict per
+row. ``Roster`` keeps each column in a single list or ``array`` instead:
+
+* ``ids`` is an ``array('q')`` and ``diagnosis_codes`` an ``array('i')`` of
+  indexes into ``diagnoses`` (dictionary encoding, ``-1`` for NULL);
+* repeated ``date_added`` values share one string object;
+* an id -> position dict, built on the first ``get``, makes lookups O(1).
+
+It still behaves like the row list it replaces (``len``, iteration and
+indexing yield ``PATIENT_COLUMNS`` tuples), and ``to_frame`` hands the columns
+to ``st.dataframe`` without building per-row objects.
+"""
+
+import sys
+from array import array
+
+FIELDS = (
+    "patient_id",
+    "name",
+    "contact",
+    "diagnosis",
+    "anonymized_name",
+    "anonymized_contact",
+    "date_added",
+)
+
+
+class Roster:
+    """Patients stored column by column, with an id index."""
+
+    __slots__ = (
+        "ids",
+        "names",
+        "contacts",
+        "diagnosis_codes",
+        "diagnoses",
+        "anonymized_names",
+        "anonymized_contacts",
+        "dates",
+        "_codes",
+        "_dates_seen",
+        "_index",
+    )
+
+    def __init__(self):
+        self.ids = array("q")
+        self.names = []
+        self.contacts = []
+        self.diagnosis_codes = array("i")
+        self.diagnoses = []  # code -> diagnosis text
+        self.anonymized_names = []
+        self.anonymized_contacts = []
+        self.dates = []
+        self._codes = {}
+        self._dates_seen = {}
+        self._index = None
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a roster from ``PATIENT_COLUMNS`` tuples (any iterable)."""
+        roster = cls()
+        roster.extend(rows)
+        return roster
+
+    @classmethod
+    def from_cursor(cls, cursor, chunk_size=1000):
+        """Build a roster straight from a cursor without materializing all tuples."""
+        roster = cls()
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return roster
+            roster.extend(rows)
+
+    def extend(self, rows):
+        codes = self._codes
+        dates_seen = self._dates_seen
+        for patient_id, name, contact, diagnosis, anon_name, anon_contact, date_added in rows:
+            self.ids.append(patient_id)
+            self.names.append(name)
+            self.contacts.append(contact)
+            if diagnosis is None:
+                self.diagnosis_codes.append(-1)
+            else:
+                code = codes.get(diagnosis)
+                if code is None:
+                    code = codes[diagnosis] = len(self.diagnoses)
+                    self.diagnoses.append(diagnosis)
+                self.diagnosis_codes.append(code)
+            self.anonymized_names.append(anon_name)
+            self.anonymized_contacts.append(anon_contact)
+            self.dates.append(dates_seen.setdefault(date_added, date_added))
+        self._index = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, position):
+        code = self.diagnosis_codes[position]
+        return (
+            self.ids[position],
+            self.names[position],
+            self.contacts[position],
+            None if code < 0 else self.diagnoses[code],
+            self.anonymized_names[position],
+            self.anonymized_contacts[position],
+            self.dates[position],
+        )
+
+    def __iter__(self):
+        for position in range(len(self.ids)):
+            yield self[position]
+
+    def __repr__(self):
+        return f"<Roster {len(self)} patients, {len(self.diagnoses)} diagnoses>"
+
+    def get(self, patient_id, default=None):
+        """The row for ``patient_id`` via the id index, or ``default``."""
+        if self._index is None:
+            self._index = {patient_id: position for position, patient_id in enumerate(self.ids)}
+        position = self._index.get(patient_id)
+        return default if position is None else self[position]
+
+    def column(self, field):
+        """One column as a list; ``diagnosis`` is decoded."""
+        if field == "diagnosis":
+            return [None if code < 0 else self.diagnoses[code] for code in self.diagnosis_codes]
+        return list(self._storage(field))
+
+    def _storage(self, field):
+        return {
+            "patient_id": self.ids,
+            "name": self.names,
+            "contact": self.contacts,
+            "anonymized_name": self.anonymized_names,
+            "anonymized_contact": self.anonymized_contacts,
+            "date_added": self.dates,
+        }[field]
+
+    def to_frame(self, columns=None):
+        """A pandas DataFrame of ``{label: field}`` columns (all fields by default).
+
+        Ids are wrapped without copying and the diagnosis column stays
+        dictionary-encoded as a pandas ``Categorical``. pandas ships with
+        Streamlit, so it is only imported here.
+        """
+        import numpy as np
+        import pandas as pd
+
+        columns = columns or {field: field for field in FIELDS}
+        data = {}
+        for label, field in columns.items():
+            if field == "patient_id":
+                data[label] = np.frombuffer(self.ids, dtype=np.int64) if self.ids else []
+            elif field == "diagnosis":
+                data[label] = pd.Categorical.from_codes(
+                    np.frombuffer(self.diagnosis_codes, dtype=np.int32)
+                    if self.diagnosis_codes else [],
+                    categories=self.diagnoses,
+                )
+            else:
+                data[label] = self._storage(field)
+        return pd.DataFrame(data)
+
+    def memory_usage(self):
+        """Approximate bytes held by the columns and their values."""
+        total = sys.getsizeof(self.ids) + sys.getsizeof(self.diagnosis_codes)
+        total += sum(sys.getsizeof(value) for value in self.diagnoses)
+        total += sys.getsizeof(self._codes) + sys.getsizeof(self._index or {})
+        for values in (self.names, self.contacts, self.anonymized_names,
+                       self.anonymized_contacts):
+            total += sys.getsizeof(values) + sum(sys.getsizeof(v) for v in values)
+        total += sys.getsizeof(self.dates) + sys.getsizeof(self._dates_seen)
+        total += sum(sys.getsizeof(value) for value in self._dates_seen)
+        return total
@@ -0,0 +1,10 @@
+"""
+views
+-----
+Dashboard pages for ``st.navigation``.
+
+``main.py`` registers only the signed-in role's page scripts, so Streamlit
+compiles and runs a page's code only for the roles that can see it.
+``common`` holds the widgets shared across pages and is imported once per
+process.
+"""
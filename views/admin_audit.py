@@ -0,0 +1,233 @@
+# Admin page: filtered audit log, live tail, the cold-month archive and chain checks.
+from collections import deque
+from datetime import datetime, timedelta
+
+import streamlit as st
+
+from database import (
+    LOG_HOT_MONTHS,
+    archive_logs,
+    count_logs,
+    get_log_checkpoints,
+    get_log_partitions,
+    get_logs,
+    get_logs_since,
+    log_action,
+    search_logs,
+    verify_logs,
+)
+from instrumentation import span
+from views.common import render_log_table
+
+AUDIT_PAGE_SIZE = 200
+AUDIT_WINDOWS = {
+    "All time": None,
+    "Last 24 hours": timedelta(days=1),
+    "Last 7 days": timedelta(days=7),
+    "Last 30 days": timedelta(days=30),
+}
+AUDIT_TAIL_SIZE = 500
+AUDIT_TAIL_INTERVALS = {"Manual": None, "Every 2 s": 2, "Every 5 s": 5, "Every 15 s": 15}
+
+
+def tail_logs(role_filter):
+    """Return the session's ring buffer of recent log entries, topped up with new rows.
+
+    The buffer and its ``log_id`` cursor live in ``st.session_state.audit_tail``;
+    each refresh only reads rows past the cursor, so polling costs the same no
+    matter how large the audit table grows.
+    """
+    state = st.session_state.get("audit_tail")
+    if state is None or state["role"] != role_filter:
+        seed = get_logs(role=role_filter, limit=AUDIT_TAIL_SIZE)
+        state = {
+            "role": role_filter,
+            "cursor": max((l[0] for l in seed), default=0),
+            "rows": deque(sorted(seed), maxlen=AUDIT_TAIL_SIZE),
+        }
+        st.session_state.audit_tail = state
+        return state["rows"]
+
+    new_logs = get_logs_since(state["cursor"], limit=AUDIT_TAIL_SIZE, role=role_filter)
+    if len(new_logs) == AUDIT_TAIL_SIZE:
+        # More arrived than the buffer holds: reseed from the newest entries.
+        del st.session_state.audit_tail
+        return tail_logs(role_filter)
+    if new_logs:
+        state["rows"].extend(new_logs)
+        state["cursor"] = new_logs[-1][0]
+    return state["rows"]
+
+
+def render_audit_tail(role_filter):
+    with span("dashboard.admin.audit_tail"):
+        # A click reruns just this fragment, which fetches the new rows.
+        st.button("Refresh now", key="audit_tail_refresh")
+        rows = tail_logs(role_filter)
+        st.caption(
+            f"Live tail · last {len(rows)} entries · refreshed "
+            f"{datetime.now().strftime('%H:%M:%S')}"
+        )
+        render_log_table(reversed(rows))
+
+
+@st.fragment
+def audit_log_panel():
+    """Filters and results; changing a filter reruns only this panel."""
+    with span("dashboard.admin.audit_log"):
+        tail_cols = st.columns(2)
+        with tail_cols[0]:
+            live_tail = st.toggle("Live tail", key="audit_live_tail")
+        with tail_cols[1]:
+            tail_interval = st.selectbox(
+                "Auto-refresh", list(AUDIT_TAIL_INTERVALS), index=2,
+                key="audit_tail_interval", disabled=not live_tail,
+            )
+
+        st.markdown("##### Filter logs")
+        filter_cols = st.columns(3)
+
+        with filter_cols[0]:
+            role_filter = st.selectbox(
+                "Filter by role", ["All", "admin", "doctor", "receptionist"],
+                key="audit_role_filter",
+            )
+        with filter_cols[1]:
+            action_filter = st.text_input(
+                "Search action or details (optional)", key="audit_action_filter"
+            ).strip()
+        with filter_cols[2]:
+            window = st.selectbox(
+                "Time window", list(AUDIT_WINDOWS), key="audit_window_filter"
+            )
+
+        window_delta = AUDIT_WINDOWS[window]
+        log_filters = {
+            "role": None if role_filter == "All" else role_filter,
+            "since": (
+                (datetime.now() - window_delta).strftime("%Y-%m-%d %H:%M:%S")
+                if window_delta else None
+            ),
+        }
+
+        if live_tail:
+            # Only the fragment reruns on each poll, not the whole dashboard.
+            if action_filter or window_delta:
+                st.caption("Live tail follows the role filter only.")
+            st.fragment(
+                render_audit_tail, run_every=AUDIT_TAIL_INTERVALS[tail_interval]
+            )(log_filters["role"])
+        elif action_filter:
+            # Ranked full-text search instead of a substring scan.
+            logs = search_logs(action_filter, limit=AUDIT_PAGE_SIZE, **log_filters)
+            st.caption(f"Top {len(logs)} ranked matches for “{action_filter}”")
+            render_log_table(logs)
+        else:
+            matching = count_logs(**log_filters)
+            if not matching:
+                st.info("No logs match these filters." if any(log_filters.values())
+                        else "No logs recorded yet.")
+            else:
+                page_count = max(1, -(-matching // AUDIT_PAGE_SIZE))
+                audit_page = st.number_input(
+                    "Page", min_value=1, max_value=page_count, value=1, step=1,
+                    key="audit_page",
+                )
+                st.caption(f"{matching} matching entries · page {audit_page} of {page_count}")
+
+                logs = get_logs(
+                    **log_filters,
+                    limit=AUDIT_PAGE_SIZE,
+                    offset=(audit_page - 1) * AUDIT_PAGE_SIZE,
+                )
+                render_log_table(logs)
+
+
+role = st.session_state.role
+
+with span("dashboard.admin"):
+    st.markdown("#### Integrity audit trail")
+
+    audit_log_panel()
+
+    with st.expander("Archived months"):
+        st.caption(
+            f"Months older than the last {LOG_HOT_MONTHS} are compressed into "
+            "read-only archives. They stay searchable through the filters "
+            "above; ranked text search covers the live months only."
+        )
+        partitions = get_log_partitions()
+        if partitions:
+            st.dataframe(
+                [
+                    {
+                        "Month": p[0],
+                        "Entries": p[2],
+                        "First": p[3],
+                        "Last": p[4],
+                        "Archived": p[5],
+                    }
+                    for p in partitions
+                ],
+                use_container_width=True,
+            )
+        if st.button("Archive cold months", key="audit_archive_btn"):
+            archived = archive_logs()
+            log_action(
+                st.session_state.user_id,
+                role,
+                "archive_logs",
+                f"Archived audit months: {', '.join(archived) or 'none'}",
+            )
+            st.success(
+                f"Archived {', '.join(archived)}." if archived
+                else "Nothing old enough to archive."
+            )
+
+    with st.expander("Chain verification"):
+        st.caption(
+            "Every entry carries a hash chained to the one before it. Verifying "
+            "rehashes only the entries added since the last signed checkpoint; "
+            "a full audit rehashes the whole chain, archived months included."
+        )
+        verify_cols = st.columns(2)
+        full = None
+        with verify_cols[0]:
+            if st.button("Verify new entries", key="audit_verify_btn", use_container_width=True):
+                full = False
+        with verify_cols[1]:
+            if st.button("Full audit", key="audit_full_verify_btn", use_container_width=True):
+                full = True
+
+        if full is not None:
+            result = verify_logs(full=full)
+            log_action(
+                st.session_state.user_id,
+                role,
+                "verify_logs",
+                f"{result['mode'].capitalize()} chain verification: "
+                + ("passed" if result["ok"] else result["error"]),
+            )
+            if result["ok"]:
+                st.success(
+                    f"Chain intact up to log_id {result['to_log_id']}: "
+                    f"{result['rows']} entries rehashed in {result['seconds']} s."
+                )
+            else:
+                st.error(f"Chain verification failed: {result['error']}")
+
+        checkpoints = get_log_checkpoints(limit=5)
+        if checkpoints:
+            st.dataframe(
+                [
+                    {
+                        "Checkpoint": c[0],
+                        "Up to log_id": c[1],
+                        "Entries rehashed": c[3],
+                        "Mode": c[4],
+                        "Verified": c[5],
+                    }
+                    for c in checkpoints
+                ],
+                use_container_width=True,
+            )
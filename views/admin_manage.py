@@ -0,0 +1,142 @@
+# Admin page: add, update and delete patients.
+import streamlit as st
+
+from database import (
+    add_patient,
+    delete_patient,
+    get_patient,
+    log_action,
+    pseudonymize,
+    suggest_patients,
+    transaction,
+    update_patient,
+)
+from instrumentation import span
+from masking import mask_contact
+from views.common import notify, patient_page, show_notice
+
+ADD_FIELDS = ("admin_add_name", "admin_add_contact", "admin_add_diagnosis")
+EDIT_FIELDS = ("admin_edit_name", "admin_edit_contact", "admin_edit_diagnosis")
+
+
+# Form callbacks run before the rerun they trigger, so the page (or panel)
+# that follows already reads the updated data.
+def add_submitted():
+    name, contact, diagnosis = (st.session_state[key] for key in ADD_FIELDS)
+    if not (name and contact and diagnosis):
+        notify("admin_add_notice", "error", "All fields are required!")
+        return
+
+    with transaction():
+        anon_name = pseudonymize(name)
+        anon_contact = mask_contact(contact)
+        add_patient(name, contact, diagnosis, anon_name, anon_contact)
+        log_action(
+            st.session_state.user_id,
+            st.session_state.role,
+            "add_patient",
+            f"Added patient {name}",
+        )
+
+    for key in ADD_FIELDS:
+        st.session_state[key] = ""
+    notify("admin_add_notice", "success", "Patient added successfully!")
+
+
+def update_submitted():
+    selected_id = st.session_state.admin_edit_select
+    new_name, new_contact, new_diagnosis = (st.session_state[key] for key in EDIT_FIELDS)
+    with transaction():
+        update_patient(selected_id, new_name, new_contact, new_diagnosis)
+        log_action(
+            st.session_state.user_id,
+            st.session_state.role,
+            "edit_patient",
+            f"Edited patient ID {selected_id}",
+        )
+    notify("admin_edit_notice", "success", "Patient updated successfully!")
+
+
+def delete_submitted():
+    selected_id = st.session_state.admin_edit_select
+    with transaction():
+        delete_patient(selected_id)
+        log_action(
+            st.session_state.user_id,
+            st.session_state.role,
+            "delete_patient",
+            f"Deleted patient ID {selected_id}",
+        )
+    st.session_state.pop("admin_edit_loaded", None)
+    notify("admin_edit_notice", "error", "Patient deleted.")
+
+
+@st.fragment
+def edit_patient_panel():
+    """Roster pager, patient lookup and edit form; interacting reruns only this panel."""
+    with span("dashboard.admin.edit_panel"):
+        st.caption("Pick from the roster page, or look a patient up by ID or token.")
+        show_notice("admin_edit_notice")
+        patients = patient_page("admin_roster")
+        lookup = st.text_input(
+            "Find patient", key="admin_edit_lookup", placeholder="ID or ANON_ token prefix"
+        )
+        if lookup.strip():
+            labels = dict(suggest_patients(lookup))
+        else:
+            labels = dict(zip(patients.ids, patients.anonymized_names))
+
+        if labels:
+            selected_id = st.selectbox(
+                "Select Patient ID", list(labels), key="admin_edit_select",
+                format_func=lambda pid: f"{pid} · {labels[pid]}",
+            )
+
+            selected = get_patient(selected_id)
+
+            if selected:
+                if st.session_state.get("admin_edit_loaded") != selected_id:
+                    # Load the picked patient into the form fields.
+                    for key, value in zip(EDIT_FIELDS, selected[1:4]):
+                        st.session_state[key] = value
+                    st.session_state.admin_edit_loaded = selected_id
+
+                with st.form("admin_edit_form", border=False):
+                    st.text_input("Edit Name", key="admin_edit_name")
+                    st.text_input("Edit Contact", key="admin_edit_contact")
+                    st.text_input("Edit Diagnosis", key="admin_edit_diagnosis")
+
+                    st.form_submit_button(
+                        "Update Patient", key="admin_update_btn",
+                        on_click=update_submitted, use_container_width=True,
+                    )
+                    st.form_submit_button(
+                        "Delete Patient", key="admin_delete_btn",
+                        on_click=delete_submitted, use_container_width=True,
+                    )
+        elif lookup.strip():
+            st.info("No patient ID or token starts with that.")
+        else:
+            st.info("No patients available.")
+
+with span("dashboard.admin"):
+    st.markdown("#### Secure record maintenance")
+    add_col, edit_col = st.columns(2)
+
+    with add_col:
+        st.markdown("##### Add new patient")
+        show_notice("admin_add_notice")
+        # A form: typing does not rerun anything; submitting reruns this page once.
+        with st.form("admin_add_form", border=False):
+            st.text_input("Patient Name", key="admin_add_name", placeholder="Jane Doe")
+            st.text_input("Contact Number", key="admin_add_contact", placeholder="555-0102")
+            st.text_input("Diagnosis", key="admin_add_diagnosis", placeholder="Hypertension")
+
+            st.form_submit_button(
+                "Add Patient", key="admin_add_btn", on_click=add_submitted,
+                use_container_width=True,
+            )
+
+    with edit_col:
+        st.markdown("##### Update or delete patient")
+        edit_patient_panel()
@@ -0,0 +1,124 @@
+# Admin landing page: KPIs, data layer health and the full patient roster.
+from datetime import datetime
+from functools import partial
+
+import streamlit as st
+
+from database import (
+    audit_stats,
+    export_patients_csv,
+    get_dashboard_stats,
+    pool_stats,
+    read_cache_stats,
+    snapshot_stats,
+)
+from instrumentation import query_report, render_prometheus, span, span_report
+from views.common import ADMIN_ROSTER_COLUMNS, patient_page, render_kpi
+
+
+def read_export(export_file):
+    """The spooled export's bytes; Streamlit calls this only on a download click."""
+    export_file.seek(0)
+    return export_file.read()
+
+
+with span("dashboard.admin"):
+    st.markdown("### Admin Command Deck")
+    stats = get_dashboard_stats()
+
+    metric_cols = st.columns(3)
+    with metric_cols[0]:
+        render_kpi("Patients Indexed", stats["total_patients"], "Active records")
+    with metric_cols[1]:
+        render_kpi("Unique Diagnoses", stats["unique_diagnoses"], "Diversity snapshot")
+    with metric_cols[2]:
+        render_kpi(
+            "Last Entry", stats["last_entry"] or "Awaiting first entry", "Most recent record"
+        )
+
+    with st.expander("Data layer health"):
+        cache = read_cache_stats()
+        pool = pool_stats()
+        audit = audit_stats()
+        health_cols = st.columns(3)
+        with health_cols[0]:
+            st.metric("Read cache hit rate", f"{cache['hit_rate']:.0%}")
+            st.caption(
+                f"{cache['hits']} hits · {cache['misses']} misses · "
+                f"{cache['size']}/{cache['maxsize']} entries"
+            )
+        with health_cols[1]:
+            st.metric("Pool connections in use", f"{pool['in_use']}/{pool['size']}")
+            st.caption(
+                f"{pool['checkouts']} checkouts · {pool['waits']} waits · "
+                f"max wait {pool['wait_max_ms']} ms"
+            )
+        with health_cols[2]:
+            st.metric("Audit queue depth", audit["queue_depth"])
+            st.caption(
+                f"{audit['written']} written in {audit['batches']} batches · "
+                f"{audit['backpressure_waits']} backpressure waits · "
+                f"{audit['spilled']} spilled, {audit['replayed']} replayed, "
+                f"{audit['rejected']} rejected"
+            )
+        snapshot = snapshot_stats()
+        st.caption(
+            f"Doctor snapshot: {snapshot['refreshes']} refreshes · "
+            f"{snapshot['unchanged_checks']} unchanged checks · "
+            f"last copy {snapshot['last_refresh_ms']} ms · "
+            f"max age {snapshot['max_age_s']} s"
+        )
+
+    with st.expander("Performance"):
+        st.caption(
+            "Rolling latency per dashboard rerun and per SQL statement shape. "
+            "Statement text is parameterized; no patient values are recorded."
+        )
+        st.markdown("**Dashboard reruns**")
+        st.dataframe(span_report(), use_container_width=True)
+        st.markdown("**Slowest statements**")
+        st.dataframe(query_report(limit=15), use_container_width=True)
+        st.download_button(
+            "Download Prometheus metrics",
+            data=render_prometheus(),
+            file_name="hms_metrics.prom",
+            mime="text/plain",
+            key="admin_metrics_download",
+        )
+
+    st.markdown("#### Patient intelligence stream")
+    st.caption("Export roster data with both sensitive and anonymized identifiers.")
+
+    export_cols = st.columns(2)
+    with export_cols[0]:
+        compress_export = st.checkbox("Gzip export", key="admin_export_gzip")
+        if st.button("Prepare roster export", key="admin_export_btn"):
+            # Built only on request; the previous export's spool is released.
+            previous = st.session_state.pop("roster_export", None)
+            if previous:
+                previous["file"].close()
+            export_file, export_rows = export_patients_csv(compress=compress_export)
+            st.session_state.roster_export = {
+                "file": export_file,
+                "rows": export_rows,
+                "name": "patients_export.csv" + (".gz" if compress_export else ""),
+                "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            }
+
+    roster_export = st.session_state.get("roster_export")
+    with export_cols[1]:
+        if roster_export:
+            # Deferred: reruns register the button without reading the spool.
+            st.download_button(
+                label="Download roster CSV",
+                data=partial(read_export, roster_export["file"]),
+                file_name=roster_export["name"],
+                mime="application/gzip" if roster_export["name"].endswith(".gz")
+                else "text/csv",
+            )
+            st.caption(
+                f"{roster_export['rows']} rows prepared at {roster_export['created']}"
+            )
+
+    patients = patient_page("admin_roster")
+    st.dataframe(patients.to_frame(ADMIN_ROSTER_COLUMNS), use_container_width=True)
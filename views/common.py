@@ -0,0 +1,290 @@
+"""
+views/common.py
+---------------
+Widgets and layout shared by every page. Imported once per process; page
+scripts only call into it.
+"""
+
+from datetime import datetime
+
+import streamlit as st
+
+from database import PAGE_SIZE, get_patients_page
+
+
+def render_kpi(label, value, badge=None):
+    """Glassmorphism metric cards for repeated UI elements."""
+    value_text = str(value)
+    badge_html = f'<span class="kpi-badge">{badge}</span>' if badge else ""
+    st.markdown(
+        f"""
+        <div class="glass-card kpi-card">
+            <p class="kpi-label">{label}</p>
+            <h3 class="kpi-value">{value_text}</h3>
+            {badge_html}
+        </div>
+        """,
+        unsafe_allow_html=True,
+    )
+
+
+# Roster columns shown to each role, as {label: Roster field}.
+ADMIN_ROSTER_COLUMNS = {
+    "ID": "patient_id",
+    "Name": "name",
+    "Contact": "contact",
+    "Diagnosis": "diagnosis",
+    "Anon Name": "anonymized_name",
+    "Anon Contact": "anonymized_contact",
+    "Date Added": "date_added",
+}
+DOCTOR_ROSTER_COLUMNS = {
+    "ID": "patient_id",
+    "Anon Name": "anonymized_name",
+    "Anon Contact": "anonymized_contact",
+    "Diagnosis": "diagnosis",
+    "Date Added": "date_added",
+}
+RECEPTION_ROSTER_COLUMNS = {
+    "ID": "patient_id",
+    "Anonymized Name": "anonymized_name",
+    "Anonymized Contact": "anonymized_contact",
+    "Date Added": "date_added",
+}
+
+
+def render_log_table(logs):
+    st.dataframe(
+        [
+            {
+                "Log ID": l[0],
+                "User ID": l[1],
+                "Role": l[2],
+                "Action": l[3],
+                "Timestamp": l[4],
+                "Details": l[5],
+            }
+            for l in logs
+        ],
+        use_container_width=True,
+    )
+
+
+def notify(key, kind, message):
+    """Queue a message from a callback; ``show_notice(key)`` draws it on the next run."""
+    st.session_state[key] = (kind, message)
+
+
+def show_notice(key):
+    notice = st.session_state.pop(key, None)
+    if notice:
+        getattr(st, notice[0])(notice[1])
+
+
+def _turn_page(pager, after, before, step):
+    pager.update(after=after, before=before, page=pager["page"] + step)
+
+
+def patient_page(key, **filters):
+    """Fetch the visible keyset page for a roster and draw previous/next controls.
+
+    The cursor lives in ``st.session_state[f"{key}_pager"]`` and resets whenever
+    the filters change, so each rerun only reads one page from SQLite. The
+    buttons move the cursor in an ``on_click`` callback, before the rerun, so
+    a page turn costs one read and reruns only the fragment holding the pager.
+    """
+    pager_key = f"{key}_pager"
+    signature = repr(sorted(filters.items()))
+    pager = st.session_state.get(pager_key)
+    if pager is None or pager["filters"] != signature:
+        pager = {"filters": signature, "after": None, "before": None, "page": 1}
+        st.session_state[pager_key] = pager
+
+    rows, total = get_patients_page(after_id=pager["after"], before_id=pager["before"], **filters)
+    if not rows and pager["page"] > 1:
+        # The page emptied underneath us (deletes); start over from the top.
+        pager.update(after=None, before=None, page=1)
+        rows, total = get_patients_page(**filters)
+
+    page_count = max(1, -(-total // PAGE_SIZE))
+    nav_cols = st.columns([1, 2, 1])
+    with nav_cols[0]:
+        st.button(
+            "Previous", key=f"{key}_prev", disabled=pager["page"] <= 1 or not rows,
+            on_click=_turn_page, args=(pager, None, rows.ids[0] if rows else None, -1),
+        )
+    with nav_cols[1]:
+        st.caption(f"Page {pager['page']} of {page_count} · {total} records")
+    with nav_cols[2]:
+        st.button(
+            "Next", key=f"{key}_next", disabled=pager["page"] >= page_count or not rows,
+            on_click=_turn_page, args=(pager, rows.ids[-1] if rows else None, None, 1),
+        )
+
+    return rows
+
+
+
+CUSTOM_CSS = """
+<style>
+:root {
+    --bg-dark: #020b1f;
+    --bg-glass: rgba(8, 18, 43, 0.75);
+    --accent: #48d6ff;
+    --accent-strong: #f9a826;
+    --text-muted: #8ba3c7;
+}
+[data-testid="stAppViewContainer"] > .main {
+    background: radial-gradient(circle at top, rgba(44, 184, 251, 0.08), transparent 45%),
+                radial-gradient(circle at 20% 20%, rgba(249, 168, 38, 0.08), transparent 25%),
+                linear-gradient(135deg, #040c27, #071331 55%, #051226);
+    color: #f2f6ff;
+}
+.block-container {
+    padding-top: 1.5rem;
+    padding-bottom: 3rem;
+}
+.hero-card {
+    background: linear-gradient(120deg, rgba(27, 53, 95, 0.8), rgba(12, 27, 58, 0.8));
+    border: 1px solid rgba(255, 255, 255, 0.1);
+    border-radius: 30px;
+    padding: 2.25rem;
+    margin-bottom: 1.5rem;
+    box-shadow: 0 25px 80px rgba(0, 0, 0, 0.45);
+}
+.hero-card h1 {
+    margin-bottom: 0.4rem;
+}
+.hero-card .eyebrow {
+    text-transform: uppercase;
+    letter-spacing: 0.25em;
+    font-size: 0.75rem;
+    color: var(--accent);
+}
+.glass-card {
+    background: var(--bg-glass);
+    border: 1px solid rgba(255, 255, 255, 0.08);
+    border-radius: 20px;
+    padding: 1.25rem 1.5rem;
+    box-shadow: 0 12px 40px rgba(0, 0, 0, 0.4);
+}
+.kpi-card {
+    min-height: 120px;
+}
+.kpi-label {
+    font-size: 0.78rem;
+    text-transform: uppercase;
+    letter-spacing: 0.12em;
+    color: var(--text-muted);
+    margin: 0 0 0.3rem 0;
+}
+.kpi-value {
+    margin: 0;
+    font-size: 2rem;
+    color: #f9fbff;
+}
+.kpi-badge {
+    display: inline-flex;
+    align-items: center;
+    gap: 0.35rem;
+    font-size: 0.8rem;
+    background: rgba(72, 214, 255, 0.12);
+    color: var(--accent);
+    border-radius: 999px;
+    padding: 0.2rem 0.75rem;
+}
+[data-testid="stSidebar"] {
+    background: rgba(1, 4, 18, 0.75);
+    backdrop-filter: blur(14px);
+    border-right: 1px solid rgba(255, 255, 255, 0.08);
+}
+[data-testid="stSidebar"] * {
+    color: #e3ecff !important;
+}
+.stButton>button {
+    width: 100%;
+    background: linear-gradient(120deg, #4f46e5, #18b4ff);
+    color: white;
+    border-radius: 999px;
+    border: none;
+    padding: 0.6rem 1.2rem;
+    font-weight: 600;
+    transition: all 0.2s ease;
+}
+.stButton>button:hover {
+    box-shadow: 0 12px 30px rgba(24, 180, 255, 0.35);
+    transform: translateY(-1px);
+}
+.stTextInput>div>div>input,
+.stSelectbox>div>div>div>input,
+.stTextArea>div>textarea {
+    background: rgba(255, 255, 255, 0.05);
+    border: 1px solid rgba(255, 255, 255, 0.15);
+    border-radius: 14px;
+    color: #fdfdff;
+}
+.stSelectbox>div>div>div {
+    color: #fdfdff;
+}
+.stTabs [data-baseweb="tab-list"] {
+    background: rgba(255, 255, 255, 0.03);
+    padding: 0.3rem;
+    border-radius: 999px;
+}
+.stTabs [data-baseweb="tab"] {
+    border-radius: 999px;
+    padding: 0.35rem 1.5rem;
+    color: var(--text-muted);
+}
+.stTabs [data-baseweb="tab"][aria-selected="true"] {
+    background: linear-gradient(120deg, #4f46e5, #18b4ff);
+    color: white;
+}
+[data-testid="stDataFrame"] {
+    background: rgba(1, 8, 30, 0.55);
+    border-radius: 20px;
+    padding: 0.5rem;
+}
+.tip-card {
+    background: rgba(255, 255, 255, 0.05);
+    border-radius: 24px;
+    border: 1px solid rgba(255, 255, 255, 0.08);
+}
+.tip-card ul {
+    padding-left: 1.2rem;
+}
+</style>
+"""
+
+HERO_HTML = """
+<div class="hero-card">
+    <p class="eyebrow">PulseWatch Security Stack</p>
+    <h1>23K2085 - Arsalan Mir</h1>
+    <p><strong>Information Security Course</strong></p>
+    <p>Hardest assignment I have ever done so far.</p>
+</div>
+"""
+
+
+def render_chrome():
+    """Theme, hero banner and session KPIs drawn above every page."""
+    st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
+    st.markdown(HERO_HTML, unsafe_allow_html=True)
+
+    if "app_start_time" not in st.session_state:
+        st.session_state.app_start_time = datetime.now()
+
+    start_time_display = st.session_state.app_start_time.strftime("%Y-%m-%d %H:%M:%S")
+    current_time = datetime.now()
+    current_time_display = current_time.strftime("%Y-%m-%d %H:%M:%S")
+    uptime_duration = current_time - st.session_state.app_start_time
+    uptime_display = str(uptime_duration).split(".")[0]
+
+    status_cols = st.columns(3)
+    with status_cols[0]:
+        render_kpi("Session Start", start_time_display, "Application boot")
+    with status_cols[1]:
+        render_kpi("Current Time", current_time_display, "Local server clock")
+    with status_cols[2]:
+        render_kpi("Uptime", uptime_display, "Live monitoring")
+
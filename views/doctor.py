@@ -0,0 +1,67 @@
+# Doctor page: anonymized roster with diagnosis facets and search.
+import streamlit as st
+
+from database import (
+    find_patients_by_token,
+    get_dashboard_stats,
+    get_diagnosis_facets,
+    read_source,
+    search_patients,
+)
+from instrumentation import span
+from masking import TOKEN_PREFIX
+from roster import Roster
+from views.common import DOCTOR_ROSTER_COLUMNS, patient_page, render_kpi
+
+
+@st.fragment
+def roster_panel():
+    """Diagnosis filter, search and results; interacting reruns only this panel."""
+    # Fragment reruns skip the page body, so the panel sets its own read source.
+    with span("dashboard.doctor.roster"), read_source("snapshot"):
+        filter_cols = st.columns(2)
+
+        facet_counts = {name: count for _, name, count in get_diagnosis_facets()}
+        with filter_cols[0]:
+            selected_diag = st.selectbox(
+                "Filter by diagnosis",
+                ["All"] + list(facet_counts),
+                format_func=lambda d: d if d == "All" else f"{d} ({facet_counts[d]})",
+                key="doctor_diagnosis_filter",
+            )
+
+        with filter_cols[1]:
+            search_term = st.text_input(
+                "Search by patient ID, anonymized name or contact",
+                key="doctor_search",
+            ).strip().lower()
+
+        diagnosis_filter = None if selected_diag == "All" else selected_diag
+        filtered = Roster()
+        if search_term.startswith(TOKEN_PREFIX.lower()):
+            # Anonymized names are stable tokens: resolve with an index lookup.
+            filtered = find_patients_by_token(search_term, diagnosis=diagnosis_filter)
+        if search_term and not filtered:
+            filtered = search_patients(search_term, diagnosis=diagnosis_filter)
+            st.caption(f"Top {len(filtered)} ranked matches")
+        elif not search_term:
+            filtered = patient_page("doctor_roster", diagnosis=diagnosis_filter)
+
+        st.dataframe(filtered.to_frame(DOCTOR_ROSTER_COLUMNS), use_container_width=True)
+
+
+# Read-only role: served from the in-memory snapshot (HMS_SNAPSHOT_MAX_AGE).
+with span("dashboard.doctor"), read_source("snapshot"):
+    st.markdown("### Doctor Operations Board")
+    stats = get_dashboard_stats()
+
+    doc_cols = st.columns(2)
+    with doc_cols[0]:
+        render_kpi("Roster Size", stats["total_patients"], "Anonymized view")
+    with doc_cols[1]:
+        render_kpi("Unique Diagnoses", stats["unique_diagnoses"], "Clinical spread")
+
+    if not stats["total_patients"]:
+        st.info("No patients available.")
+    else:
+        roster_panel()
@@ -0,0 +1,28 @@
+# Sign-in page, the only page registered before login.
+import streamlit as st
+
+from database import authenticate_user, log_action
+from instrumentation import span
+
+st.markdown("### Encrypted Gateway")
+st.markdown("#### Authenticate to continue")
+username = st.text_input("Username", key="login_username", placeholder="admin@pulsewatch")
+password = st.text_input(
+    "Password", type="password", key="login_password", placeholder="********"
+)
+
+if st.button("Authenticate Session", key="login_btn", use_container_width=True):
+    with span("login.authenticate"):
+        user = authenticate_user(username, password)
+
+    if user:
+        st.success("Login successful!")
+        st.session_state.logged_in = True
+        st.session_state.user_id = user[0]
+        st.session_state.role = user[1]
+
+        log_action(user[0], user[1], "login", f"{username} logged in")
+
+        st.rerun()
+    else:
+        st.error("Invalid username or password")
@@ -0,0 +1,135 @@
+# Receptionist page: restricted roster plus add/edit forms.
+import streamlit as st
+
+from database import (
+    add_patient,
+    get_patient,
+    log_action,
+    pseudonymize,
+    read_source,
+    suggest_patients,
+    transaction,
+    update_patient,
+)
+from instrumentation import span
+from masking import mask_contact
+from views.common import RECEPTION_ROSTER_COLUMNS, notify, patient_page, show_notice
+
+ADD_FIELDS = ("rec_add_name", "rec_add_contact", "rec_add_diagnosis")
+EDIT_FIELDS = ("rec_edit_name", "rec_edit_contact", "rec_edit_diagnosis")
+
+
+# Form callbacks run before the rerun they trigger; see views/admin_manage.py.
+def add_submitted():
+    name, contact, diagnosis = (st.session_state[key] for key in ADD_FIELDS)
+    if not (name and contact and diagnosis):
+        notify("rec_add_notice", "error", "All fields are required!")
+        return
+
+    with transaction():
+        anon_name = pseudonymize(name)
+        anon_contact = mask_contact(contact)
+        add_patient(name, contact, diagnosis, anon_name, anon_contact)
+        log_action(
+            st.session_state.user_id,
+            st.session_state.role,
+            "add_patient",
+            f"Receptionist added: {anon_name}",
+        )
+
+    for key in ADD_FIELDS:
+        st.session_state[key] = ""
+    notify("rec_add_notice", "success", "Patient added successfully!")
+
+
+def update_submitted():
+    selected_id = st.session_state.rec_edit_select
+    new_name, new_contact, new_diagnosis = (st.session_state[key] for key in EDIT_FIELDS)
+    if not (new_name and new_contact and new_diagnosis):
+        notify("rec_edit_notice", "error", "All fields must be filled")
+        return
+
+    with transaction():
+        update_patient(selected_id, new_name, new_contact, new_diagnosis)
+        log_action(
+            st.session_state.user_id,
+            st.session_state.role,
+            "edit_patient",
+            f"Receptionist edited ID {selected_id}",
+        )
+    notify("rec_edit_notice", "success", "Patient updated successfully!")
+
+
+@st.fragment
+def edit_patient_panel(patients):
+    """Patient lookup and edit form; interacting reruns only this panel."""
+    # Fragment reruns skip the page body, so the panel sets its own read source.
+    with span("dashboard.receptionist.edit_panel"), read_source("readonly"):
+        st.caption("Pick from the roster page, or look a patient up by ID or token.")
+        show_notice("rec_edit_notice")
+        lookup = st.text_input(
+            "Find patient", key="rec_edit_lookup", placeholder="ID or ANON_ token prefix"
+        )
+        if lookup.strip():
+            labels = dict(suggest_patients(lookup))
+        else:
+            labels = dict(zip(patients.ids, patients.anonymized_names))
+
+        if labels:
+            selected_id = st.selectbox(
+                "Select Patient ID to Edit", list(labels), key="rec_edit_select",
+                format_func=lambda pid: f"{pid} · {labels[pid]}",
+            )
+
+            selected = get_patient(selected_id)
+
+            if selected:
+                st.info(f"Editing anonymized record: **{selected[4]}**")
+
+                with st.form("rec_edit_form", border=False):
+                    st.text_input("Edit Name (Real Value Hidden)", key="rec_edit_name")
+                    st.text_input("Edit Contact (Real Value Hidden)", key="rec_edit_contact")
+                    st.text_input(
+                        "Edit Diagnosis (Real Value Hidden)", key="rec_edit_diagnosis"
+                    )
+
+                    st.form_submit_button(
+                        "Update Patient", key="rec_update_btn",
+                        on_click=update_submitted, use_container_width=True,
+                    )
+        elif lookup.strip():
+            st.info("No patient ID or token starts with that.")
+
+# Reads use mode=ro connections; edits still commit via transaction().
+with span("dashboard.receptionist"), read_source("readonly"):
+    st.markdown("### Reception Operations Center")
+
+    roster_tab, manage_tab = st.tabs(["Restricted Roster", "Manage Patients"])
+
+    with roster_tab:
+        st.caption("All identifiers remain anonymized in this view.")
+        patients = patient_page("rec_roster")
+        st.dataframe(
+            patients.to_frame(RECEPTION_ROSTER_COLUMNS), use_container_width=True
+        )
+
+    with manage_tab:
+        st.markdown("#### Add or edit patients")
+        rec_cols = st.columns(2)
+
+        with rec_cols[0]:
+            st.markdown("##### Add new patient")
+            show_notice("rec_add_notice")
+            with st.form("rec_add_form", border=False):
+                st.text_input("Enter Patient Name (Real)", key="rec_add_name")
+                st.text_input("Enter Contact Number (Real)", key="rec_add_contact")
+                st.text_input("Enter Diagnosis (Real)", key="rec_add_diagnosis")
+
+                st.form_submit_button(
+                    "Add Patient", key="rec_add_btn", on_click=add_submitted,
+                    use_container_width=True,
+                )
+
+        with rec_cols[1]:
+            st.markdown("##### Edit patient")
+            edit_patient_panel(patients)